@@ -0,0 +1,194 @@
+"""
+批量图表导出模块
+
+无界面地按图表规格批量导出PNG/SVG图表。图表在多个工作进程中使用Agg后端并行渲染，
+每个工作进程只在启动时加载一次账本。
+
+图表规格文件是JSON数组，每个元素形如：
+    {"output": "reports/2023-01.png", "style": "line",
+     "start": "2023-01-01 00:00", "end": "2023-02-01 00:00", "include_start": true,
+     "transaction_type": 1, "category": 0, "width": 800, "height": 600}
+除output外的字段均可省略。
+
+用法：python -m src.batch_export 账本文件 图表规格文件 [--processes N]
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.transaction import TransactionType, DateTime
+from src.columnar_repository import ColumnarTransactionRepository
+from src.transaction_repository import TransactionRepository
+from src.plot_service import PlotService, configure_fonts
+
+
+class ChartSpec:
+    """
+    图表规格类，描述一张需要导出的图表
+    """
+    def __init__(
+            self,
+            output: str,
+            style: str = "bar",
+            start: str = None,
+            end: str = None,
+            include_start: bool = False,
+            include_end: bool = False,
+            transaction_type: int = None,
+            category=None,
+            width: int = 800,
+            height: int = 600,
+            dpi: int = 100):
+        """
+        初始化图表规格
+        @param output: 输出文件路径，按扩展名选择PNG或SVG格式
+        @param style: 图表样式，支持"bar"、"line"、"pie"
+        @param start: 起始时间，格式为"YYYY-MM-DD HH:MM"，与end同时为None时不限时间
+        @param end: 结束时间，格式为"YYYY-MM-DD HH:MM"
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        @param transaction_type: 交易类型编码，为None时不按类型过滤
+        @param category: 类别名称（与账本中保存的一致），为None时不按类别过滤
+        @param width: 宽度（像素）
+        @param height: 高度（像素）
+        @param dpi: 每英寸像素数
+        """
+        if os.path.splitext(output)[1].lower() not in (".png", ".svg"):
+            raise ValueError(f"Unsupported output format: {output}")
+        if (start is None) != (end is None):
+            raise ValueError("start and end must be given together")
+        self.output = output
+        self.style = style
+        self.start = start
+        self.end = end
+        self.include_start = include_start
+        self.include_end = include_end
+        self.transaction_type = transaction_type
+        self.category = category
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'ChartSpec':
+        """
+        从字典构造图表规格
+        """
+        return cls(**d)
+
+    def to_dict(self) -> dict:
+        """
+        转换为字典，用于传给工作进程
+        """
+        return {
+            "output": self.output,
+            "style": self.style,
+            "start": self.start,
+            "end": self.end,
+            "include_start": self.include_start,
+            "include_end": self.include_end,
+            "transaction_type": self.transaction_type,
+            "category": self.category,
+            "width": self.width,
+            "height": self.height,
+            "dpi": self.dpi
+        }
+
+    def select(self, repository: TransactionRepository) -> TransactionRepository:
+        """
+        从仓库中选出图表规格对应的交易记录
+        @param repository: 交易记录仓库
+        """
+        query = repository.query()
+        if self.start is not None:
+            query = query.between(DateTime.from_string(self.start), DateTime.from_string(self.end),
+                                  self.include_start, self.include_end)
+        if self.transaction_type is not None:
+            query = query.type(TransactionType.from_string(self.transaction_type))
+        if self.category is not None:
+            query = query.category(self.category)
+        if not query.has_filters():
+            return repository
+        return query.to_repository()
+
+
+def load_ledger(file_path: str) -> ColumnarTransactionRepository:
+    """
+    加载账本文件，扩展名为.json时按JSON格式加载，否则按二进制账本以内存映射方式打开
+    @param file_path: 账本文件路径
+    """
+    if file_path.lower().endswith(".json"):
+        return ColumnarTransactionRepository.load_from_json(file_path)
+    return ColumnarTransactionRepository.load_from_binary(file_path)
+
+
+# 工作进程中加载的账本，每个进程只在初始化时加载一次
+_ledger = None
+
+
+def _init_worker(ledger_path: str):
+    """
+    工作进程初始化函数，设置图表字体并加载账本
+    """
+    global _ledger
+    configure_fonts()
+    _ledger = load_ledger(ledger_path)
+
+
+def _export_chart(spec: dict) -> str:
+    """
+    在工作进程中渲染并保存一张图表
+    @param spec: 图表规格字典
+    @return: 输出文件路径
+    """
+    spec = ChartSpec.from_dict(spec)
+    service = PlotService(style=spec.style)
+    fig = service.get_plot(spec.select(_ledger), spec.width)
+    fig.set_dpi(spec.dpi)
+    fig.set_size_inches(spec.width / spec.dpi, spec.height / spec.dpi)
+    directory = os.path.dirname(spec.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(spec.output, format=os.path.splitext(spec.output)[1][1:].lower())
+    return spec.output
+
+
+def export_charts(
+        ledger_path: str,
+        specs: list[ChartSpec],
+        processes: int = None) -> list[str]:
+    """
+    按图表规格批量导出图表
+    @param ledger_path: 账本文件路径（JSON或二进制账本）
+    @param specs: 图表规格列表
+    @param processes: 工作进程数，为None时使用CPU核数；为1时在当前进程中依次导出
+    @return: 按规格顺序排列的输出文件路径
+    """
+    payload = [spec.to_dict() for spec in specs]
+    if processes == 1:
+        _init_worker(ledger_path)
+        return [_export_chart(spec) for spec in payload]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(ledger_path,)) as executor:
+        return list(executor.map(_export_chart, payload))
+
+
+def main():
+    """
+    命令行入口
+    """
+    parser = argparse.ArgumentParser(description="批量图表导出")
+    parser.add_argument("ledger", help="账本文件（JSON或二进制账本）")
+    parser.add_argument("specs", help="图表规格JSON文件")
+    parser.add_argument("--processes", type=int, default=None, help="工作进程数")
+    args = parser.parse_args()
+
+    with open(args.specs, "r", encoding="utf-8") as f:
+        specs = [ChartSpec.from_dict(d) for d in json.load(f)]
+    for output in export_charts(args.ledger, specs, args.processes):
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
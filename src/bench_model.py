@@ -0,0 +1,112 @@
+"""
+交易模型内存与排序基准
+
+对比旧版基于__dict__、逐字段比较的模型与当前基于__slots__、纪元分钟数比较的模型，
+输出每笔交易占用的字节数和按时间排序的耗时。
+
+用法：python -m src.bench_model [--count N]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from src.transaction import Transaction, TransactionType, Category, CategoryType, DateTime
+
+
+class _LegacyCategory:
+    """
+    旧版交易类别类
+    """
+    def __init__(self, category_type: CategoryType, name: str = ""):
+        self.category_type = category_type
+        self.name = name if category_type == CategoryType.OTHER else category_type.value
+
+
+class _LegacyDateTime:
+    """
+    旧版日期时间类，保存五个字段并逐字段比较
+    """
+    def __init__(self, year, month, day, hour=0, minute=0):
+        self.year = year
+        self.month = month
+        self.day = day
+        self.hour = hour
+        self.minute = minute
+
+    def __lt__(self, other):
+        if self.year != other.year:
+            return self.year < other.year
+        if self.month != other.month:
+            return self.month < other.month
+        if self.day != other.day:
+            return self.day < other.day
+        if self.hour != other.hour:
+            return self.hour < other.hour
+        return self.minute < other.minute
+
+
+class _LegacyTransaction:
+    """
+    旧版交易类
+    """
+    def __init__(self, name, amount, transaction_type, category, datetime, remarks=""):
+        self.name = name
+        self.amount = amount
+        self.transaction_type = transaction_type
+        self.category = category
+        self.datetime = datetime
+        self.remarks = remarks
+
+
+def _random_fields(count: int, seed: int = 0) -> list[tuple]:
+    """
+    生成随机交易字段，名称取自少量重复的商户名
+    """
+    rng = random.Random(seed)
+    names = [f"Merchant {i}" for i in range(200)]
+    return [(rng.choice(names), round(rng.uniform(1, 1000), 2),
+             rng.choice(list(TransactionType)), rng.choice(list(CategoryType)),
+             (rng.randint(2000, 2030), rng.randint(1, 12), rng.randint(1, 28),
+              rng.randint(0, 23), rng.randint(0, 59)))
+            for _ in range(count)]
+
+
+def _measure(fields: list[tuple], transaction_cls, category_cls, datetime_cls) -> tuple[float, float]:
+    """
+    构造交易对象并测量每笔交易的字节数与排序耗时
+    @return: (每笔交易字节数, 排序秒数)
+    """
+    categories = {ct: category_cls(ct) for ct in CategoryType}
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    transactions = [transaction_cls(name, amount, transaction_type, categories[category_type],
+                                    datetime_cls(*moment))
+                    for name, amount, transaction_type, category_type, moment in fields]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    sorted(transactions, key=lambda t: t.datetime)
+    elapsed = time.perf_counter() - start
+    return (after - before) / len(transactions), elapsed
+
+
+def main():
+    """
+    运行基准并打印结果
+    """
+    parser = argparse.ArgumentParser(description="交易模型内存与排序基准")
+    parser.add_argument("--count", type=int, default=200000, help="交易数量")
+    args = parser.parse_args()
+
+    fields = _random_fields(args.count)
+    legacy = _measure(fields, _LegacyTransaction, _LegacyCategory, _LegacyDateTime)
+    current = _measure(fields, Transaction, Category, DateTime)
+    print(f"transactions: {args.count}")
+    print(f"{'model':<10}{'bytes/transaction':>20}{'sort seconds':>16}")
+    print(f"{'before':<10}{legacy[0]:>20.1f}{legacy[1]:>16.3f}")
+    print(f"{'after':<10}{current[0]:>20.1f}{current[1]:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+多进程分组聚合基准
+
+在列式仓库上对比单进程与多进程的分组聚合耗时，并测量插入一笔交易后第一次并行分组的耗时
+（包括将数组列重新复制到共享内存）。多进程只在CPU核数大于1时才可能更快，
+单核机器上ParallelAggregator总是在当前进程中计算。
+
+用法：python -m src.bench_parallel [--count N] [--processes P] [--repeat R]
+"""
+
+import argparse
+import os
+import random
+import time
+from src.columnar_repository import ColumnarTransactionRepository
+from src.transaction import Transaction, TransactionType, Category, CategoryType, DateTime
+
+
+def _random_repository(count: int, seed: int = 0) -> ColumnarTransactionRepository:
+    """
+    生成时间跨度约二十年的随机列式仓库
+    """
+    rng = random.Random(seed)
+    categories = [Category(ct) for ct in CategoryType if ct != CategoryType.OTHER]
+    origin = DateTime(2005, 1, 1).to_minutes()
+    return ColumnarTransactionRepository([
+        Transaction(f"Merchant {rng.randrange(200)}", round(rng.uniform(1, 1000), 2),
+                    rng.choice(list(TransactionType)), rng.choice(categories),
+                    DateTime.from_minutes(origin + rng.randrange(20 * 365 * 1440)))
+        for _ in range(count)])
+
+
+def _best(run, repeat: int) -> float:
+    """
+    重复执行并返回最短耗时（秒）
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """
+    运行基准并打印结果
+    """
+    parser = argparse.ArgumentParser(description="多进程分组聚合基准")
+    parser.add_argument("--count", type=int, default=1_000_000, help="交易数量")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="工作进程数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数")
+    args = parser.parse_args()
+
+    repo = _random_repository(args.count)
+    cases = (
+        ("group_by month", lambda: repo.group_by("month").count()),
+        ("group_by category", lambda: repo.group_by("category").agg("sum", "max")),
+        ("expense group_by day", lambda: repo.query().type(TransactionType.EXPENSE).group_by("day").sum()),
+    )
+    sequential = [_best(run, args.repeat) for _, run in cases]
+    # 强制使用多进程，单核机器上也能测出多进程的开销
+    repo.set_parallel(processes=max(args.processes, 2), threshold=0)
+    try:
+        for _, run in cases:
+            run()
+        parallel = [_best(run, args.repeat) for _, run in cases]
+        after_insert = []
+        for _, run in cases:
+            repo.insert(Transaction("Bench", 1.0, TransactionType.EXPENSE, Category(CategoryType.FOOD),
+                                    DateTime(2015, 6, 1, 12, 0)))
+            after_insert.append(_best(run, 1))
+    finally:
+        repo.parallel.close()
+    print(f"transactions: {args.count}  processes: {max(args.processes, 2)}  cpus: {os.cpu_count()}")
+    print(f"{'query':<24}{'sequential':>12}{'parallel':>12}{'after insert':>14}")
+    for (label, _), seq, par, ins in zip(cases, sequential, parallel, after_insert):
+        print(f"{label:<24}{seq:>12.3f}{par:>12.3f}{ins:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
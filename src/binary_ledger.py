@@ -0,0 +1,350 @@
+"""
+二进制账本格式模块
+
+文件布局（小端序）：
+    文件头    64字节：魔数、版本、记录数、字符串数、字符串表偏移、类别表偏移
+    记录区    每条32字节定长记录：金额、纪元分钟数、类别编号、名称编号、备注编号、交易类型
+    字符串表  (字符串数+1)个uint64偏移量，随后是UTF-8编码的字符串内容（名称与备注去重保存）；
+              名称或备注为None时编号为-1（版本2起），与空字符串区分
+    类别表    UTF-8编码的JSON数组，保存各类别编号对应的类别名称
+"""
+
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from src.transaction import DateTime
+from src.json_stream import JsonArrayReader, JsonArrayWriter
+
+
+MAGIC = b"TXLEDGER"
+VERSION = 2
+# 可以读取的格式版本，版本1的文件没有None字符串，其余布局相同
+READABLE_VERSIONS = (1, 2)
+# 表示None的字符串编号
+NULL_STRING = -1
+HEADER = struct.Struct("<8sIQQQQ")
+HEADER_SIZE = 64
+RECORD_DTYPE = np.dtype({
+    "names": ["amount", "minutes", "category", "name", "remarks", "type"],
+    "formats": ["<f8", "<i8", "<i4", "<i4", "<i4", "i1"],
+    "offsets": [0, 8, 16, 20, 24, 28],
+    "itemsize": 32,
+})
+
+
+class StringTable:
+    """
+    映射在缓冲区上的字符串表，按需解码，同一编号只解码一次
+    """
+    def __init__(self, buffer, offset: int, count: int):
+        """
+        初始化字符串表
+        @param buffer: 文件缓冲区
+        @param offset: 字符串表在缓冲区中的偏移
+        @param count: 字符串数量
+        """
+        self._buffer = buffer
+        self._offsets = np.frombuffer(buffer, "<u8", count + 1, offset)
+        self._base = offset + 8 * (count + 1)
+        self._ids = None
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str | None:
+        index = int(index)
+        if index == NULL_STRING:
+            return None
+        value = self._decoded.get(index)
+        if value is None:
+            start = self._base + int(self._offsets[index])
+            end = self._base + int(self._offsets[index + 1])
+            value = self._buffer[start:end].decode("utf-8")
+            self._decoded[index] = value
+        return value
+
+    def find(self, value: str) -> int:
+        """
+        查找字符串的编号，不存在时返回-1；value为None时返回NULL_STRING
+        """
+        if value is None:
+            return NULL_STRING
+        if self._ids is None:
+            self._ids = {self._buffer[self._base + int(self._offsets[i]):
+                                      self._base + int(self._offsets[i + 1])].decode("utf-8"): i
+                         for i in range(len(self))}
+        return self._ids.get(value, -1)
+
+
+class MappedStrings:
+    """
+    由字符串编号列和字符串表组成的只读字符串序列
+    """
+    def __init__(self, ids: np.ndarray, table: StringTable):
+        """
+        初始化字符串序列
+        @param ids: 每行的字符串编号
+        @param table: 字符串表
+        """
+        self._ids = ids
+        self._table = table
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, index: int) -> str | None:
+        return self._table[self._ids[index]]
+
+    def __iter__(self):
+        for i in self._ids:
+            yield self._table[i]
+
+    def equals(self, value: str) -> np.ndarray:
+        """
+        获取等于指定字符串的行的布尔掩码
+        """
+        sid = self._table.find(value)
+        if sid == -1 and value is not None:
+            return np.zeros(len(self._ids), dtype=np.bool_)
+        return self._ids == sid
+
+    def starts_with(self, prefix: str) -> np.ndarray:
+        """
+        获取以指定前缀开头的行的布尔掩码，每个不同的字符串只比较一次
+        """
+        ids = [i for i in range(len(self._table)) if self._table[i].startswith(prefix)]
+        return np.isin(self._ids, ids)
+
+    def map_distinct(self, function, dtype) -> np.ndarray:
+        """
+        对每行的字符串求函数值，每个不同的字符串只计算一次
+        @param function: 接受字符串或None的函数
+        @param dtype: 结果的NumPy数据类型
+        """
+        # 最后一项是None的函数值，编号NULL_STRING（-1）恰好索引到它
+        values = np.fromiter((function(self._table[i]) for i in range(len(self._table))),
+                             dtype, len(self._table))
+        values = np.append(values, np.array([function(None)], dtype=dtype))
+        return values[self._ids]
+
+    def index(self, value: str) -> int:
+        """
+        获取第一个等于指定字符串的行号，不存在时抛出ValueError
+        """
+        hits = np.flatnonzero(self.equals(value))
+        if not len(hits):
+            raise ValueError(f"{value!r} is not in sequence")
+        return int(hits[0])
+
+
+class BinaryLedgerWriter:
+    """
+    二进制账本写入器，逐行写出定长记录，字符串去重后写入字符串表，None写为NULL_STRING；
+    先写入临时文件，关闭时写入磁盘后再替换目标文件，目标文件即使仍被内存映射也不会被截断
+    """
+    def __init__(self, file_path: str, chunk_size: int = 65536):
+        """
+        初始化写入器
+        @param file_path: 文件路径
+        @param chunk_size: 记录缓冲区大小
+        """
+        self._path = file_path
+        self._temp_path = file_path + ".tmp"
+        self._file = open(self._temp_path, "wb")
+        self._file.write(b"\0" * HEADER_SIZE)
+        self._chunk = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        self._pending = 0
+        self._count = 0
+        self._string_ids = {}
+        self._strings = []
+        self._category_ids = {}
+        self._categories = []
+
+    def _string_id(self, value: str | None) -> int:
+        if value is None:
+            return NULL_STRING
+        sid = self._string_ids.get(value)
+        if sid is None:
+            sid = len(self._strings)
+            self._strings.append(value.encode("utf-8"))
+            self._string_ids[value] = sid
+        return sid
+
+    def _category_id(self, category_name) -> int:
+        cid = self._category_ids.get(category_name)
+        if cid is None:
+            cid = len(self._categories)
+            self._categories.append(category_name)
+            self._category_ids[category_name] = cid
+        return cid
+
+    def append(
+            self,
+            amount: float,
+            minutes: int,
+            type_code: int,
+            category_name,
+            name: str,
+            remarks: str):
+        """
+        写出一行记录
+        @param amount: 金额
+        @param minutes: 纪元分钟数
+        @param type_code: 交易类型编码
+        @param category_name: 类别名称
+        @param name: 交易名称，可以为None
+        @param remarks: 备注，可以为None
+        """
+        self._chunk[self._pending] = (
+            amount, minutes, self._category_id(category_name),
+            self._string_id(name), self._string_id(remarks), type_code)
+        self._pending += 1
+        if self._pending == len(self._chunk):
+            self._flush()
+
+    def _flush(self):
+        self._file.write(self._chunk[:self._pending].tobytes())
+        self._count += self._pending
+        self._pending = 0
+
+    def close(self):
+        """
+        写出字符串表、类别表和文件头，写入磁盘后替换目标文件
+        """
+        try:
+            self._write_tables()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._temp_path, self._path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """
+        放弃写入，删除临时文件，目标文件保持不变
+        """
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def _write_tables(self):
+        """
+        写出剩余记录、字符串表、类别表和文件头
+        """
+        self._flush()
+        strings_offset = self._file.tell()
+        offsets = np.zeros(len(self._strings) + 1, dtype="<u8")
+        np.cumsum([len(s) for s in self._strings], out=offsets[1:])
+        self._file.write(offsets.tobytes())
+        for s in self._strings:
+            self._file.write(s)
+        categories_offset = self._file.tell()
+        self._file.write(json.dumps(self._categories, ensure_ascii=False).encode("utf-8"))
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, self._count, len(self._strings),
+                                     strings_offset, categories_offset))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class BinaryLedger:
+    """
+    以内存映射方式打开的二进制账本，数据列均为映射缓冲区上的零拷贝视图；
+    可以用作上下文管理器，退出时关闭映射
+    """
+    def __init__(self, file_path: str):
+        """
+        打开二进制账本
+        @param file_path: 文件路径
+        """
+        with open(file_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER_SIZE:
+                raise ValueError(f"Not a binary ledger: {file_path}")
+            magic, version, count, string_count, strings_offset, categories_offset = \
+                HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Not a binary ledger: {file_path}")
+            if version not in READABLE_VERSIONS:
+                raise ValueError(f"Unsupported binary ledger version: {version}")
+        except ValueError:
+            self._mmap.close()
+            raise
+        self.records = np.frombuffer(self._mmap, RECORD_DTYPE, count, HEADER_SIZE)
+        self.strings = StringTable(self._mmap, strings_offset, string_count)
+        self.category_names = json.loads(self._mmap[categories_offset:].decode("utf-8"))
+
+    def __len__(self):
+        return len(self.records)
+
+    def close(self):
+        """
+        关闭内存映射；仍有数组视图引用映射缓冲区时，映射在视图释放后由垃圾回收关闭
+        """
+        self.records = None
+        self.strings = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def iter_rows(self):
+        """
+        逐行产出(金额, 纪元分钟数, 交易类型编码, 类别名称, 名称, 备注)
+        """
+        for record in self.records:
+            yield (float(record["amount"]), int(record["minutes"]), int(record["type"]),
+                   self.category_names[record["category"]],
+                   self.strings[record["name"]], self.strings[record["remarks"]])
+
+
+def json_to_binary(json_path: str, binary_path: str):
+    """
+    将JSON账本流式转换为二进制账本
+    @param json_path: JSON文件路径
+    @param binary_path: 二进制文件路径
+    """
+    with open(json_path, "r", encoding="utf-8") as f, BinaryLedgerWriter(binary_path) as writer:
+        for d in JsonArrayReader(f):
+            writer.append(float(d.get("amount")),
+                          DateTime.from_string(d.get("datetime")).to_minutes(),
+                          d.get("transaction_type"), d.get("category"),
+                          d.get("name"), d.get("remarks"))
+
+
+def binary_to_json(binary_path: str, json_path: str):
+    """
+    将二进制账本流式转换为JSON账本
+    @param binary_path: 二进制文件路径
+    @param json_path: JSON文件路径
+    """
+    with BinaryLedger(binary_path) as ledger, open(json_path, "w", encoding="utf-8") as f, \
+            JsonArrayWriter(f) as writer:
+        for amount, minutes, type_code, category, name, remarks in ledger.iter_rows():
+            writer.write({
+                "name": name,
+                "datetime": str(DateTime.from_minutes(minutes)),
+                "amount": amount,
+                "transaction_type": type_code,
+                "category": category,
+                "remarks": remarks
+            })
@@ -0,0 +1,614 @@
+"""
+列式交易仓库模块
+"""
+
+import numpy as np
+from src.transaction import Transaction, TransactionType, Category, CategoryDictionary, DateTime
+from src.binary_ledger import BinaryLedger, MappedStrings
+from src.transaction_query import TransactionQuery, merge_groups
+from src.indexes import AmountStats, normalize_text
+from src.parallel_aggregation import ParallelAggregator, PARALLEL_THRESHOLD, group_amounts
+from src.transaction_repository import TransactionRepository
+
+
+class _Column:
+    """
+    可增长的连续数组列，按容量倍增方式追加元素
+    """
+    def __init__(self, dtype, values=None, copy: bool = True):
+        """
+        初始化数组列
+        @param dtype: 元素的NumPy数据类型
+        @param values: 初始元素
+        @param copy: 是否复制初始元素；为False时直接引用（例如内存映射视图），首次修改时再复制
+        """
+        data = np.asarray(values if values is not None else [], dtype=dtype)
+        self._data = data.copy() if copy else data
+        self._owned = copy
+        self._size = len(data)
+
+    def _own(self):
+        """
+        修改前确保数据归本列所有
+        """
+        if not self._owned:
+            self._data = np.array(self._data[:self._size])
+            self._owned = True
+
+    def append(self, value):
+        """
+        追加一个元素
+        """
+        self._own()
+        if self._size == len(self._data):
+            self._reserve(max(16, 2 * self._size))
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values: np.ndarray):
+        """
+        追加一组元素
+        """
+        self._own()
+        count = len(values)
+        if self._size + count > len(self._data):
+            self._reserve(max(16, 2 * self._size, self._size + count))
+        self._data[self._size:self._size + count] = values
+        self._size += count
+
+    def delete(self, index: int):
+        """
+        删除指定位置的元素
+        """
+        self._own()
+        self._data[index:self._size - 1] = self._data[index + 1:self._size]
+        self._size -= 1
+
+    def values(self) -> np.ndarray:
+        """
+        获取有效元素的数组视图
+        """
+        return self._data[:self._size]
+
+    def _reserve(self, capacity: int):
+        """
+        扩充容量
+        """
+        data = np.empty(capacity, dtype=self._data.dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+
+class ColumnarTransactionRepository(TransactionRepository):
+    """
+    列式交易仓库类，将金额、时间、类型和类别保存在连续数组中，
+    聚合与过滤以向量化方式执行，仅在get_all()时构造交易对象
+    """
+    # 多进程分组聚合器，为None时分组都在当前进程中计算
+    parallel = None
+
+    def __init__(self, transactions: list[Transaction] = None):
+        self._amounts = _Column(np.float64)
+        self._minutes = _Column(np.int64)
+        self._types = _Column(np.int8)
+        self._categories = _Column(np.int32)
+        self._names = []
+        self._remarks = []
+        self._category_dictionary = CategoryDictionary()
+        self._materialized = None
+        self._ledger = None
+        if transactions:
+            self.extend(transactions)
+
+    @property
+    def transactions(self) -> list[Transaction]:
+        """
+        交易记录列表（按需构造）
+        """
+        return self.get_all()
+
+    def _own_columns(self):
+        """
+        修改前将映射的数组列复制到内存、名称和备注序列转换为列表，之后关闭不再引用的二进制账本
+        """
+        if self._ledger is None:
+            return
+        for column in (self._amounts, self._minutes, self._types, self._categories):
+            column._own()
+        self._names = list(self._names)
+        self._remarks = list(self._remarks)
+        self._close_ledger()
+
+    def _close_ledger(self):
+        """
+        关闭以内存映射方式打开的二进制账本
+        """
+        if self._ledger is not None:
+            self._ledger.close()
+            self._ledger = None
+
+    def insert(self, transaction: Transaction):
+        """
+        插入交易记录
+        """
+        self._own_columns()
+        self._amounts.append(transaction.amount)
+        self._minutes.append(transaction.datetime.to_minutes())
+        self._types.append(transaction.transaction_type.value)
+        self._categories.append(self._category_dictionary.encode(transaction.category))
+        self._names.append(transaction.name)
+        self._remarks.append(transaction.remarks)
+        if self._materialized is not None:
+            self._materialized.append(transaction)
+        self.version += 1
+
+    def extend(self, transactions: list[Transaction]):
+        """
+        批量插入交易记录
+        @param transactions: 交易记录列表
+        """
+        self._own_columns()
+        transactions = list(transactions)
+        count = len(transactions)
+        self._amounts.extend(np.fromiter(
+            (t.amount for t in transactions), np.float64, count))
+        self._minutes.extend(np.fromiter(
+            (t.datetime.to_minutes() for t in transactions), np.int64, count))
+        self._types.extend(np.fromiter(
+            (t.transaction_type.value for t in transactions), np.int8, count))
+        self._categories.extend(np.fromiter(
+            (self._category_dictionary.encode(t.category) for t in transactions), np.int32, count))
+        self._names.extend(t.name for t in transactions)
+        self._remarks.extend(t.remarks for t in transactions)
+        if self._materialized is not None:
+            self._materialized.extend(transactions)
+        self.version += 1
+
+    def erase(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        index = self._find_row(transaction)
+        if index is None:
+            raise ValueError("transaction not in repository")
+        self._own_columns()
+        for column in (self._amounts, self._minutes, self._types, self._categories):
+            column.delete(index)
+        del self._names[index]
+        del self._remarks[index]
+        if self._materialized is not None:
+            del self._materialized[index]
+        self.version += 1
+
+    def _find_row(self, transaction: Transaction) -> int | None:
+        """
+        查找交易记录所在的行号
+        """
+        if self._materialized is not None:
+            for i, t in enumerate(self._materialized):
+                if t is transaction:
+                    return i
+        code = self._category_dictionary.code_of(transaction.category.name)
+        if code < 0:
+            return None
+        mask = ((self._minutes.values() == transaction.datetime.to_minutes()) &
+                (self._amounts.values() == transaction.amount) &
+                (self._types.values() == transaction.transaction_type.value) &
+                (self._categories.values() == code))
+        for i in np.flatnonzero(mask):
+            if (self._names[i] == transaction.name and
+                    self._remarks[i] == transaction.remarks):
+                return int(i)
+        return None
+
+    def _take(self, indices: np.ndarray) -> 'ColumnarTransactionRepository':
+        """
+        按行号（或布尔掩码）选取行，构造新的列式仓库
+        """
+        if indices.dtype == np.bool_:
+            indices = np.flatnonzero(indices)
+        repo = ColumnarTransactionRepository()
+        repo._amounts = _Column(np.float64, self._amounts.values()[indices])
+        repo._minutes = _Column(np.int64, self._minutes.values()[indices])
+        repo._types = _Column(np.int8, self._types.values()[indices])
+        repo._categories = _Column(np.int32, self._categories.values()[indices])
+        repo._names = [self._names[i] for i in indices]
+        repo._remarks = [self._remarks[i] for i in indices]
+        repo._category_dictionary = self._category_dictionary.copy()
+        return repo
+
+    def _indices(self, query: TransactionQuery) -> np.ndarray:
+        """
+        将查询的全部条件融合为一个布尔掩码，返回满足条件的行号
+        """
+        if not query.has_filters():
+            indices = np.arange(self.get_count())
+        else:
+            mask = np.ones(self.get_count(), dtype=np.bool_)
+            if query.transaction_type is not None:
+                mask &= self._types.values() == query.transaction_type.value
+            if query.category_name is not None:
+                mask &= self._categories.values() == \
+                    self._category_dictionary.code_of(query.category_name)
+            if query.name_value is not None:
+                mask &= self._name_mask(query.name_value)
+            if query.name_prefix_value is not None:
+                mask &= self._name_prefix_mask(query.name_prefix_value)
+            if query.text_terms is not None:
+                mask &= self._text_mask(query.text_terms, query.text_match_all)
+            if query.has_time_range():
+                minutes = self._minutes.values()
+                mask &= minutes >= query.start if query.include_start else minutes > query.start
+                mask &= minutes <= query.end if query.include_end else minutes < query.end
+            indices = np.flatnonzero(mask)
+        if query.ordered:
+            order = np.argsort(self._minutes.values()[indices], kind="stable")
+            indices = indices[order]
+        return indices
+
+    def _name_mask(self, name: str) -> np.ndarray:
+        """
+        获取名称等于指定值的行的布尔掩码
+        """
+        if isinstance(self._names, MappedStrings):
+            return self._names.equals(name)
+        return np.fromiter((n == name for n in self._names), np.bool_, self.get_count())
+
+    def _name_prefix_mask(self, prefix: str) -> np.ndarray:
+        """
+        获取名称以指定前缀开头的行的布尔掩码
+        """
+        if isinstance(self._names, MappedStrings):
+            return self._names.starts_with(prefix)
+        return np.fromiter(((n or "").startswith(prefix) for n in self._names),
+                           np.bool_, self.get_count())
+
+    def _text_mask(self, terms: tuple[str, ...], match_all: bool) -> np.ndarray:
+        """
+        获取名称或备注包含检索词的行的布尔掩码；
+        每个不同的字符串只规范化一次，得到包含的检索词的位掩码，再按行合并名称和备注
+        """
+        def term_bits(s):
+            s = normalize_text(s)
+            return sum(1 << i for i, term in enumerate(terms) if term in s)
+
+        bits = self._map_strings(self._names, term_bits) | self._map_strings(self._remarks, term_bits)
+        if match_all:
+            return bits == (1 << len(terms)) - 1
+        return bits != 0
+
+    def _map_strings(self, strings, function) -> np.ndarray:
+        """
+        对名称或备注列的每行求整数函数值，每个不同的字符串只计算一次
+        """
+        if isinstance(strings, MappedStrings):
+            return strings.map_distinct(function, np.int64)
+        values = {}
+        for s in strings:
+            if s not in values:
+                values[s] = function(s)
+        return np.fromiter((values[s] for s in strings), np.int64, len(strings))
+
+    def _select(self, query: TransactionQuery) -> list[Transaction]:
+        """
+        执行查询，仅构造满足条件的交易对象
+        """
+        indices = query.window(self._indices(query))
+        if self._materialized is not None:
+            return [self._materialized[i] for i in indices]
+        return [self._row(i) for i in indices]
+
+    def _query_repository(self, query: TransactionQuery) -> 'ColumnarTransactionRepository':
+        """
+        执行查询并物化为新的列式仓库
+        """
+        return self._take(query.window(self._indices(query)))
+
+    def _aggregate(self, query: TransactionQuery, op: str):
+        """
+        对查询结果进行向量化聚合
+        @param op: 聚合方式，可选"count"、"sum"、"mean"、"max"、"min"
+        """
+        amounts = self._amounts.values()
+        if query.has_filters():
+            amounts = amounts[self._indices(query)]
+        if op == "count":
+            return len(amounts)
+        if op == "sum":
+            return float(amounts.sum())
+        if not len(amounts):
+            return 0.0
+        if op == "mean":
+            return float(amounts.mean())
+        if op == "max":
+            return float(amounts.max())
+        if op == "min":
+            return float(amounts.min())
+        raise ValueError(f"Unknown aggregation: {op}")
+
+    def _group(self, query: TransactionQuery, key: str, extremes: bool = True) -> dict:
+        """
+        以向量化方式按分组键计算每个分组的金额统计
+        @param key: 分组键
+        @param extremes: 是否需要最小值和最大值，此处总是一并计算
+        @return: 分组键值到AmountStats的字典
+        """
+        if self.parallel is not None and self.parallel.accepts(self, query):
+            return self.parallel.group(self, query, key)
+        if key == "category":
+            codes = self._categories.values()
+        elif key == "type":
+            codes = self._types.values()
+        else:
+            codes = self._minutes.values() // 1440
+        amounts = self._amounts.values()
+        if query.has_filters():
+            indices = self._indices(query)
+            codes = codes[indices]
+            amounts = amounts[indices]
+        rows = group_amounts(codes, amounts)
+        if key == "category":
+            decode = self._category_dictionary.decode
+            rows = [(decode(code).name, *rest) for code, *rest in rows]
+        return merge_groups(key, rows)
+
+    def _row(self, index: int) -> Transaction:
+        """
+        构造指定行的交易对象
+        """
+        return Transaction(
+            self._names[index],
+            float(self._amounts.values()[index]),
+            TransactionType(int(self._types.values()[index])),
+            self._category_dictionary.decode(self._categories.values()[index]),
+            DateTime.from_minutes(self._minutes.values()[index]),
+            self._remarks[index])
+
+    def get_all(self) -> list[Transaction]:
+        """
+        获取所有交易记录
+        """
+        if self._materialized is None:
+            self._materialized = [self._row(i) for i in range(self.get_count())]
+        return self._materialized
+
+    def get_count(self) -> int:
+        """
+        获取交易记录数量
+        """
+        return len(self._names)
+
+    def clear(self):
+        """
+        清空交易记录
+        """
+        # 直接换成新的空数组列，不必先把映射的数据复制到内存
+        self._amounts = _Column(np.float64)
+        self._minutes = _Column(np.int64)
+        self._types = _Column(np.int8)
+        self._categories = _Column(np.int32)
+        self._names = []
+        self._remarks = []
+        self._materialized = None
+        self._close_ledger()
+        self.version += 1
+
+    def _range_sum(
+            self,
+            start_time: DateTime,
+            end_time: DateTime,
+            include_start: bool,
+            include_end: bool,
+            transaction_type: TransactionType,
+            category: Category) -> tuple[int, float]:
+        """
+        获取时间范围内的(数量, 总金额)，以向量化方式计算
+        """
+        if transaction_type is not None and category is not None:
+            raise ValueError("range sums are kept per type or per category, not both")
+        query = self.query().between(start_time, end_time, include_start, include_end)
+        if transaction_type is not None:
+            query = query.type(transaction_type)
+        if category is not None:
+            query = query.category(category)
+        return query.count(), query.sum()
+
+    def get_total_amount(self) -> float:
+        """
+        获取交易记录总金额
+        """
+        return float(self._amounts.values().sum())
+
+    def get_average_amount(self) -> float:
+        """
+        获取交易记录平均金额
+        """
+        if not self.get_count():
+            return 0.0
+        return float(self._amounts.values().mean())
+
+    def get_max_amount(self) -> float:
+        """
+        获取交易记录最大金额
+        """
+        if not self.get_count():
+            return 0.0
+        return float(self._amounts.values().max())
+
+    def get_min_amount(self) -> float:
+        """
+        获取交易记录最小金额
+        """
+        if not self.get_count():
+            return 0.0
+        return float(self._amounts.values().min())
+
+    def get_stats(
+            self,
+            transaction_type: TransactionType = None,
+            category: Category = None) -> AmountStats:
+        """
+        获取金额统计（数量、总额、均值、最小值、最大值），以向量化方式计算
+        @param transaction_type: 交易类型，为None时统计全部类型
+        @param category: 交易类别，为None时统计全部类别；不能与交易类型同时指定
+        """
+        if transaction_type is not None and category is not None:
+            raise ValueError("stats are kept per type or per category, not both")
+        query = self.query()
+        if transaction_type is not None:
+            query = query.type(transaction_type)
+        if category is not None:
+            query = query.category(category)
+        amounts = self._amounts.values()[self._indices(query)]
+        if not len(amounts):
+            return AmountStats()
+        return AmountStats(len(amounts), float(amounts.sum()),
+                           float(amounts.min()), float(amounts.max()))
+
+    def _parallel_columns(self) -> tuple[dict, CategoryDictionary]:
+        """
+        获取多进程分组使用的数组列，直接返回列式存储的数组
+        @return: ("amounts"、"minutes"、"types"、"categories"到数组的字典, 类别编码对应的类别字典)
+        """
+        return {
+            "amounts": self._amounts.values(),
+            "minutes": self._minutes.values(),
+            "types": self._types.values(),
+            "categories": self._categories.values(),
+        }, self._category_dictionary
+
+    def get_category_codes(self) -> tuple[np.ndarray, CategoryDictionary]:
+        """
+        获取字典编码后的交易类别，直接返回类别编号列
+        @return: (每笔交易的类别编号, 编号对应的类别字典)
+        """
+        return self._categories.values(), self._category_dictionary
+
+    def get_type_codes(self) -> np.ndarray:
+        """
+        获取每笔交易的交易类型编码，直接返回类型编码列
+        """
+        return self._types.values()
+
+    def find_by_name(self, name: str) -> Transaction | None:
+        """
+        根据名称查找交易记录
+        @param name: 交易名称
+        """
+        try:
+            index = self._names.index(name)
+        except ValueError:
+            return None
+        if self._materialized is not None:
+            return self._materialized[index]
+        return self._row(index)
+
+    def find_all_by_name(self, name: str) -> list[Transaction]:
+        """
+        根据名称查找所有匹配的交易记录
+        @param name: 交易名称
+        """
+        indices = np.flatnonzero(self._name_mask(name))
+        if self._materialized is not None:
+            return [self._materialized[i] for i in indices]
+        return [self._row(i) for i in indices]
+
+    def set_parallel(self, enabled: bool = True, processes: int = None, threshold: int = PARALLEL_THRESHOLD):
+        """
+        开启或关闭多进程分组聚合；开启后行数不少于threshold时，不含名称条件的分组
+        按分片在进程池中并行计算，数组列在每个数据版本第一次并行分组时复制到共享内存。
+        不分组的聚合总是在当前进程中计算
+        @param enabled: 是否开启
+        @param processes: 工作进程数，为None时使用CPU核数；只有一个工作进程时不使用多进程
+        @param threshold: 使用多进程的最小行数
+        """
+        if self.parallel is not None:
+            self.parallel.close()
+        self.parallel = ParallelAggregator(processes, threshold) if enabled else None
+
+    def create_index(self, name: str):
+        """
+        列式仓库直接在数组列上过滤，不需要二级索引
+        """
+
+    def drop_index(self, name: str):
+        """
+        列式仓库直接在数组列上过滤，不需要二级索引
+        """
+
+    @classmethod
+    def load_from_json(
+            cls,
+            file_path: str,
+            batch_size: int = 65536) -> 'ColumnarTransactionRepository':
+        """
+        从JSON文件流式加载交易记录，按批填充数组列，内存占用与批大小相关
+        @param file_path: 文件路径
+        @param batch_size: 每批交易记录数量
+        """
+        repo = cls()
+        batch = []
+        for t in cls.iter_from_json(file_path):
+            batch.append(t)
+            if len(batch) >= batch_size:
+                repo.extend(batch)
+                batch = []
+        repo.extend(batch)
+        return repo
+
+    @classmethod
+    def load_from_binary(cls, file_path: str) -> 'ColumnarTransactionRepository':
+        """
+        以内存映射方式打开二进制账本，数组列直接引用映射缓冲区，不读取整个文件；
+        首次修改时才复制到内存
+        @param file_path: 文件路径
+        """
+        ledger = BinaryLedger(file_path)
+        records = ledger.records
+        repo = cls()
+        repo._amounts = _Column(np.float64, records["amount"], copy=False)
+        repo._minutes = _Column(np.int64, records["minutes"], copy=False)
+        repo._types = _Column(np.int8, records["type"], copy=False)
+        repo._categories = _Column(np.int32, records["category"], copy=False)
+        repo._names = MappedStrings(records["name"], ledger.strings)
+        repo._remarks = MappedStrings(records["remarks"], ledger.strings)
+        for name in ledger.category_names:
+            repo._category_dictionary.encode_name(name)
+        repo._ledger = ledger
+        return repo
+
+    def close(self):
+        """
+        关闭仓库，释放数组列并关闭引用的二进制账本
+        """
+        self.clear()
+
+    def _iter_rows(self):
+        """
+        逐行产出(金额, 纪元分钟数, 交易类型编码, 类别名称, 名称, 备注)，不构造交易对象
+        """
+        amounts = self._amounts.values()
+        minutes = self._minutes.values()
+        types = self._types.values()
+        categories = self._categories.values()
+        for i in range(self.get_count()):
+            yield (float(amounts[i]), int(minutes[i]), int(types[i]),
+                   self._category_dictionary.decode(categories[i]).name, self._names[i], self._remarks[i])
+
+    def _iter_records(self):
+        """
+        逐条生成用于序列化的交易记录字典，不构造交易对象
+        """
+        amounts = self._amounts.values()
+        minutes = self._minutes.values()
+        types = self._types.values()
+        categories = self._categories.values()
+        for i in range(self.get_count()):
+            yield {
+                "name": self._names[i],
+                "datetime": str(DateTime.from_minutes(minutes[i])),
+                "amount": float(amounts[i]),
+                "transaction_type": int(types[i]),
+                "category": self._category_dictionary.decode(categories[i]).name,
+                "remarks": self._remarks[i]
+            }
@@ -14,17 +14,23 @@ from PyQt5.QtWidgets import (
     QTextEdit,
     QDateEdit,
     QTimeEdit,
-    QListWidget
+    QTableView,
+    QHeaderView,
+    QCheckBox,
+    QSizePolicy
+)
+from PyQt5.QtCore import Qt, QDate, QThreadPool, QTimer
+from PyQt5.QtGui import QImage, QPixmap
+from transaction_table_model import TransactionTableModel
+from src.transaction_query import search_terms
+from persistence_worker import PersistenceWorker
+from src.transaction import (
+    Transaction,
+    TransactionType,
+    Category,
+    CategoryType,
+    DateTime
 )
-import matplotlib
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from plot_service import PlotService
-from transaction import Transaction, TransactionType, Category, CategoryType, DateTime
-
-
-matplotlib.rcParams['font.family'] = 'sans-serif'
-matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
-matplotlib.rcParams['axes.unicode_minus'] = False
 
 
 class AddDialog(QDialog):
@@ -106,25 +112,77 @@ class AddDialog(QDialog):
 
 class ListDialog(QDialog):
     """
-    交易列表对话框
+    交易列表对话框，表格视图按需格式化可见行并分批加载；
+    搜索框默认按名称前缀过滤，勾选"全文"后按名称和备注全文检索；
+    名称前缀、全文检索和类型、类别、日期过滤由仓库的索引完成，每次输入无需扫描全部交易。
+    索引在后台线程中建立，全文索引在第一次勾选"全文"时才建立，建好之前搜索框仍按名称前缀过滤
     """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("交易列表")
         self.setGeometry(100, 100, 600, 300)
 
+        self.repository = parent.transaction_repo
+        # 单线程的私有线程池使索引依次建立；对话框是模态的，建立期间不会插入或删除交易，
+        # 分区仓库在GUI线程中按需加载分区时与建立索引互斥
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.index_workers = []
+        self.text_index_requested = False
+        self.text_index_ready = False
+        self.build_indexes(("name_prefix", "transaction_type", "category"))
+
         layout = QVBoxLayout()
-        self.list_widget = QListWidget()
-        layout.addWidget(self.list_widget)
+        filter_layout = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("名称前缀")
+        self.full_text_check = QCheckBox("全文")
+        self.type_combo = QComboBox()
+        self.type_combo.addItem("全部类型", None)
+        for transaction_type in TransactionType:
+            self.type_combo.addItem(str(transaction_type.value), transaction_type)
+        self.category_combo = QComboBox()
+        self.category_combo.addItem("全部类别", None)
+        # 类别选项取自类别枚举，打开对话框时不必扫描交易或加载分区；自定义名称的其他类别不单独列出
+        for category_type in CategoryType:
+            self.category_combo.addItem(str(category_type.value), Category(category_type).name)
+        self.date_check = QCheckBox("日期")
+        today = QDate.currentDate()
+        self.start_date_edit = QDateEdit(today.addMonths(-1))
+        self.end_date_edit = QDateEdit(today)
+        for date_edit in (self.start_date_edit, self.end_date_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setEnabled(False)
+        filter_layout.addWidget(self.search_edit)
+        filter_layout.addWidget(self.full_text_check)
+        filter_layout.addWidget(self.type_combo)
+        filter_layout.addWidget(self.category_combo)
+        filter_layout.addWidget(self.date_check)
+        filter_layout.addWidget(self.start_date_edit)
+        filter_layout.addWidget(self.end_date_edit)
+        layout.addLayout(filter_layout)
 
-        transactions = parent.transaction_repo.get_all()
+        self.search_edit.textChanged.connect(self.apply_filters)
+        self.full_text_check.toggled.connect(self.on_full_text_toggled)
+        self.type_combo.currentIndexChanged.connect(self.apply_filters)
+        self.category_combo.currentIndexChanged.connect(self.apply_filters)
+        self.date_check.toggled.connect(self.start_date_edit.setEnabled)
+        self.date_check.toggled.connect(self.end_date_edit.setEnabled)
+        self.date_check.toggled.connect(self.apply_filters)
+        self.start_date_edit.dateChanged.connect(self.apply_filters)
+        self.end_date_edit.dateChanged.connect(self.apply_filters)
 
-        for t in transactions:
-            item_text = f"名称: {t.name}  |  类型: {t.transaction_type.value}  " + \
-            f"|  金额: {t.amount}  |  时间: {t.datetime}  |  类别: {t.category.name}"
-            self.list_widget.addItem(item_text)
+        self.model = TransactionTableModel(self.repository, parent=self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setSelectionBehavior(QTableView.SelectRows)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
+        layout.addWidget(self.table_view)
 
-        self.list_widget.clicked.connect(self.on_item_clicked)
+        self.table_view.clicked.connect(self.on_item_clicked)
 
         close_btn = QPushButton("关闭")
         close_btn.clicked.connect(self.close)
@@ -132,17 +190,99 @@ class ListDialog(QDialog):
 
         self.setLayout(layout)
 
+    def apply_filters(self):
+        """
+        根据过滤控件构造查询并交给表格模型
+        """
+        text = self.search_edit.text()
+        terms = search_terms(text)
+        # 单个ASCII字符的检索词几乎匹配全部交易且不能由全文索引回答，改由名称前缀索引回答
+        if self.full_text_check.isChecked() and self.text_index_ready and \
+                not all(len(term) == 1 and term.isascii() for term in terms):
+            query = self.repository.query().search(text)
+        else:
+            query = self.repository.query().name_prefix(text.strip())
+        transaction_type = self.type_combo.currentData()
+        if transaction_type is not None:
+            query = query.type(transaction_type)
+        category_name = self.category_combo.currentData()
+        if category_name is not None:
+            query = query.category(category_name)
+        if self.date_check.isChecked():
+            start, end = self.start_date_edit.date(), self.end_date_edit.date().addDays(1)
+            query = query.between(DateTime(start.year(), start.month(), start.day()),
+                                  DateTime(end.year(), end.month(), end.day()),
+                                  include_start=True)
+        self.model.set_query(query)
+
+    def build_indexes(self, index_names: tuple, finished=None, failed=None):
+        """
+        在后台线程中建立仓库的索引
+        @param index_names: 索引名称
+        @param finished: 建立完成后在GUI线程中调用的函数
+        @param failed: 建立失败后在GUI线程中调用的函数，参数为错误信息
+        """
+        def task(progress):
+            for done, index_name in enumerate(index_names):
+                progress(done, len(index_names))
+                self.repository.create_index(index_name)
+
+        def on_failed(message: str):
+            print(f"建立索引失败：{message}")
+            if failed is not None:
+                failed(message)
+
+        worker = PersistenceWorker(task)
+        worker.signals.finished.connect(lambda _: self.index_workers.remove(worker))
+        worker.signals.failed.connect(lambda _: self.index_workers.remove(worker))
+        worker.signals.failed.connect(on_failed)
+        if finished is not None:
+            worker.signals.finished.connect(lambda _: finished())
+        self.index_workers.append(worker)
+        self.pool.start(worker)
+
+    def on_text_index_ready(self):
+        """
+        全文索引建立完成，重新执行当前的检索
+        """
+        self.text_index_ready = True
+        if self.full_text_check.isChecked():
+            self.search_edit.setPlaceholderText("搜索名称和备注")
+            self.apply_filters()
+
+    def on_text_index_failed(self, message: str):
+        """
+        全文索引建立失败，下次勾选"全文"时重新建立
+        """
+        self.text_index_requested = False
+        self.full_text_check.setChecked(False)
+        self.search_edit.setPlaceholderText(f"全文索引建立失败：{message}")
+
+    def on_full_text_toggled(self, checked: bool):
+        """
+        切换名称前缀过滤和全文检索，第一次切换到全文检索时在后台建立全文索引
+        """
+        if checked and not self.text_index_ready:
+            self.search_edit.setPlaceholderText("正在建立全文索引...")
+            if not self.text_index_requested:
+                self.text_index_requested = True
+                self.build_indexes(("text",), self.on_text_index_ready, self.on_text_index_failed)
+            # 全文索引建好之前仍按名称前缀过滤，结果不变
+            return
+        self.search_edit.setPlaceholderText("搜索名称和备注" if checked else "名称前缀")
+        self.apply_filters()
+
     def on_item_clicked(self, index):
         """
-        处理列表项点击事件
+        处理表格行点击事件
         """
-        item = self.list_widget.item(index.row())
-        print(f"Clicked on: {item.text()}")
+        t = self.model.transaction(index.row())
+        print(f"Clicked on: {t.name} {t.datetime}")
 
 
 class PlotDialog(QDialog):
     """
-    交易图表对话框
+    交易图表对话框，数据聚合和图表渲染在后台线程完成，渲染期间显示占位提示
     """
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -155,12 +295,25 @@ class PlotDialog(QDialog):
         self.style_combo.addItems(["bar", "line", "pie"])
         layout.addWidget(self.style_combo)
         self.style_combo.currentTextChanged.connect(self.update_plot)
+        # Matplotlib导入较慢，推迟到第一次打开图表对话框时再加载，主窗口启动时不需要
+        from plot_service import PlotService, configure_fonts
+        configure_fonts()
         self.plot_service_bar = PlotService(style="bar")
         self.plot_service_line = PlotService(style="line")
         self.plot_service_pie = PlotService(style="pie")
-        self.canvas = FigureCanvas()
-        self.update_plot()
-        layout.addWidget(self.canvas)
+        # 单线程的私有线程池使渲染任务依次执行，同一图表服务不会被并发使用
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.request_id = 0
+        self.worker = None
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(100)
+        self.resize_timer.timeout.connect(self.update_plot)
+        self.plot_label = QLabel("正在生成图表...")
+        self.plot_label.setAlignment(Qt.AlignCenter)
+        self.plot_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        layout.addWidget(self.plot_label)
         close_btn = QPushButton("关闭")
         close_btn.clicked.connect(self.close)
         layout.addWidget(close_btn)
@@ -168,7 +321,7 @@ class PlotDialog(QDialog):
 
     def update_plot(self):
         """
-        更新图表
+        更新图表，提交新的后台渲染任务并取代尚未完成的任务
         """
         style = self.style_combo.currentText()
         transactions = self.parent().transaction_repo
@@ -181,6 +334,52 @@ class PlotDialog(QDialog):
         else:
             return
 
-        fig = plot_service.get_plot(transactions)
-        self.canvas.figure = fig
-        self.canvas.draw()
+        from plot_worker import PlotWorker
+        if self.worker is not None:
+            self.worker.cancel()
+        self.request_id += 1
+        self.plot_label.clear()
+        self.plot_label.setText("正在生成图表...")
+        self.worker = PlotWorker(self.request_id, plot_service, transactions,
+                                 self.plot_label.width(), self.plot_label.height())
+        self.worker.signals.finished.connect(self.show_plot)
+        self.worker.signals.failed.connect(self.show_error)
+        self.pool.start(self.worker)
+
+    def show_plot(self, request_id: int, image: QImage):
+        """
+        显示渲染完成的图表，已被取代的请求结果将被忽略
+        """
+        if request_id != self.request_id:
+            return
+        self.worker = None
+        self.plot_label.setPixmap(QPixmap.fromImage(image))
+
+    def show_error(self, request_id: int, message: str):
+        """
+        显示渲染失败信息
+        """
+        if request_id != self.request_id:
+            return
+        self.worker = None
+        self.plot_label.setText(f"图表生成失败：{message}")
+
+    def resizeEvent(self, event):
+        """
+        窗口大小变化后延迟重新渲染，连续调整大小时只渲染一次
+        """
+        super().resizeEvent(event)
+        self.resize_timer.start()
+
+    def done(self, result):
+        """
+        关闭对话框时取消渲染任务并释放缓存的图表
+        """
+        self.resize_timer.stop()
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+        self.pool.waitForDone()
+        for plot_service in (self.plot_service_bar, self.plot_service_line, self.plot_service_pie):
+            plot_service.close()
+        super().done(result)
@@ -0,0 +1,63 @@
+"""
+时间序列降采样模块
+"""
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    最大三角形三桶（Largest-Triangle-Three-Buckets）降采样，保留折线的视觉形状
+    @param x: 按升序排列的横坐标
+    @param y: 纵坐标
+    @param threshold: 输出点数，不少于3；点数不超过该值时原样保留
+    @return: 保留的点的下标
+    """
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # 首尾两点固定保留，中间的点均分为threshold - 2个桶
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax(x: np.ndarray, y: np.ndarray, buckets: int) -> np.ndarray:
+    """
+    按横坐标等宽分桶，每桶保留最小值和最大值两个点，适合每个像素一桶的绘制
+    @param x: 按升序排列的横坐标
+    @param y: 纵坐标
+    @param buckets: 桶数量；点数不超过桶数量的两倍时原样保留
+    @return: 保留的点的下标，按横坐标排列
+    """
+    count = len(x)
+    if count <= 2 * buckets or buckets < 1:
+        return np.arange(count)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bounds = np.linspace(x[0], x[-1], buckets + 1)[1:-1]
+    starts = np.concatenate(([0], np.searchsorted(x, bounds, side="left"), [count]))
+    selected = []
+    for start, end in zip(starts[:-1], starts[1:]):
+        if start == end:
+            continue
+        low = start + int(y[start:end].argmin())
+        high = start + int(y[start:end].argmax())
+        selected.extend((low, high) if low <= high else (high, low))
+    return np.unique(selected)
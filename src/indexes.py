@@ -0,0 +1,893 @@
+"""
+交易索引模块
+"""
+
+import heapq
+import operator
+import unicodedata
+from array import array
+from collections import defaultdict
+from itertools import filterfalse
+from bisect import bisect_left, bisect_right
+from datetime import date
+import numpy as np
+from src.transaction import Transaction
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class HashIndex:
+    """
+    哈希索引，按键值将交易记录分桶，支持O(1)查找
+    """
+    def __init__(self, key, transactions: list[Transaction] = ()):
+        """
+        初始化哈希索引
+        @param key: 从交易记录提取键值的函数
+        @param transactions: 初始交易记录
+        """
+        self._key = key
+        self._buckets = {}
+        for t in transactions:
+            self.add(t)
+
+    def add(self, transaction: Transaction):
+        """
+        添加交易记录
+        """
+        self._buckets.setdefault(self._key(transaction), []).append(transaction)
+
+    def remove(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        key = self._key(transaction)
+        bucket = self._buckets.get(key, [])
+        for i, t in enumerate(bucket):
+            if t is transaction:
+                del bucket[i]
+                if not bucket:
+                    del self._buckets[key]
+                return
+        raise ValueError("transaction not in index")
+
+    def clear(self):
+        """
+        清空索引
+        """
+        self._buckets.clear()
+
+    def get(self, key) -> list[Transaction]:
+        """
+        获取键值对应的交易记录，按插入顺序排列
+        @param key: 键值
+        """
+        return self._buckets.get(key, [])
+
+
+class TimeIndex:
+    """
+    时间索引，按交易时间有序保存交易记录，支持二分查找的范围查询
+    """
+    def __init__(self, transactions: list[Transaction] = ()):
+        """
+        初始化时间索引
+        @param transactions: 初始交易记录
+        """
+        pairs = sorted(
+            ((t.datetime.to_minutes(), t) for t in transactions),
+            key=lambda pair: pair[0])
+        self._keys = [key for key, _ in pairs]
+        self._items = [t for _, t in pairs]
+
+    def add(self, transaction: Transaction):
+        """
+        添加交易记录，相同时间的记录保持插入顺序
+        """
+        key = transaction.datetime.to_minutes()
+        i = bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self._items.insert(i, transaction)
+
+    def remove(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        key = transaction.datetime.to_minutes()
+        lo = bisect_left(self._keys, key)
+        hi = bisect_right(self._keys, key)
+        for i in range(lo, hi):
+            if self._items[i] is transaction:
+                del self._keys[i]
+                del self._items[i]
+                return
+        raise ValueError("transaction not in index")
+
+    def clear(self):
+        """
+        清空索引
+        """
+        self._keys.clear()
+        self._items.clear()
+
+    def bounds(
+            self,
+            start: int,
+            end: int,
+            include_start: bool = False,
+            include_end: bool = False) -> tuple[int, int]:
+        """
+        二分查找时间范围在索引中的位置区间，复杂度O(log n)
+        @param start: 起始时间（纪元分钟数）
+        @param end: 结束时间（纪元分钟数）
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        @return: 位置区间[lo, hi)
+        """
+        if include_start:
+            lo = bisect_left(self._keys, start)
+        else:
+            lo = bisect_right(self._keys, start)
+        if include_end:
+            hi = bisect_right(self._keys, end)
+        else:
+            hi = bisect_left(self._keys, end)
+        return lo, max(lo, hi)
+
+    def range(
+            self,
+            start: int,
+            end: int,
+            include_start: bool = False,
+            include_end: bool = False) -> list[Transaction]:
+        """
+        查询时间范围内的交易记录，复杂度O(log n + k)
+        @param start: 起始时间（纪元分钟数）
+        @param end: 结束时间（纪元分钟数）
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        @return: 按时间排序的交易记录
+        """
+        lo, hi = self.bounds(start, end, include_start, include_end)
+        return self._items[lo:hi]
+
+    def slice(self, lo: int, hi: int) -> list[Transaction]:
+        """
+        获取位置区间[lo, hi)内按时间排序的交易记录
+        """
+        return self._items[lo:hi]
+
+    def __len__(self):
+        return len(self._items)
+
+    def items(self) -> list[Transaction]:
+        """
+        获取按时间排序的全部交易记录
+        """
+        return list(self._items)
+
+
+class AmountStats:
+    """
+    金额统计快照
+    """
+    def __init__(
+            self,
+            count: int = 0,
+            total: float = 0.0,
+            min_amount: float = 0.0,
+            max_amount: float = 0.0):
+        """
+        初始化金额统计
+        @param count: 交易数量
+        @param total: 总金额
+        @param min_amount: 最小金额，无交易时为0.0
+        @param max_amount: 最大金额，无交易时为0.0
+        """
+        self.count = count
+        self.total = total
+        self.min = min_amount
+        self.max = max_amount
+
+    @property
+    def mean(self) -> float:
+        """
+        平均金额，无交易时为0.0
+        """
+        return self.total / self.count if self.count else 0.0
+
+
+class RunningStats:
+    """
+    增量维护的金额统计，最小值和最大值使用带延迟删除的堆，删除后依然有效
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self._min_heap = []
+        self._max_heap = []
+        self._removed = {}
+
+    def add(self, amount: float):
+        """
+        添加一笔金额
+        """
+        self.count += 1
+        self.total += amount
+        heapq.heappush(self._min_heap, amount)
+        heapq.heappush(self._max_heap, -amount)
+
+    def remove(self, amount: float):
+        """
+        删除一笔金额，堆中的元素在到达堆顶时才真正移除
+        """
+        self.count -= 1
+        self.total -= amount
+        self._removed[amount] = self._removed.get(amount, 0) + 1
+        if self.count == 0:
+            self.total = 0.0
+            self._min_heap.clear()
+            self._max_heap.clear()
+            self._removed.clear()
+
+    def _prune(self, heap: list, sign: int):
+        """
+        弹出堆顶已删除的元素
+        """
+        while heap:
+            amount = sign * heap[0]
+            pending = self._removed.get(amount, 0)
+            if not pending:
+                return
+            heapq.heappop(heap)
+            if pending == 1:
+                del self._removed[amount]
+            else:
+                self._removed[amount] = pending - 1
+
+    def snapshot(self) -> AmountStats:
+        """
+        获取当前统计值，均摊复杂度O(1)
+        """
+        if not self.count:
+            return AmountStats()
+        self._prune(self._min_heap, 1)
+        self._prune(self._max_heap, -1)
+        return AmountStats(self.count, self.total, self._min_heap[0], -self._max_heap[0])
+
+
+class AggregateIndex:
+    """
+    聚合索引，按全部、交易类型和交易类别增量维护金额统计
+    """
+    def __init__(self, transactions: list[Transaction] = ()):
+        """
+        初始化聚合索引
+        @param transactions: 初始交易记录
+        """
+        self.overall = RunningStats()
+        self._by_type = {}
+        self._by_category = {}
+        for t in transactions:
+            self.add(t)
+
+    def add(self, transaction: Transaction):
+        """
+        添加交易记录
+        """
+        amount = transaction.amount
+        self.overall.add(amount)
+        self._by_type.setdefault(transaction.transaction_type, RunningStats()).add(amount)
+        self._by_category.setdefault(transaction.category.name, RunningStats()).add(amount)
+
+    def remove(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        amount = transaction.amount
+        self.overall.remove(amount)
+        self._by_type[transaction.transaction_type].remove(amount)
+        self._by_category[transaction.category.name].remove(amount)
+
+    def clear(self):
+        """
+        清空索引
+        """
+        self.overall = RunningStats()
+        self._by_type.clear()
+        self._by_category.clear()
+
+    def get(self, transaction_type=None, category_name=None) -> AmountStats:
+        """
+        获取统计值
+        @param transaction_type: 交易类型，为None时不按类型区分
+        @param category_name: 交易类别名称，为None时不按类别区分
+        """
+        if transaction_type is not None and category_name is not None:
+            raise ValueError("stats are kept per type or per category, not both")
+        if transaction_type is not None:
+            stats = self._by_type.get(transaction_type)
+        elif category_name is not None:
+            stats = self._by_category.get(category_name)
+        else:
+            stats = self.overall
+        return stats.snapshot() if stats is not None else AmountStats()
+
+
+class RollupIndex:
+    """
+    时间分桶汇总索引，按日、月、年分桶并按交易类型和类别细分，保存每格的数量和总额；
+    桶以起始日的纪元天数编号，随插入和删除增量维护
+    """
+    GRANULARITIES = ("day", "month", "year")
+
+    def __init__(self, transactions: list[Transaction] = ()):
+        """
+        初始化汇总索引
+        @param transactions: 初始交易记录
+        """
+        self._buckets = {granularity: {} for granularity in self.GRANULARITIES}
+        self._starts = {}
+        for t in transactions:
+            self.add(t)
+
+    def _bucket_starts(self, day: int) -> tuple[int, int, int]:
+        """
+        获取纪元天数所在日、月、年桶的起始纪元天数
+        """
+        starts = self._starts.get(day)
+        if starts is None:
+            d = date.fromordinal(day + _EPOCH_ORDINAL)
+            starts = (day,
+                      d.replace(day=1).toordinal() - _EPOCH_ORDINAL,
+                      date(d.year, 1, 1).toordinal() - _EPOCH_ORDINAL)
+            self._starts[day] = starts
+        return starts
+
+    def _cells(self, transaction: Transaction):
+        """
+        逐个产出交易记录所在的各粒度分桶，以及分桶内的细分键
+        """
+        key = (transaction.transaction_type, transaction.category.name)
+        starts = self._bucket_starts(transaction.datetime.to_minutes() // 1440)
+        for granularity, start in zip(self.GRANULARITIES, starts):
+            yield self._buckets[granularity], start, key
+
+    def add(self, transaction: Transaction):
+        """
+        添加交易记录
+        """
+        for buckets, start, key in self._cells(transaction):
+            cell = buckets.setdefault(start, {}).setdefault(key, [0, 0.0])
+            cell[0] += 1
+            cell[1] += transaction.amount
+
+    def remove(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        for buckets, start, key in self._cells(transaction):
+            bucket = buckets.get(start, {})
+            cell = bucket.get(key)
+            if cell is None:
+                raise ValueError("transaction not in index")
+            cell[0] -= 1
+            cell[1] -= transaction.amount
+            if not cell[0]:
+                del bucket[key]
+                if not bucket:
+                    del buckets[start]
+
+    def clear(self):
+        """
+        清空索引
+        """
+        for buckets in self._buckets.values():
+            buckets.clear()
+
+    def aligned(
+            self,
+            granularity: str,
+            start: int,
+            end: int,
+            include_start: bool = False,
+            include_end: bool = False) -> tuple[int, int] | None:
+        """
+        判断时间范围是否恰好由整桶组成
+        @param granularity: 分桶粒度，可选"day"、"month"、"year"
+        @param start: 起始时间（纪元分钟数）
+        @param end: 结束时间（纪元分钟数）
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        @return: 由整桶组成时返回桶起始纪元天数的闭区间[lo, hi]，否则返回None
+        """
+        first = start if include_start else start + 1
+        after = end + 1 if include_end else end
+        if first >= after:
+            return 1, 0
+        if first % 1440 or after % 1440:
+            return None
+        lo, hi = first // 1440, after // 1440
+        level = self.GRANULARITIES.index(granularity)
+        if self._bucket_starts(lo)[level] != lo or self._bucket_starts(hi)[level] != hi:
+            return None
+        return lo, hi - 1
+
+    def get(
+            self,
+            granularity: str,
+            transaction_type=None,
+            category_name=None,
+            lo: int = None,
+            hi: int = None) -> list[tuple[int, int, float]]:
+        """
+        获取各桶的汇总值，复杂度与桶数量成正比
+        @param granularity: 分桶粒度，可选"day"、"month"、"year"
+        @param transaction_type: 交易类型，为None时汇总全部类型
+        @param category_name: 交易类别名称，为None时汇总全部类别
+        @param lo: 桶起始纪元天数下限（含），为None时不限
+        @param hi: 桶起始纪元天数上限（含），为None时不限
+        @return: 按时间排序的(桶起始纪元天数, 数量, 总额)列表
+        """
+        rows = []
+        for start, bucket in self._buckets[granularity].items():
+            if (lo is not None and start < lo) or (hi is not None and start > hi):
+                continue
+            count, total = 0, 0.0
+            for (cell_type, cell_category), (cell_count, cell_total) in bucket.items():
+                if (transaction_type is None or cell_type == transaction_type) and \
+                        (category_name is None or cell_category == category_name):
+                    count += cell_count
+                    total += cell_total
+            if count:
+                rows.append((start, count, total))
+        rows.sort()
+        return rows
+
+
+class FenwickTree:
+    """
+    树状数组，支持O(log n)的单点增加和前缀求和
+    """
+    def __init__(self, values: list = ()):
+        """
+        以线性时间从初始值构建树状数组
+        @param values: 各位置的初始值
+        """
+        self._tree = [0] + list(values)
+        size = len(self._tree)
+        for i in range(1, size):
+            j = i + (i & -i)
+            if j < size:
+                self._tree[j] += self._tree[i]
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def add(self, position: int, delta):
+        """
+        在指定位置增加delta
+        """
+        i = position + 1
+        size = len(self._tree)
+        while i < size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, position: int):
+        """
+        获取位置区间[0, position)的和
+        """
+        i = min(position, len(self._tree) - 1)
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+
+class RangeSumIndex:
+    """
+    时间范围求和索引，为全部交易、每种交易类型和每个类别分别维护按纪元天数排列的
+    数量和金额树状数组；整天部分由树状数组在O(log n)时间内求和，
+    区间两端不完整的日期逐条累加当天的交易记录
+    """
+    def __init__(self, transactions: list[Transaction] = ()):
+        """
+        初始化范围求和索引
+        @param transactions: 初始交易记录
+        """
+        self._origin = 0
+        self._size = 0
+        self._trees = {}
+        self._days = {}
+        for t in transactions:
+            self._days.setdefault(t.datetime.to_minutes() // 1440, []).append(t)
+        if self._days:
+            self._rebuild(min(self._days), max(self._days) + 1)
+
+    @staticmethod
+    def _dimensions(transaction: Transaction) -> tuple:
+        """
+        获取交易记录所属的统计维度：全部、交易类型、交易类别
+        """
+        return None, ("type", transaction.transaction_type), ("category", transaction.category.name)
+
+    def _rebuild(self, first_day: int, end_day: int):
+        """
+        以线性时间重建覆盖纪元天数区间[first_day, end_day)的树状数组
+        """
+        self._origin = first_day
+        self._size = end_day - first_day
+        counts = {}
+        sums = {}
+        for day, transactions in self._days.items():
+            position = day - first_day
+            for t in transactions:
+                for dimension in self._dimensions(t):
+                    if dimension not in counts:
+                        counts[dimension] = [0] * self._size
+                        sums[dimension] = [0.0] * self._size
+                    counts[dimension][position] += 1
+                    sums[dimension][position] += t.amount
+        self._trees = {dimension: (FenwickTree(counts[dimension]), FenwickTree(sums[dimension]))
+                       for dimension in counts}
+
+    def _position(self, day: int) -> int:
+        """
+        获取纪元天数在树状数组中的位置，超出覆盖范围时成倍扩展后重建
+        """
+        if not self._size:
+            self._rebuild(day, day + 1)
+        elif day < self._origin:
+            self._rebuild(min(day, self._origin - self._size), self._origin + self._size)
+        elif day >= self._origin + self._size:
+            self._rebuild(self._origin, max(day + 1, self._origin + 2 * self._size))
+        return day - self._origin
+
+    def _update(self, transaction: Transaction, position: int, sign: int):
+        """
+        将交易记录计入或移出所属各维度的树状数组
+        """
+        for dimension in self._dimensions(transaction):
+            trees = self._trees.get(dimension)
+            if trees is None:
+                trees = (FenwickTree([0] * self._size), FenwickTree([0.0] * self._size))
+                self._trees[dimension] = trees
+            trees[0].add(position, sign)
+            trees[1].add(position, sign * transaction.amount)
+
+    def add(self, transaction: Transaction):
+        """
+        添加交易记录
+        """
+        day = transaction.datetime.to_minutes() // 1440
+        position = self._position(day)
+        self._days.setdefault(day, []).append(transaction)
+        self._update(transaction, position, 1)
+
+    def remove(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        day = transaction.datetime.to_minutes() // 1440
+        transactions = self._days.get(day, [])
+        for i, t in enumerate(transactions):
+            if t is transaction:
+                del transactions[i]
+                if not transactions:
+                    del self._days[day]
+                self._update(transaction, day - self._origin, -1)
+                return
+        raise ValueError("transaction not in index")
+
+    def clear(self):
+        """
+        清空索引
+        """
+        self._origin = 0
+        self._size = 0
+        self._trees.clear()
+        self._days.clear()
+
+    def get(
+            self,
+            start: int,
+            end: int,
+            include_start: bool = False,
+            include_end: bool = False,
+            transaction_type=None,
+            category_name=None) -> tuple[int, float]:
+        """
+        获取时间范围内交易记录的数量和总金额，复杂度O(log n)加上两端日期当天的交易数
+        @param start: 起始时间（纪元分钟数）
+        @param end: 结束时间（纪元分钟数）
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        @param transaction_type: 交易类型，为None时不按类型区分
+        @param category_name: 交易类别名称，为None时不按类别区分
+        @return: (数量, 总金额)
+        """
+        if transaction_type is not None and category_name is not None:
+            raise ValueError("range sums are kept per type or per category, not both")
+        if transaction_type is not None:
+            dimension = ("type", transaction_type)
+        elif category_name is not None:
+            dimension = ("category", category_name)
+        else:
+            dimension = None
+        first = start if include_start else start + 1
+        last = end if include_end else end - 1
+        trees = self._trees.get(dimension)
+        if first > last or trees is None:
+            return 0, 0.0
+        first_day, last_day = first // 1440, last // 1440
+        count, total = 0, 0.0
+        if first_day < last_day:
+            lo = max(first_day + 1 - self._origin, 0)
+            hi = max(last_day - self._origin, 0)
+            count = trees[0].prefix(hi) - trees[0].prefix(lo)
+            total = trees[1].prefix(hi) - trees[1].prefix(lo)
+            edges = (first_day, last_day)
+        else:
+            edges = (first_day,)
+        for day in edges:
+            for t in self._days.get(day, ()):
+                if first <= t.datetime.to_minutes() <= last and \
+                        (dimension is None or dimension in self._dimensions(t)):
+                    count += 1
+                    total += t.amount
+        return count, total
+
+
+class PrefixIndex:
+    """
+    名称前缀索引，按名称有序保存交易记录，支持二分查找的前缀查询
+    """
+    def __init__(self, transactions: list[Transaction] = ()):
+        """
+        初始化前缀索引
+        @param transactions: 初始交易记录
+        """
+        pairs = sorted(((t.name or "", t) for t in transactions), key=lambda pair: pair[0])
+        self._keys = [key for key, _ in pairs]
+        self._items = [t for _, t in pairs]
+
+    def add(self, transaction: Transaction):
+        """
+        添加交易记录，同名记录保持插入顺序
+        """
+        key = transaction.name or ""
+        i = bisect_right(self._keys, key)
+        self._keys.insert(i, key)
+        self._items.insert(i, transaction)
+
+    def remove(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        key = transaction.name or ""
+        lo = bisect_left(self._keys, key)
+        hi = bisect_right(self._keys, key)
+        for i in range(lo, hi):
+            if self._items[i] is transaction:
+                del self._keys[i]
+                del self._items[i]
+                return
+        raise ValueError("transaction not in index")
+
+    def clear(self):
+        """
+        清空索引
+        """
+        self._keys.clear()
+        self._items.clear()
+
+    def bounds(self, prefix: str) -> tuple[int, int]:
+        """
+        二分查找名称以prefix开头的记录的位置区间[lo, hi)，复杂度O(log n)
+        @param prefix: 名称前缀
+        """
+        lo = bisect_left(self._keys, prefix)
+        size = len(prefix)
+        hi = bisect_right(self._keys, prefix, lo, key=lambda key: key[:size])
+        return lo, hi
+
+    def range(self, prefix: str) -> list[Transaction]:
+        """
+        获取名称以prefix开头的交易记录，按名称排序
+        @param prefix: 名称前缀
+        """
+        lo, hi = self.bounds(prefix)
+        return self._items[lo:hi]
+
+    def __len__(self):
+        return len(self._items)
+
+
+def normalize_text(text: str | None) -> str:
+    """
+    规范化全文检索的文本：全角字符转换为半角（NFKC），并忽略大小写
+    @param text: 原始文本，可以为None
+    """
+    if not text:
+        return ""
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def word_grams(word: str) -> set[str]:
+    """
+    获取一个词的检索单元：非ASCII字符（主要是中文）的单字，以及相邻两个字符组成的二元组
+    @param word: 规范化后的文本中由空白字符分隔的一个词
+    """
+    grams = set(map(operator.add, word, word[1:]))
+    if not word.isascii():
+        grams.update(filterfalse(str.isascii, word))
+    return grams
+
+
+def _intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    求两个递增整数数组的交集，在较长的数组中二分查找较短数组的元素
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return a
+    positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[positions] == a]
+
+
+class TextIndex:
+    """
+    全文检索倒排索引，对名称和备注的单字（非ASCII字符）和二元组建立倒排表，
+    中文无需分词即可检索任意子串；倒排表是按文档编号递增的整数数组，删除的记录在查询时跳过。
+    索引同时保存每条记录规范化后的文本，用于核对长检索词，查询结果是精确的
+    """
+    def __init__(self, transactions: list[Transaction] = ()):
+        """
+        初始化全文检索索引
+        @param transactions: 初始交易记录
+        """
+        self._docs = []
+        self._texts = []
+        self._doc_ids = {}
+        self._postings = defaultdict(lambda: array("i"))
+        self._removed = 0
+        # 批量构建时缓存每个词的检索单元，账本中的名称和备注由大量重复的词组成
+        grams_of = {}
+        for t in transactions:
+            self._add(t, grams_of)
+
+    def add(self, transaction: Transaction):
+        """
+        添加交易记录
+        """
+        self._add(transaction, {})
+
+    def _add(self, transaction: Transaction, grams_of: dict):
+        """
+        添加交易记录
+        @param grams_of: 词到检索单元的缓存
+        """
+        doc = len(self._docs)
+        # 名称和备注以换行符分隔，检索词不含空白字符，因此不会跨字段匹配
+        text = normalize_text(transaction.name) + "\n" + normalize_text(transaction.remarks)
+        grams = set()
+        for word in text.split():
+            word_set = grams_of.get(word)
+            if word_set is None:
+                word_set = grams_of[word] = word_grams(word)
+            grams |= word_set
+        self._docs.append(transaction)
+        self._texts.append(text)
+        self._doc_ids.setdefault(id(transaction), []).append(doc)
+        postings = self._postings
+        for gram in grams:
+            postings[gram].append(doc)
+
+    def remove(self, transaction: Transaction):
+        """
+        删除交易记录，删除的记录超过一半时重建倒排表
+        """
+        docs = self._doc_ids.get(id(transaction))
+        if not docs:
+            raise ValueError("transaction not in index")
+        doc = docs.pop()
+        if not docs:
+            del self._doc_ids[id(transaction)]
+        self._docs[doc] = None
+        self._texts[doc] = None
+        self._removed += 1
+        if self._removed * 2 > len(self._docs):
+            transactions = [t for t in self._docs if t is not None]
+            self.clear()
+            grams_of = {}
+            for t in transactions:
+                self._add(t, grams_of)
+
+    def clear(self):
+        """
+        清空索引
+        """
+        self._docs.clear()
+        self._texts.clear()
+        self._doc_ids.clear()
+        self._postings.clear()
+        self._removed = 0
+
+    def _candidate_docs(self, term: str) -> np.ndarray | None:
+        """
+        获取倒排表中包含检索词全部检索单元的文档编号，长于两个字符的检索词需要再核对
+        @param term: 规范化后的检索词，不含空白字符
+        @return: 递增的文档编号数组；检索词为单个ASCII字符、无法由倒排表回答时返回None
+        """
+        if len(term) == 1:
+            if term.isascii():
+                return None
+            grams = [term]
+        else:
+            grams = set(map(operator.add, term, term[1:]))
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return np.empty(0, dtype=np.int32)
+            postings.append(posting)
+        postings.sort(key=len)
+        docs = np.array(postings[0], dtype=np.int32)
+        for posting in postings[1:]:
+            docs = _intersect(docs, np.frombuffer(posting, dtype=np.int32))
+        return docs
+
+    def _verify(self, docs: np.ndarray, terms: list[str]) -> list[int]:
+        """
+        逐条核对候选文档是否包含全部检索词，同时跳过已删除的文档
+        """
+        docs = docs.tolist()
+        texts = self._texts
+        if self._removed:
+            docs = [doc for doc in docs if texts[doc] is not None]
+        for term in terms:
+            docs = [doc for doc in docs if term in texts[doc]]
+        return docs
+
+    def get(self, terms: tuple[str, ...], match_all: bool = True) -> list[Transaction] | None:
+        """
+        获取名称或备注包含检索词的交易记录，按插入顺序排列；
+        二元组都出现不代表检索词作为整体出现，长于两个字符的检索词和单个ASCII字符的检索词
+        在倒排表求交后的候选文档上逐条核对
+        @param terms: 规范化后的检索词
+        @param match_all: 为True时要求包含全部检索词，否则包含任一检索词
+        @return: 交易记录列表；索引无法回答时（检索词都是单个ASCII字符，
+                 或包含任一检索词时有单个ASCII字符的检索词）返回None
+        """
+        if match_all:
+            docs = None
+            unverified = []
+            for term in terms:
+                term_docs = self._candidate_docs(term)
+                if term_docs is not None:
+                    docs = term_docs if docs is None else _intersect(docs, term_docs)
+                if term_docs is None or len(term) > 2:
+                    unverified.append(term)
+            if docs is None:
+                return None
+            docs = self._verify(docs, unverified)
+        else:
+            matched = []
+            for term in terms:
+                term_docs = self._candidate_docs(term)
+                if term_docs is None:
+                    return None
+                if len(term) > 2:
+                    term_docs = np.array(self._verify(term_docs, [term]), dtype=np.int32)
+                matched.append(term_docs)
+            docs = self._verify(np.unique(np.concatenate(matched)), [])
+        return [self._docs[doc] for doc in docs]
+
+    def __len__(self):
+        return len(self._docs) - self._removed
@@ -0,0 +1,241 @@
+"""
+日志式交易仓库模块
+"""
+
+import json
+import os
+import uuid
+from src.transaction import Transaction
+from src.transaction_repository import (
+    TransactionRepository,
+    transaction_to_record,
+    transaction_from_record,
+    PROGRESS_INTERVAL
+)
+
+
+class JournaledTransactionRepository(TransactionRepository):
+    """
+    日志式交易仓库类，插入和删除以JSON Lines格式追加到日志文件，
+    显式压缩时将日志合并到JSON快照文件；重新加载时只读取上次加载后追加的内容
+
+    日志每行是一个操作：
+        {"op": "insert", "id": "...", "record": {...}}
+        {"op": "erase", "id": "..."}
+        {"op": "clear"}
+    """
+    def __init__(
+            self,
+            journal_path: str,
+            snapshot_path: str | None = None,
+            indexes: tuple[str, ...] = (),
+            progress=None):
+        """
+        打开日志式交易仓库，依次加载快照和日志
+        @param journal_path: 日志文件路径
+        @param snapshot_path: 快照文件路径（现有的JSON格式），为None时不使用快照
+        @param indexes: 需要建立的二级索引
+        @param progress: 加载进度回调，参数为(已读取的字节数, 快照和日志的总字节数)；
+                         回调抛出的异常会中止加载
+        """
+        super().__init__(indexes=indexes)
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self._rows = {}
+        self._row_ids = {}
+        self._offset = 0
+        self._snapshot_mtime = None
+        self._journal_file = None
+        snapshot_progress = journal_progress = None
+        if progress is not None:
+            snapshot_size = self.snapshot_size()
+            total = snapshot_size + self.journal_size()
+            snapshot_progress = lambda done, _: progress(done, total)
+            journal_progress = lambda done, _: progress(snapshot_size + done, total)
+        self._load_snapshot(snapshot_progress)
+        self.reload(journal_progress)
+
+    def _load_snapshot(self, progress=None):
+        """
+        加载快照，快照中的交易记录按位置编号
+        @param progress: 进度回调，参数为(已读取的字节数, 快照字节数)
+        """
+        self._snapshot_mtime = self._get_snapshot_mtime()
+        if self._snapshot_mtime is None:
+            return
+        for i, t in enumerate(self.iter_from_json(self.snapshot_path, progress)):
+            self._apply_insert(f"s{i}", t)
+
+    def _get_snapshot_mtime(self) -> int | None:
+        """
+        获取快照文件的修改时间，快照不存在时返回None
+        """
+        if self.snapshot_path is None or not os.path.exists(self.snapshot_path):
+            return None
+        return os.stat(self.snapshot_path).st_mtime_ns
+
+    def _apply_insert(self, row_id: str, transaction: Transaction):
+        """
+        插入交易记录但不写日志，已存在的编号会被忽略
+        """
+        if row_id in self._rows:
+            return
+        TransactionRepository.insert(self, transaction)
+        self._rows[row_id] = transaction
+        self._row_ids[id(transaction)] = row_id
+
+    def _apply_erase(self, row_id: str):
+        """
+        删除交易记录但不写日志，不存在的编号会被忽略
+        """
+        transaction = self._rows.pop(row_id, None)
+        if transaction is None:
+            return
+        del self._row_ids[id(transaction)]
+        TransactionRepository.erase(self, transaction)
+
+    def _apply_clear(self):
+        """
+        清空交易记录但不写日志
+        """
+        TransactionRepository.clear(self)
+        self._rows.clear()
+        self._row_ids.clear()
+
+    def _apply(self, op: dict):
+        """
+        应用一条日志操作，重复应用同一操作不会产生影响
+        """
+        kind = op.get("op")
+        if kind == "insert":
+            self._apply_insert(op["id"], transaction_from_record(op["record"]))
+        elif kind == "erase":
+            self._apply_erase(op["id"])
+        elif kind == "clear":
+            self._apply_clear()
+        else:
+            raise ValueError(f"Unknown journal operation: {kind}")
+
+    def reload(self, progress=None) -> int:
+        """
+        读取日志中上次加载之后追加的操作，不完整的末行留待下次读取；
+        日志被其他进程压缩（日志变短或快照更新）时重新完整加载
+        @param progress: 读取日志的进度回调，参数为(已读取的字节数, 日志字节数)
+        @return: 应用的操作数量
+        """
+        if self.journal_size() < self._offset or \
+                self._get_snapshot_mtime() != self._snapshot_mtime:
+            self._apply_clear()
+            self._offset = 0
+            self._load_snapshot()
+        if not os.path.exists(self.journal_path):
+            return 0
+        count = 0
+        total = self.journal_size()
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                if line.strip():
+                    self._apply(json.loads(line))
+                    count += 1
+                    if progress is not None and count % PROGRESS_INTERVAL == 0:
+                        progress(self._offset, total)
+        if progress is not None:
+            progress(total, total)
+        return count
+
+    def _append(self, op: dict):
+        """
+        追加一条日志操作；若此前没有其他进程追加内容，则直接推进已读位置
+        """
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, "ab")
+        data = (json.dumps(op, ensure_ascii=False) + "\n").encode("utf-8")
+        self._journal_file.write(data)
+        self._journal_file.flush()
+        end = self._journal_file.tell()
+        if end - len(data) == self._offset:
+            self._offset = end
+
+    def insert(self, transaction: Transaction):
+        """
+        插入交易记录并追加到日志
+        """
+        row_id = uuid.uuid4().hex
+        self._apply_insert(row_id, transaction)
+        self._append({"op": "insert", "id": row_id, "record": transaction_to_record(transaction)})
+
+    def erase(self, transaction: Transaction):
+        """
+        删除交易记录并在日志中追加删除标记
+        """
+        row_id = self._row_ids.get(id(transaction))
+        if row_id is None:
+            raise ValueError("transaction not in repository")
+        self._apply_erase(row_id)
+        self._append({"op": "erase", "id": row_id})
+
+    def clear(self):
+        """
+        清空交易记录并追加到日志
+        """
+        self._apply_clear()
+        self._append({"op": "clear"})
+
+    def sync(self):
+        """
+        将已追加的日志写入磁盘
+        """
+        if self._journal_file is not None:
+            self._journal_file.flush()
+            os.fsync(self._journal_file.fileno())
+
+    def journal_size(self) -> int:
+        """
+        获取日志文件大小（字节）
+        """
+        return os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+    def snapshot_size(self) -> int:
+        """
+        获取快照文件大小（字节）
+        """
+        if self.snapshot_path is None or not os.path.exists(self.snapshot_path):
+            return 0
+        return os.path.getsize(self.snapshot_path)
+
+    def needs_compaction(self) -> bool:
+        """
+        日志大于快照时建议压缩，使压缩开销按追加量均摊
+        """
+        return self.journal_size() > self.snapshot_size()
+
+    def compact(self, progress=None):
+        """
+        将当前数据写入快照（先写临时文件再替换），然后截断日志；
+        写快照失败或被取消时快照和日志保持不变。压缩期间不应有其他进程追加日志，也不应修改本仓库
+        @param progress: 写快照的进度回调，参数为(已写出的记录数, 总记录数)
+        """
+        if self.snapshot_path is None:
+            raise ValueError("compaction requires a snapshot path")
+        self.save_to_json(self.snapshot_path, progress)
+        self._snapshot_mtime = self._get_snapshot_mtime()
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        with open(self.journal_path, "wb"):
+            pass
+        self._offset = 0
+        self._rows = {f"s{i}": t for i, t in enumerate(self.transactions)}
+        self._row_ids = {id(t): row_id for row_id, t in self._rows.items()}
+
+    def close(self):
+        """
+        关闭日志文件
+        """
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
@@ -0,0 +1,119 @@
+"""
+JSON流式读写模块
+"""
+
+import json
+
+
+class JsonArrayReader:
+    """
+    增量解析顶层JSON数组，逐个产出数组元素，内存占用与文件大小无关
+    """
+    def __init__(self, file, chunk_size: int = 1 << 16):
+        """
+        初始化读取器
+        @param file: 以文本模式打开的文件对象
+        @param chunk_size: 每次读取的字符数
+        """
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """
+        读取下一块数据并丢弃已解析的部分，返回是否读到新数据
+        """
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _next_char(self) -> str:
+        """
+        跳过空白字符，返回下一个非空白字符（不消耗），文件结束时返回空字符串
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        char = self._next_char()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed JSON array: expected one of {chars!r}, got {char!r}")
+        self._pos += 1
+        return char
+
+    def _decode(self):
+        """
+        解析下一个数组元素，数据不完整时继续读取
+        """
+        self._next_char()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # 数字元素可能恰好被截断在缓冲区末尾，例如"6."或"12e"
+            if (end == len(self._buffer) or self._buffer[end] in "0123456789.eE+-") \
+                    and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        self._expect("[")
+        if self._next_char() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._decode()
+            if self._expect(",]") == "]":
+                return
+
+
+class JsonArrayWriter:
+    """
+    逐条写出顶层JSON数组，输出与json.dump(..., ensure_ascii=False, indent=2)一致
+    """
+    def __init__(self, file):
+        """
+        初始化写入器
+        @param file: 以文本模式打开的文件对象
+        """
+        self._file = file
+        self._count = 0
+
+    def write(self, item):
+        """
+        写出一个数组元素
+        """
+        text = json.dumps(item, ensure_ascii=False, indent=2)
+        self._file.write(("[\n  " if self._count == 0 else ",\n  ") + text.replace("\n", "\n  "))
+        self._count += 1
+
+    def close(self):
+        """
+        写出数组结尾
+        """
+        self._file.write("[]" if self._count == 0 else "\n]")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
@@ -3,12 +3,38 @@
 """
 
 import sys
-from PyQt5.QtWidgets import QApplication
-from main_window import MainWindow
+import time
+import argparse
+
+# 启动计时从导入界面模块之前开始
+START_TIME = time.perf_counter()
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from PyQt5.QtCore import QTimer  # noqa: E402
+from main_window import MainWindow  # noqa: E402
+IMPORT_TIME = time.perf_counter() - START_TIME
+
+
+def report_startup():
+    """
+    打印启动耗时报告：导入界面模块的耗时、到主窗口显示的耗时，以及启动时是否加载了Matplotlib；
+    需要逐个模块的导入耗时可以使用python -X importtime main.py
+    """
+    print(f"导入耗时：{IMPORT_TIME * 1000:.0f} ms")
+    print(f"主窗口显示耗时：{(time.perf_counter() - START_TIME) * 1000:.0f} ms")
+    print("启动时加载了Matplotlib" if "matplotlib" in sys.modules else "启动时未加载Matplotlib")
 
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    mw = MainWindow()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["journal", "sqlite", "partitioned"], default="journal",
+                        help="存储后端")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="主窗口显示后打印启动耗时报告")
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    mw = MainWindow(backend=args.backend)
     mw.show()
+    if args.startup_report:
+        # 零延时定时器在事件循环处理完首次显示后触发
+        QTimer.singleShot(0, report_startup)
     sys.exit(app.exec_())
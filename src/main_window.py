@@ -9,37 +9,70 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QPushButton,
     QLabel,
-    QDialog
+    QDialog,
+    QProgressDialog
 )
-from transaction_repository import TransactionRepository
-from transaction import TransactionType
+from PyQt5.QtCore import QThreadPool
+from src.journal_repository import JournaledTransactionRepository
+from src.sqlite_repository import SQLiteTransactionRepository
+from src.partitioned_repository import PartitionedTransactionRepository
+from src.transaction import TransactionType
 from dialogs import AddDialog, ListDialog, PlotDialog
+from persistence_worker import PersistenceWorker
 
 
 class MainWindow(QMainWindow):
     """
     主窗口类，显示交易摘要并提供导航按钮
     """
-    def __init__(self):
+    def __init__(self, backend: str = "journal"):
+        """
+        初始化主窗口
+        @param backend: 存储后端，"journal"为JSON快照加追加日志，"sqlite"为SQLite数据库，
+                        "partitioned"为按月分区的JSON文件目录
+        """
         super().__init__()
         self.setWindowTitle("Main Window")
         self.setGeometry(100, 100, 400, 300)
-        self.transaction_repo = TransactionRepository()
+        if backend not in ("journal", "sqlite", "partitioned"):
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
+        self.transaction_repo = self.open_repository()
+        # 单线程的私有线程池使保存和加载依次执行
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.worker = None
+        self.progress_dialog = None
+        self.init_ui()
         self.update_summary()
 
-    def update_summary(self):
+    def open_repository(self, progress=None):
         """
-        更新交易摘要信息
+        打开存储后端对应的交易仓库
+        @param progress: 加载进度回调，参数为(已完成量, 总量)
+        """
+        if self.backend == "journal":
+            return JournaledTransactionRepository(
+                "transactions.jsonl", "transactions.json", indexes=("stats", "rollup"),
+                progress=progress)
+        if self.backend == "partitioned":
+            # 打开时只读取清单，分区在第一次访问时才加载
+            return PartitionedTransactionRepository("transactions", "month", indexes=("stats", "rollup"))
+        return SQLiteTransactionRepository(db_path="transactions.db")
+
+    def init_ui(self):
+        """
+        构建界面控件，之后刷新摘要时只更新标签文本
         """
         sample_info = QVBoxLayout()
-        sample_info.addWidget(QLabel("总收入：" + \
-            str(self.transaction_repo.filter_by_type(TransactionType.INCOME).get_total_amount())))
-        sample_info.addWidget(QLabel("总支出：" + \
-            str(self.transaction_repo.filter_by_type(TransactionType.EXPENSE).get_total_amount())))
-        sample_info.addWidget(QLabel("交易总数：" + str(self.transaction_repo.get_count())))
-        sample_info.addWidget(QLabel("余额：" + \
-            str(self.transaction_repo.filter_by_type(TransactionType.INCOME).get_total_amount() - \
-            self.transaction_repo.filter_by_type(TransactionType.EXPENSE).get_total_amount())))
+        self.income_label = QLabel()
+        self.expense_label = QLabel()
+        self.count_label = QLabel()
+        self.balance_label = QLabel()
+        sample_info.addWidget(self.income_label)
+        sample_info.addWidget(self.expense_label)
+        sample_info.addWidget(self.count_label)
+        sample_info.addWidget(self.balance_label)
         button_layout = QHBoxLayout()
         add_button = QPushButton("添加交易")
         add_button.setFixedHeight(40)
@@ -73,6 +106,17 @@ class MainWindow(QMainWindow):
         main_layout.addLayout(button_layout)
         self.centralWidget().setLayout(main_layout)
 
+    def update_summary(self):
+        """
+        更新交易摘要信息，使用仓库增量维护的统计值
+        """
+        income = self.transaction_repo.get_stats(transaction_type=TransactionType.INCOME).total
+        expense = self.transaction_repo.get_stats(transaction_type=TransactionType.EXPENSE).total
+        self.income_label.setText("总收入：" + str(income))
+        self.expense_label.setText("总支出：" + str(expense))
+        self.count_label.setText("交易总数：" + str(self.transaction_repo.get_count()))
+        self.balance_label.setText("余额：" + str(income - expense))
+
     def add_transaction(self):
         """
         添加交易
@@ -106,15 +150,98 @@ class MainWindow(QMainWindow):
 
     def save_data(self):
         """
-        保存数据
+        保存数据，在后台线程中落盘
         """
         print("保存数据按钮被点击")
-        self.transaction_repo.save_to_json("transactions.json")
+        repository = self.transaction_repo
+
+        def save(progress):
+            # 交易在插入和删除时已写入后端，这里只需落盘；日志过大时再合并到快照
+            repository.sync()
+            if repository.needs_compaction():
+                repository.compact(progress)
+
+        self.run_in_background(save, "正在保存数据...", self.save_finished)
 
     def load_data(self):
         """
-        加载数据
+        加载数据，在后台线程中构建新的仓库，完成后再替换当前仓库
         """
         print("加载数据按钮被点击")
-        self.transaction_repo = TransactionRepository.load_from_json("transactions.json")
+        repository = self.transaction_repo
+
+        def load(progress):
+            repository.sync()
+            return self.open_repository(progress)
+
+        self.run_in_background(load, "正在加载数据...", self.load_finished)
+
+    def run_in_background(self, task, label: str, finished):
+        """
+        在后台线程中执行保存或加载任务，期间禁用界面，并在任务较慢时显示可取消的进度对话框
+        @param task: 接受进度回调的函数
+        @param label: 进度对话框的提示文字
+        @param finished: 任务完成时调用的槽，参数为任务的返回值
+        """
+        self.centralWidget().setEnabled(False)
+        self.progress_dialog = QProgressDialog(label, "取消", 0, 100, self)
+        self.progress_dialog.setMinimumDuration(500)
+        self.worker = PersistenceWorker(task)
+        self.progress_dialog.canceled.connect(self.worker.cancel)
+        self.worker.signals.progress.connect(self.progress_dialog.setValue)
+        self.worker.signals.finished.connect(finished)
+        self.worker.signals.failed.connect(self.task_failed)
+        self.worker.signals.cancelled.connect(self.task_cancelled)
+        self.pool.start(self.worker)
+
+    def finish_task(self):
+        """
+        结束后台任务，关闭进度对话框并恢复界面
+        """
+        self.worker = None
+        self.progress_dialog.reset()
+        self.progress_dialog.deleteLater()
+        self.progress_dialog = None
+        self.centralWidget().setEnabled(True)
+
+    def save_finished(self, result):
+        """
+        保存完成
+        """
+        self.finish_task()
+        print("数据已保存")
+
+    def load_finished(self, repository):
+        """
+        加载完成，用新仓库替换当前仓库并关闭旧仓库
+        """
+        self.finish_task()
+        previous = self.transaction_repo
+        self.transaction_repo = repository
+        previous.close()
         self.update_summary()
+        print("数据已加载")
+
+    def task_failed(self, message: str):
+        """
+        后台任务失败，当前仓库保持不变
+        """
+        self.finish_task()
+        print(f"操作失败：{message}")
+
+    def task_cancelled(self):
+        """
+        后台任务被取消，当前仓库和已保存的文件保持不变
+        """
+        self.finish_task()
+        print("操作已取消")
+
+    def closeEvent(self, event):
+        """
+        关闭窗口时取消并等待后台任务，然后关闭仓库；分区仓库在关闭时保存修改过的分区
+        """
+        if self.worker is not None:
+            self.worker.cancel()
+        self.pool.waitForDone()
+        self.transaction_repo.close()
+        super().closeEvent(event)
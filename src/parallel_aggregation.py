@@ -0,0 +1,252 @@
+"""
+多进程并行分组聚合模块
+
+列式仓库的分组聚合在进程池中按分片并行计算：仓库的金额、时间、类型和类别编码列复制到共享内存
+（每个数据版本只复制一次），工作进程直接映射共享内存，只接收分片范围和过滤条件，
+返回每个分片按编码排列的分组表数组，由主进程向量化合并。
+不分组的聚合在当前进程中只需一次向量化扫描，耗时低于一次进程间往返，不使用多进程。
+
+基准：python -m src.bench_parallel
+"""
+
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+import numpy as np
+from src.transaction_query import TransactionQuery, merge_groups
+
+
+# 行数达到该值时才使用多进程，较小的仓库在单进程中计算更快
+PARALLEL_THRESHOLD = 1_000_000
+
+# 参与并行分组的数组列及其数据类型
+_COLUMN_TYPES = {
+    "amounts": np.float64,
+    "minutes": np.int64,
+    "types": np.int8,
+    "categories": np.int32,
+}
+
+
+def group_table(codes: np.ndarray, amounts: np.ndarray) -> tuple[np.ndarray, ...]:
+    """
+    按编码分组计算每组的数量、总额、最小值和最大值，codes不能为空
+    @param codes: 每行的分组编码
+    @param amounts: 每行的金额
+    @return: (编码, 首次出现的位置, 数量, 总额, 最小值, 最大值)数组，按编码排列
+    """
+    uniques, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse)
+    totals = np.bincount(inverse, weights=amounts)
+    grouped = amounts[np.argsort(inverse, kind="stable")]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    mins = np.minimum.reduceat(grouped, starts)
+    maxs = np.maximum.reduceat(grouped, starts)
+    return uniques, first, counts, totals, mins, maxs
+
+
+def merge_tables(tables: list[tuple]) -> tuple[np.ndarray, ...]:
+    """
+    合并多个group_table()分组表，同一编码的总额按分组表的顺序累加
+    @param tables: 分组表列表，首次出现的位置须在同一坐标下
+    """
+    codes, first, counts, totals, mins, maxs = (np.concatenate(column) for column in zip(*tables))
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    merged_first = np.full(len(uniques), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(merged_first, inverse, first)
+    merged_mins = np.full(len(uniques), np.inf)
+    np.minimum.at(merged_mins, inverse, mins)
+    merged_maxs = np.full(len(uniques), -np.inf)
+    np.maximum.at(merged_maxs, inverse, maxs)
+    return (uniques, merged_first, np.bincount(inverse, weights=counts).astype(np.int64),
+            np.bincount(inverse, weights=totals), merged_mins, merged_maxs)
+
+
+def table_rows(table: tuple) -> list[tuple]:
+    """
+    将分组表转换为(编码, 数量, 总额, 最小值, 最大值)列表，按编码首次出现的顺序排列
+    """
+    uniques, first, counts, totals, mins, maxs = table
+    return [(int(uniques[i]), int(counts[i]), float(totals[i]), float(mins[i]), float(maxs[i]))
+            for i in np.argsort(first)]
+
+
+def group_amounts(codes: np.ndarray, amounts: np.ndarray) -> list[tuple]:
+    """
+    按编码分组计算每组的数量、总额、最小值和最大值
+    @param codes: 每行的分组编码
+    @param amounts: 每行的金额
+    @return: (编码, 数量, 总额, 最小值, 最大值)列表，按编码首次出现的顺序排列
+    """
+    if not len(codes):
+        return []
+    return table_rows(group_table(codes, amounts))
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    在工作进程中映射共享内存，共享内存由主进程负责释放
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13之前没有track参数；工作进程与主进程共用资源跟踪器，重复登记不会产生额外记录，
+        # 主进程释放时一并撤销
+        return shared_memory.SharedMemory(name=name)
+
+
+# 工作进程中已映射的共享内存，数据版本变化后映射新的共享内存并关闭旧的
+_attached = {}
+
+
+def _columns(spec: dict) -> dict:
+    """
+    在工作进程中获取共享内存中的数组列
+    @param spec: 列名到(共享内存名称, 数据类型, 长度)的字典
+    """
+    global _attached
+    names = [name for name, _, _ in spec.values()]
+    if list(_attached) != names:
+        for block in _attached.values():
+            block.close()
+        _attached = {name: _attach(name) for name in names}
+    return {column: np.ndarray((length,), np.dtype(dtype), buffer=_attached[name].buf)
+            for column, (name, dtype, length) in spec.items()}
+
+
+def _shard(spec: dict, lo: int, hi: int, filters: tuple, key: str) -> tuple | None:
+    """
+    在工作进程中计算一个分片[lo, hi)的分组表
+    @param filters: (类型编码, 类别编码, 起始分钟, 结束分钟, 是否包含起始, 是否包含结束)，不过滤的条件为None
+    @param key: 分组键
+    @return: group_table()的分组表，首次出现的位置为仓库中的行号；分片中没有满足条件的行时为None
+    """
+    columns = {column: values[lo:hi] for column, values in _columns(spec).items()}
+    type_code, category_code, start, end, include_start, include_end = filters
+    mask = np.ones(hi - lo, dtype=np.bool_)
+    if type_code is not None:
+        mask &= columns["types"] == type_code
+    if category_code is not None:
+        mask &= columns["categories"] == category_code
+    if start is not None:
+        minutes = columns["minutes"]
+        mask &= minutes >= start if include_start else minutes > start
+        mask &= minutes <= end if include_end else minutes < end
+    rows = np.flatnonzero(mask)
+    if not len(rows):
+        return None
+    if key == "category":
+        codes = columns["categories"][rows]
+    elif key == "type":
+        codes = columns["types"][rows]
+    else:
+        codes = columns["minutes"][rows] // 1440
+    uniques, first, *rest = group_table(codes, columns["amounts"][rows])
+    return (uniques, rows[first] + lo, *rest)
+
+
+def _release(blocks: list):
+    """
+    释放主进程创建的共享内存
+    """
+    for block in blocks:
+        block.close()
+        block.unlink()
+    blocks.clear()
+
+
+class ParallelAggregator:
+    """
+    多进程分组聚合器，将仓库的数组列放入共享内存，按分片在进程池中计算分组表后合并；
+    不支持名称、名称前缀和全文检索条件，这些查询仍在当前进程中执行
+    """
+    def __init__(self, processes: int = None, threshold: int = PARALLEL_THRESHOLD):
+        """
+        初始化聚合器，进程池在第一次并行分组时才启动
+        @param processes: 工作进程数，为None时使用CPU核数
+        @param threshold: 仓库行数达到该值时才并行分组
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.threshold = threshold
+        self._executor = None
+        self._blocks = []
+        self._spec = None
+        self._categories = None
+        self._source = None
+        self._version = None
+        self._finalizer = weakref.finalize(self, _release, self._blocks)
+
+    def accepts(self, repository, query: TransactionQuery) -> bool:
+        """
+        判断分组查询是否使用多进程；只有一个工作进程时多进程只会增加开销，总是在当前进程中计算
+        """
+        return self.processes > 1 and repository.get_count() >= self.threshold \
+            and not query.has_name_filter()
+
+    def _export(self, repository):
+        """
+        将仓库的数组列复制到共享内存，仓库及其数据版本未变化时复用已有的共享内存；
+        数据变化后只要容量足够就原地覆盖已有的共享内存，工作进程不必重新映射，
+        共享内存按行数的1.25倍分配，追加少量交易后不需要重新分配
+        """
+        if self._source is not None and self._source() is repository \
+                and self._version == repository.version:
+            return
+        columns, self._categories = repository._parallel_columns()
+        count = len(columns["amounts"])
+        if not self._blocks or self._blocks[0].size < count * np.dtype(_COLUMN_TYPES["amounts"]).itemsize:
+            _release(self._blocks)
+            capacity = max(count + count // 4, 1)
+            for dtype in _COLUMN_TYPES.values():
+                self._blocks.append(shared_memory.SharedMemory(
+                    create=True, size=capacity * np.dtype(dtype).itemsize))
+        spec = {}
+        for block, (column, dtype) in zip(self._blocks, _COLUMN_TYPES.items()):
+            np.ndarray((count,), dtype, buffer=block.buf)[:] = columns[column]
+            spec[column] = (block.name, np.dtype(dtype).str, count)
+        self._spec = spec
+        self._source = weakref.ref(repository)
+        self._version = repository.version
+
+    def group(self, repository, query: TransactionQuery, key: str) -> dict:
+        """
+        并行分组聚合查询结果，每个工作进程计算一个分片的分组表，主进程向量化合并
+        @param key: 分组键
+        @return: 分组键值到AmountStats的字典
+        """
+        self._export(repository)
+        count = self._spec["amounts"][2]
+        bounds = np.linspace(0, count, self.processes + 1).astype(np.int64).tolist()
+        filters = (
+            query.transaction_type.value if query.transaction_type is not None else None,
+            self._categories.code_of(query.category_name) if query.category_name is not None else None,
+            query.start,
+            query.end,
+            query.include_start,
+            query.include_end,
+        )
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+        tables = [table for table in self._executor.map(
+            _shard, repeat(self._spec), bounds[:-1], bounds[1:], repeat(filters), repeat(key))
+            if table is not None]
+        if not tables:
+            return {}
+        rows = table_rows(merge_tables(tables))
+        if key == "category":
+            rows = [(self._categories.decode(code).name, *rest) for code, *rest in rows]
+        return merge_groups(key, rows)
+
+    def close(self):
+        """
+        关闭进程池并释放共享内存
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        _release(self._blocks)
+        self._spec = None
+        self._source = None
+        self._version = None
@@ -0,0 +1,637 @@
+"""
+分区交易仓库模块
+"""
+
+import json
+import os
+import threading
+from datetime import date, timedelta
+from src.transaction import Transaction, TransactionType, Category, DateTime
+from src.transaction_query import TransactionQuery
+from src.transaction_repository import TransactionRepository, transaction_to_record
+from src.indexes import AmountStats
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# 各分区粒度的分区文件名长度，文件名为分区起始日期的前缀，例如"2023-01.json"
+_NAME_LENGTHS = {"day": 10, "month": 7, "year": 4}
+
+MANIFEST_NAME = "manifest.json"
+
+
+def partition_start(minutes: int, granularity: str) -> date:
+    """
+    获取纪元分钟数所在分区的起始日期
+    @param minutes: 纪元分钟数
+    @param granularity: 分区粒度，可选"day"、"month"、"year"
+    """
+    d = date.fromordinal(minutes // 1440 + _EPOCH_ORDINAL)
+    if granularity == "month":
+        return d.replace(day=1)
+    if granularity == "year":
+        return date(d.year, 1, 1)
+    return d
+
+
+def _next_start(key: date, granularity: str) -> date:
+    """
+    获取下一个分区的起始日期
+    """
+    if granularity == "month":
+        return date(key.year + key.month // 12, key.month % 12 + 1, 1)
+    if granularity == "year":
+        return date(key.year + 1, 1, 1)
+    return key + timedelta(days=1)
+
+
+def _to_minutes(d: date) -> int:
+    """
+    将日期转换为当天零点的纪元分钟数
+    """
+    return (d.toordinal() - _EPOCH_ORDINAL) * 1440
+
+
+def _add_amount(cell: list, amount: float):
+    """
+    将一笔金额累加到[数量, 总额, 最小值, 最大值]统计中
+    """
+    if not cell[0]:
+        cell[2] = cell[3] = amount
+    elif amount < cell[2]:
+        cell[2] = amount
+    elif amount > cell[3]:
+        cell[3] = amount
+    cell[0] += 1
+    cell[1] += amount
+
+
+def _combine(stats: AmountStats, other: AmountStats):
+    """
+    将另一份金额统计合并到stats中
+    """
+    if not other.count:
+        return
+    if not stats.count:
+        stats.min, stats.max = other.min, other.max
+    else:
+        stats.min = min(stats.min, other.min)
+        stats.max = max(stats.max, other.max)
+    stats.count += other.count
+    stats.total += other.total
+
+
+def _summarize(transactions: list[Transaction]) -> dict:
+    """
+    一次扫描计算分区的金额统计，以及按交易类型和按类别的金额统计
+    @return: 可写入清单文件的摘要字典
+    """
+    stats = [0, 0.0, 0.0, 0.0]
+    types = {}
+    categories = {}
+    for t in transactions:
+        amount = t.amount
+        _add_amount(stats, amount)
+        _add_amount(types.setdefault(t.transaction_type.value, [0, 0.0, 0.0, 0.0]), amount)
+        _add_amount(categories.setdefault(t.category.name, [0, 0.0, 0.0, 0.0]), amount)
+    return {
+        "stats": stats,
+        "types": [[code, *cell] for code, cell in types.items()],
+        "categories": [[name, *cell] for name, cell in categories.items()],
+    }
+
+
+class _Summary:
+    """
+    清单文件中记录的分区摘要，分区文件的大小和修改时间与记录一致时才有效
+    """
+    def __init__(self, record: dict):
+        self.size = record["size"]
+        self.mtime = record["mtime"]
+        self.record = record
+        self.stats = AmountStats(*record["stats"])
+        self.types = {code: AmountStats(*cell) for code, *cell in record["types"]}
+        self.categories = {name: AmountStats(*cell) for name, *cell in record["categories"]}
+
+
+class PartitionedTransactionRepository(TransactionRepository):
+    """
+    分区交易仓库类，按交易时间将交易记录分为按日、月或年的分区，每个分区保存为目录中的一个JSON文件；
+    分区在第一次访问时才加载，时间范围查询跳过范围以外的分区，保存时只重写修改过的分区
+
+    清单文件记录每个分区的数量、总额、最小值和最大值（整体、按交易类型和按类别），
+    统计和完整覆盖分区的时间范围聚合直接使用清单，不必加载分区
+    """
+    def __init__(
+            self,
+            directory: str,
+            granularity: str = "month",
+            indexes: tuple[str, ...] = ()):
+        """
+        打开分区交易仓库，只读取清单和分区文件列表
+        @param directory: 分区文件所在目录，不存在时创建
+        @param granularity: 分区粒度，可选"day"、"month"、"year"；必须与目录中已有分区的粒度一致
+        @param indexes: 每个已加载分区需要建立的二级索引
+        """
+        if granularity not in _NAME_LENGTHS:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        self.directory = directory
+        self.granularity = granularity
+        self._index_names = list(indexes)
+        self._partitions = {}
+        self._summaries = {}
+        self._keys = set()
+        self._dirty = set()
+        # 后台线程可能在GUI线程加载分区的同时建立索引，加载分区和登记索引名称互斥，
+        # 每个分区要么在加载时建立新索引，要么由create_index()为其建立
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    @property
+    def transactions(self) -> list[Transaction]:
+        """
+        交易记录列表（加载全部分区）
+        """
+        return self.get_all()
+
+    def _path(self, key: date) -> str:
+        """
+        获取分区文件路径
+        """
+        name = f"{key.year:04}-{key.month:02}-{key.day:02}"[:_NAME_LENGTHS[self.granularity]]
+        return os.path.join(self.directory, name + ".json")
+
+    def _parse_key(self, file_name: str) -> date | None:
+        """
+        由分区文件名解析分区起始日期，不是分区文件时返回None
+        """
+        stem, extension = os.path.splitext(file_name)
+        if extension != ".json" or len(stem) != _NAME_LENGTHS[self.granularity]:
+            return None
+        try:
+            key = date.fromisoformat((stem + "-01-01")[:10])
+        except ValueError:
+            return None
+        return key if partition_start(_to_minutes(key), self.granularity) == key else None
+
+    def _scan(self):
+        """
+        读取清单和分区文件列表，大小或修改时间与清单不一致的分区不使用摘要
+        """
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        records = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["granularity"] != self.granularity:
+                raise ValueError(
+                    f"Directory is partitioned by {manifest['granularity']}, not {self.granularity}")
+            records = manifest["partitions"]
+        for file_name in os.listdir(self.directory):
+            key = self._parse_key(file_name)
+            if key is None:
+                continue
+            self._keys.add(key)
+            record = records.get(file_name)
+            stat = os.stat(os.path.join(self.directory, file_name))
+            if record is not None and record["size"] == stat.st_size \
+                    and record["mtime"] == stat.st_mtime_ns:
+                self._summaries[key] = _Summary(record)
+
+    def _load(self, key: date) -> TransactionRepository:
+        """
+        获取分区，尚未加载时从分区文件加载
+        """
+        partition = self._partitions.get(key)
+        if partition is None:
+            with self._lock:
+                partition = self._partitions.get(key)
+                if partition is None:
+                    path = self._path(key)
+                    transactions = list(self.iter_from_json(path)) if key in self._keys else []
+                    partition = TransactionRepository(transactions, indexes=tuple(self._index_names))
+                    self._partitions[key] = partition
+                    self._keys.add(key)
+        return partition
+
+    def _bounds(self, key: date) -> tuple[int, int]:
+        """
+        获取分区覆盖的纪元分钟数范围[起始, 结束)
+        """
+        return _to_minutes(key), _to_minutes(_next_start(key, self.granularity))
+
+    def _keys_for(self, query: TransactionQuery) -> list[date]:
+        """
+        分区裁剪，按时间顺序获取可能包含查询结果的分区
+        """
+        keys = sorted(self._keys)
+        if not query.has_time_range():
+            return keys
+        result = []
+        for key in keys:
+            start, last = self._bounds(key)
+            last -= 1
+            if (start < query.end or (start == query.end and query.include_end)) \
+                    and (last > query.start or (last == query.start and query.include_start)):
+                result.append(key)
+        return result
+
+    def _summary_stats(self, key: date, query: TransactionQuery) -> AmountStats | None:
+        """
+        使用清单中的摘要计算分区上的查询统计；分区已修改、查询含名称条件、
+        时间范围只覆盖分区的一部分或同时指定交易类型和类别时返回None
+        """
+        summary = self._summaries.get(key)
+        if summary is None or key in self._dirty or query.has_name_filter():
+            return None
+        if query.has_time_range():
+            start, end = self._bounds(key)
+            if not (start > query.start or (start == query.start and query.include_start)):
+                return None
+            if not (end - 1 < query.end or (end - 1 == query.end and query.include_end)):
+                return None
+        if query.transaction_type is not None:
+            if query.category_name is not None:
+                return None
+            stats = summary.types.get(query.transaction_type.value)
+        elif query.category_name is not None:
+            stats = summary.categories.get(query.category_name)
+        else:
+            stats = summary.stats
+        return AmountStats(stats.count, stats.total, stats.min, stats.max) if stats else AmountStats()
+
+    def _partition_stats(
+            self,
+            partition: TransactionRepository,
+            query: TransactionQuery,
+            extremes: bool) -> AmountStats:
+        """
+        由已加载分区自身的聚合计算分区上的查询统计，分区的统计、范围求和和汇总索引均可使用
+        @param extremes: 是否需要最小值和最大值，为False时结果中的最小值和最大值为0.0
+        """
+        count = partition._aggregate(query, "count")
+        if not count:
+            return AmountStats()
+        total = partition._aggregate(query, "sum")
+        if not extremes:
+            return AmountStats(count, total)
+        return AmountStats(count, total, partition._aggregate(query, "min"), partition._aggregate(query, "max"))
+
+    def _query_stats(self, query: TransactionQuery, extremes: bool = True) -> AmountStats:
+        """
+        计算查询结果的数量、总额、最小值和最大值；能由清单回答的分区不加载，
+        其余分区使用分区自身的索引
+        @param extremes: 是否需要最小值和最大值，为False时结果中的最小值和最大值可能为0.0
+        """
+        stats = AmountStats()
+        for key in self._keys_for(query):
+            partial = self._summary_stats(key, query)
+            if partial is None:
+                partial = self._partition_stats(self._load(key), query, extremes)
+            _combine(stats, partial)
+        return stats
+
+    def create_index(self, name: str):
+        """
+        为每个已加载的分区建立二级索引，之后加载的分区也会建立该索引；可以在后台线程中调用
+        @param name: 索引名称
+        """
+        with self._lock:
+            if name not in self._index_names:
+                self._index_names.append(name)
+            partitions = list(self._partitions.values())
+        for partition in partitions:
+            partition.create_index(name)
+
+    def drop_index(self, name: str):
+        """
+        删除每个分区的二级索引
+        @param name: 索引名称
+        """
+        with self._lock:
+            if name in self._index_names:
+                self._index_names.remove(name)
+            partitions = list(self._partitions.values())
+        for partition in partitions:
+            partition.drop_index(name)
+
+    def insert(self, transaction: Transaction):
+        """
+        插入交易记录到所在的分区
+        """
+        key = partition_start(transaction.datetime.to_minutes(), self.granularity)
+        self._load(key).insert(transaction)
+        self._dirty.add(key)
+        self.version += 1
+
+    def extend(self, transactions: list[Transaction]):
+        """
+        批量插入交易记录，按分区分组后逐个分区插入
+        @param transactions: 交易记录列表
+        """
+        groups = {}
+        for t in transactions:
+            key = partition_start(t.datetime.to_minutes(), self.granularity)
+            groups.setdefault(key, []).append(t)
+        for key, group in groups.items():
+            partition = self._partitions.get(key)
+            if partition is None and key not in self._keys:
+                with self._lock:
+                    self._partitions[key] = TransactionRepository(group, indexes=tuple(self._index_names))
+                    self._keys.add(key)
+            else:
+                partition = self._load(key)
+                for t in group:
+                    partition.insert(t)
+            self._dirty.add(key)
+        self.version += 1
+
+    def erase(self, transaction: Transaction):
+        """
+        从所在的分区删除交易记录
+        """
+        key = partition_start(transaction.datetime.to_minutes(), self.granularity)
+        if key not in self._keys:
+            raise ValueError("transaction not in repository")
+        self._load(key).erase(transaction)
+        self._dirty.add(key)
+        self.version += 1
+
+    def clear(self):
+        """
+        清空交易记录，保存时删除全部分区文件
+        """
+        with self._lock:
+            for key in self._keys:
+                self._partitions[key] = TransactionRepository(indexes=tuple(self._index_names))
+        self._dirty.update(self._keys)
+        self.version += 1
+
+    def _select(self, query: TransactionQuery) -> list[Transaction]:
+        """
+        在时间范围内的分区上执行查询；分区按时间顺序合并，按时间排序的查询结果依然有序。
+        分页查询按各分区的结果数量跳过整个分区，取满一页后不再加载后面的分区
+        """
+        whole = query._with(limit_value=None, offset_value=0)
+        if not query.has_limit():
+            rows = []
+            for key in self._keys_for(query):
+                rows.extend(self._load(key)._select(whole))
+            return rows
+        rows = []
+        skip = query.offset_value
+        for key in self._keys_for(query):
+            if query.limit_value is not None and len(rows) >= query.limit_value:
+                break
+            if skip:
+                stats = self._summary_stats(key, whole)
+                count = stats.count if stats is not None else self._load(key)._aggregate(whole, "count")
+                if count <= skip:
+                    skip -= count
+                    continue
+            limit = None if query.limit_value is None else query.limit_value - len(rows)
+            rows.extend(self._load(key)._select(whole._with(limit_value=limit, offset_value=skip)))
+            skip = 0
+        return rows
+
+    def _query_repository(self, query: TransactionQuery) -> TransactionRepository:
+        """
+        执行查询并物化为内存交易仓库
+        """
+        return TransactionRepository(self._select(query))
+
+    def _aggregate(self, query: TransactionQuery, op: str):
+        """
+        合并各分区的统计得到聚合结果
+        @param op: 聚合方式，可选"count"、"sum"、"mean"、"max"、"min"
+        """
+        if op not in ("count", "sum", "mean", "max", "min"):
+            raise ValueError(f"Unknown aggregation: {op}")
+        stats = self._query_stats(query, op in ("min", "max"))
+        if op == "sum":
+            return stats.total
+        return getattr(stats, op)
+
+    def _group(self, query: TransactionQuery, key: str, extremes: bool = True) -> dict:
+        """
+        在时间范围内的分区上分组聚合并合并各分区的分组统计
+        @param key: 分组键
+        @param extremes: 是否需要最小值和最大值，为False时结果中的最小值和最大值可能为0.0
+        @return: 分组键值到AmountStats的字典
+        """
+        groups = {}
+        for partition_key in self._keys_for(query):
+            for group, stats in self._load(partition_key)._group(query, key, extremes).items():
+                current = groups.get(group)
+                if current is None:
+                    groups[group] = stats
+                else:
+                    _combine(current, stats)
+        if key in ("category", "type"):
+            return groups
+        return dict(sorted(groups.items()))
+
+    def get_all(self) -> list[Transaction]:
+        """
+        获取所有交易记录（加载全部分区），按分区的时间顺序排列，分区内保持插入顺序
+        """
+        return self._select(self.query())
+
+    def get_count(self) -> int:
+        """
+        获取交易记录数量
+        """
+        return self._query_stats(self.query(), False).count
+
+    def get_stats(
+            self,
+            transaction_type: TransactionType = None,
+            category: Category = None) -> AmountStats:
+        """
+        获取金额统计（数量、总额、均值、最小值、最大值），未修改的分区使用清单中的摘要
+        @param transaction_type: 交易类型，为None时统计全部类型
+        @param category: 交易类别，为None时统计全部类别；不能与交易类型同时指定
+        """
+        if transaction_type is not None and category is not None:
+            raise ValueError("stats are kept per type or per category, not both")
+        query = self.query()
+        if transaction_type is not None:
+            query = query.type(transaction_type)
+        if category is not None:
+            query = query.category(category)
+        return self._query_stats(query)
+
+    def _range_sum(
+            self,
+            start_time: DateTime,
+            end_time: DateTime,
+            include_start: bool,
+            include_end: bool,
+            transaction_type: TransactionType,
+            category: Category) -> tuple[int, float]:
+        """
+        获取时间范围内的(数量, 总金额)，只有范围两端的分区需要加载
+        """
+        if transaction_type is not None and category is not None:
+            raise ValueError("range sums are kept per type or per category, not both")
+        query = self.query().between(start_time, end_time, include_start, include_end)
+        if transaction_type is not None:
+            query = query.type(transaction_type)
+        if category is not None:
+            query = query.category(category)
+        stats = self._query_stats(query, False)
+        return stats.count, stats.total
+
+    def get_total_amount(self) -> float:
+        """
+        获取交易记录总金额
+        """
+        return self._query_stats(self.query(), False).total
+
+    def get_average_amount(self) -> float:
+        """
+        获取交易记录平均金额
+        """
+        return self._query_stats(self.query(), False).mean
+
+    def get_max_amount(self) -> float:
+        """
+        获取交易记录最大金额
+        """
+        return self.get_stats().max
+
+    def get_min_amount(self) -> float:
+        """
+        获取交易记录最小金额
+        """
+        return self.get_stats().min
+
+    def find_by_name(self, name: str) -> Transaction | None:
+        """
+        根据名称查找交易记录，按时间顺序逐个分区查找
+        @param name: 交易名称
+        """
+        for key in sorted(self._keys):
+            transaction = self._load(key).find_by_name(name)
+            if transaction is not None:
+                return transaction
+        return None
+
+    def find_all_by_name(self, name: str) -> list[Transaction]:
+        """
+        根据名称查找所有匹配的交易记录
+        @param name: 交易名称
+        """
+        return self._select(self.query().name(name))
+
+    def _iter_records(self):
+        """
+        逐个分区生成用于序列化的交易记录字典
+        """
+        for key in sorted(self._keys):
+            for t in self._load(key).transactions:
+                yield transaction_to_record(t)
+
+    @classmethod
+    def load_from_json(
+            cls,
+            file_path: str,
+            directory: str,
+            granularity: str = "month") -> 'PartitionedTransactionRepository':
+        """
+        从JSON文件导入交易记录并按时间分区，导入的分区在保存后写入目录
+        @param file_path: JSON文件路径
+        @param directory: 分区文件所在目录
+        @param granularity: 分区粒度
+        """
+        repo = cls(directory, granularity)
+        repo.extend(cls.iter_from_json(file_path))
+        return repo
+
+    def loaded_partitions(self) -> list[date]:
+        """
+        获取已加载的分区的起始日期，按时间排序
+        """
+        return sorted(self._partitions)
+
+    def dirty_partitions(self) -> list[date]:
+        """
+        获取修改后尚未保存的分区的起始日期，按时间排序
+        """
+        return sorted(self._dirty)
+
+    def save(self, progress=None):
+        """
+        只重写修改过的分区并更新清单，清空的分区删除其文件；
+        每个分区文件先写入临时文件再替换，保存中途失败或被取消时未写完的分区保持原样
+        @param progress: 进度回调，参数为(已写出的记录数, 需要写出的总记录数)；回调抛出的异常会中止保存
+        """
+        keys = sorted(self._dirty)
+        total = sum(self._partitions[key].get_count() for key in keys)
+        done = 0
+        try:
+            for key in keys:
+                partition = self._partitions[key]
+                path = self._path(key)
+                count = partition.get_count()
+                if count:
+                    offset = done
+                    partition.save_to_json(
+                        path, None if progress is None
+                        else lambda written, _: progress(offset + written, total))
+                    stat = os.stat(path)
+                    record = _summarize(partition.transactions)
+                    record.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+                    self._summaries[key] = _Summary(record)
+                else:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    self._summaries.pop(key, None)
+                    self._partitions.pop(key, None)
+                    self._keys.discard(key)
+                self._dirty.discard(key)
+                done += count
+        finally:
+            self._write_manifest()
+        if progress is not None:
+            progress(total, total)
+
+    def _write_manifest(self):
+        """
+        原子地写入清单文件，只记录与分区文件一致的摘要
+        """
+        partitions = {os.path.basename(self._path(key)): summary.record
+                      for key, summary in sorted(self._summaries.items())}
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"granularity": self.granularity, "partitions": partitions}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, manifest_path)
+
+    def sync(self):
+        """
+        将修改过的分区写入磁盘
+        """
+        self.save()
+
+    def needs_compaction(self) -> bool:
+        """
+        分区文件在保存时整体重写，无需压缩
+        """
+        return False
+
+    def compact(self, progress=None):
+        """
+        保存修改过的分区
+        """
+        self.save(progress)
+
+    def close(self):
+        """
+        保存修改过的分区并释放已加载的分区
+        """
+        self.save()
+        self._partitions.clear()
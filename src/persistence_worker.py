@@ -0,0 +1,70 @@
+"""
+数据保存与加载后台任务模块
+"""
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class PersistenceSignals(QObject):
+    """
+    保存或加载任务的信号，进度以百分比发出
+    """
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class _Cancelled(Exception):
+    """
+    由进度回调抛出，中止已被取消的任务
+    """
+
+
+class PersistenceWorker(QRunnable):
+    """
+    保存或加载任务，在线程池中执行，不占用GUI线程；
+    任务通过进度回调报告进度，取消后在下一次回调时中止
+    """
+    def __init__(self, task):
+        """
+        初始化任务
+        @param task: 接受进度回调的函数，进度回调的参数为(已完成量, 总量)；
+                     函数的返回值（例如新加载的仓库）通过finished信号发出
+        """
+        super().__init__()
+        self.task = task
+        self.signals = PersistenceSignals()
+        self._cancelled = False
+        self._percent = -1
+
+    def cancel(self):
+        """
+        取消任务，尚未开始的任务将直接跳过
+        """
+        self._cancelled = True
+
+    def _progress(self, done: int, total: int):
+        """
+        进度回调，百分比变化时才发出信号
+        """
+        if self._cancelled:
+            raise _Cancelled()
+        percent = 100 * done // total if total else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.signals.progress.emit(percent)
+
+    def run(self):
+        if self._cancelled:
+            self.signals.cancelled.emit()
+            return
+        try:
+            result = self.task(self._progress)
+        except _Cancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
@@ -2,101 +2,230 @@
 图表服务模块
 """
 
-from matplotlib import pyplot as plt
+import json
+import os
+import weakref
+import numpy as np
+import matplotlib
+from matplotlib import font_manager
+from matplotlib.figure import Figure
+from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from src.transaction_repository import TransactionRepository
+from src.downsample import lttb, minmax
+
+
+# 图表中文字体的候选，按优先顺序排列，覆盖Windows、macOS和常见Linux发行版
+CJK_FONTS = (
+    "Microsoft YaHei",
+    "SimHei",
+    "PingFang SC",
+    "Noto Sans CJK SC",
+    "Source Han Sans SC",
+    "WenQuanYi Micro Hei",
+    "Arial Unicode MS",
+)
+
+# configure_fonts()选中的字体，None表示尚未设置
+_configured_font = None
+
+
+def configure_fonts(cache_path: str = None) -> str:
+    """
+    设置图表使用的中文字体，只在第一次调用时生效；只把实际安装的字体写入rcParams，
+    避免绘图时为缺失的字体反复查找回退字体。选中的字体缓存在文件中，之后的运行不必扫描字体列表；
+    Matplotlib版本或候选字体变化、或缓存的字体文件不存在时重新选择
+    @param cache_path: 缓存文件路径，为None时使用Matplotlib缓存目录下的transaction_fonts.json
+    @return: 选中的中文字体名称，没有安装任何候选字体时为空字符串
+    """
+    global _configured_font
+    if _configured_font is not None:
+        return _configured_font
+    if cache_path is None:
+        cache_path = os.path.join(matplotlib.get_cachedir(), "transaction_fonts.json")
+    key = {"matplotlib": matplotlib.__version__, "candidates": list(CJK_FONTS)}
+    font = path = None
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == key and (not cached["path"] or os.path.exists(cached["path"])):
+            font, path = cached["font"], cached["path"]
+    except (OSError, ValueError, KeyError):
+        pass
+    if font is None:
+        installed = {entry.name: entry.fname for entry in font_manager.fontManager.ttflist}
+        font = next((name for name in CJK_FONTS if name in installed), "")
+        path = installed.get(font, "")
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "font": font, "path": path}, f)
+        except OSError:
+            pass
+    matplotlib.rcParams["font.family"] = "sans-serif"
+    if font:
+        matplotlib.rcParams["font.sans-serif"] = [font] + [
+            name for name in matplotlib.rcParams["font.sans-serif"] if name != font]
+    matplotlib.rcParams["axes.unicode_minus"] = False
+    _configured_font = font
+    return font
 
 
 class PlotService:
     """
-    图表服务类，生成不同类型的图表
+    图表服务类，生成不同类型的图表；
+    图表对象不注册到pyplot，按仓库及其数据版本号缓存，数据变化时原地更新已有的图形元素
     """
     def __init__(
             self,
             style: str = "bar",
-            font_size: int = 12):
+            font_size: int = 12,
+            downsample: str | None = "lttb",
+            marker_limit: int = 60):
         """
         初始化图表服务对象
         @param style: 图表样式，支持"bar"、"line"、"pie"
         @param font_size: 字体大小
+        @param downsample: 折线图降采样方式，支持"lttb"、"minmax"，为None时不降采样；
+                           降采样后的点数不超过图表宽度的像素数
+        @param marker_limit: 折线图点数不超过该值时绘制数据点标记
         """
+        if downsample not in ("lttb", "minmax", None):
+            raise ValueError(f"Unknown downsampling method: {downsample}")
         self.style = style
         self.font_size = font_size
+        self.downsample = downsample
+        self.marker_limit = marker_limit
+        self._figure = None
+        self._artists = None
+        self._source = None
+        self._version = None
+        self._width = None
 
-    def get_plot(self, transactions: TransactionRepository) -> plt.Figure:
+    def get_plot(self, transactions: TransactionRepository, width: int = None) -> Figure:
         """
-        根据交易记录生成图表
+        根据交易记录生成图表，仓库及其数据版本号未变化时直接返回缓存的图表
         @param transactions: 交易记录仓库
+        @param width: 目标宽度（像素），决定折线图降采样后的点数，为None时使用图表当前宽度
         @return: matplotlib图表对象
         """
         if self.style == "bar":
-            return self._create_bar_plot(transactions)
+            draw = self._create_bar_plot
         elif self.style == "line":
-            return self._create_line_plot(transactions)
+            draw = self._create_line_plot
         elif self.style == "pie":
-            return self._create_pie_chart(transactions)
+            draw = self._create_pie_chart
         else:
             raise ValueError(f"Unknown plot style: {self.style}")
+        if self._figure is None:
+            self._figure = Figure()
+            self._figure.subplots()
+        if width is None:
+            width = int(self._figure.get_figwidth() * self._figure.dpi)
+        if self.style != "line":
+            width = None
+        if self._source is not None and self._source() is transactions \
+                and self._version == transactions.version and self._width == width:
+            return self._figure
+        self._width = width
+        draw(self._figure.axes[0], transactions)
+        self._source = weakref.ref(transactions)
+        self._version = transactions.version
+        return self._figure
 
-    def _create_bar_plot(self, transactions: TransactionRepository) -> plt.Figure:
+    def render(
+            self,
+            transactions: TransactionRepository,
+            width: int,
+            height: int) -> tuple[bytes, int, int]:
         """
-        根据交易记录生成柱状图
+        使用Agg后端将图表渲染为RGBA像素数据，不依赖GUI，可在工作线程中调用；
+        同一服务对象不应被多个线程同时使用
         @param transactions: 交易记录仓库
-        @return: matplotlib图表对象
+        @param width: 宽度（像素）
+        @param height: 高度（像素）
+        @return: (RGBA像素数据, 宽度, 高度)
         """
-        category_sums = {}
-        for t in transactions.get_all():
-            cat_name = t.category.name
-            category_sums[cat_name] = category_sums.get(cat_name, 0) + t.amount
+        fig = self.get_plot(transactions, width)
+        if not isinstance(fig.canvas, FigureCanvasAgg):
+            FigureCanvasAgg(fig)
+        fig.set_size_inches(max(width, 1) / fig.dpi, max(height, 1) / fig.dpi)
+        fig.canvas.draw()
+        width, height = fig.canvas.get_width_height()
+        return bytes(fig.canvas.buffer_rgba()), width, height
 
-        fig, ax = plt.subplots()
-        ax.bar(category_sums.keys(), category_sums.values())
-        ax.set_title("Transaction Amounts by Category", fontsize=self.font_size)
-        ax.set_xlabel("Category", fontsize=self.font_size)
-        ax.set_ylabel("Total Amount", fontsize=self.font_size)
-        return fig
+    def close(self):
+        """
+        释放缓存的图表
+        """
+        self._figure = None
+        self._artists = None
+        self._source = None
+        self._version = None
+        self._width = None
 
-    def _create_line_plot(self, transactions: TransactionRepository) -> plt.Figure:
+    def _create_bar_plot(self, ax, transactions: TransactionRepository):
         """
-        根据交易记录生成折线图
+        根据交易记录绘制柱状图，类别不变时只更新柱高
+        @param ax: 绘图区
         @param transactions: 交易记录仓库
-        @return: matplotlib图表对象
         """
-        transactions_sorted = transactions.sort_by_datetime()
-        dates = []
-        amounts = []
-        for t in transactions_sorted.get_all():
-            if t == transactions_sorted.get_all()[0]:
-                dates.append(f"{t.datetime.year:04}-{t.datetime.month:02}-{t.datetime.day:02}")
-                amounts.append(t.amount)
+        category_sums = transactions.group_by("category").sum()
+        labels = [str(name) for name in category_sums]
+        if self._artists is not None and self._artists[0] == labels:
+            for bar, total in zip(self._artists[1], category_sums.values()):
+                bar.set_height(total)
+        else:
+            if self._artists is None:
+                ax.set_title("Transaction Amounts by Category", fontsize=self.font_size)
+                ax.set_xlabel("Category", fontsize=self.font_size)
+                ax.set_ylabel("Total Amount", fontsize=self.font_size)
             else:
-                last_date = dates[-1]
-                current_date = f"{t.datetime.year:04}-{t.datetime.month:02}-{t.datetime.day:02}"
-                if current_date == last_date:
-                    amounts[-1] += t.amount
-                else:
-                    dates.append(current_date)
-                    amounts.append(t.amount)
+                self._artists[1].remove()
+            bars = ax.bar(range(len(labels)), list(category_sums.values()))
+            ax.set_xticks(range(len(labels)), labels)
+            self._artists = (labels, bars)
+        ax.relim()
+        ax.autoscale_view()
 
-        fig, ax = plt.subplots()
-        ax.plot(dates, amounts, marker='o')
-        ax.set_title("Transaction Amounts Over Time", fontsize=self.font_size)
-        ax.set_xlabel("Date", fontsize=self.font_size)
-        ax.set_ylabel("Amount", fontsize=self.font_size)
-        plt.xticks(rotation=45)
-        return fig
-
-    def _create_pie_chart(self, transactions: TransactionRepository) -> plt.Figure:
+    def _create_line_plot(self, ax, transactions: TransactionRepository):
         """
-        根据交易记录生成饼图
+        根据交易记录绘制折线图，横轴为日期轴，点数超过目标宽度时降采样，已有折线时原地更新数据
+        @param ax: 绘图区
         @param transactions: 交易记录仓库
-        @return: matplotlib图表对象
         """
-        category_sums = {}
-        for t in transactions.get_all():
-            cat_name = t.category.name
-            category_sums[cat_name] = category_sums.get(cat_name, 0) + t.amount
+        day_sums = transactions.group_by("day").sum()
+        dates = np.array(list(day_sums), dtype="datetime64[D]")
+        amounts = np.fromiter(day_sums.values(), np.float64, len(day_sums))
+        if self.downsample is not None and len(dates) > self._width:
+            days = dates.astype(np.int64)
+            if self.downsample == "lttb":
+                keep = lttb(days, amounts, self._width)
+            else:
+                keep = minmax(days, amounts, self._width // 2)
+            dates, amounts = dates[keep], amounts[keep]
+        marker = 'o' if len(dates) <= self.marker_limit else ''
+        if self._artists is None:
+            line, = ax.plot(dates, amounts, marker=marker)
+            locator = AutoDateLocator()
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+            ax.set_title("Transaction Amounts Over Time", fontsize=self.font_size)
+            ax.set_xlabel("Date", fontsize=self.font_size)
+            ax.set_ylabel("Amount", fontsize=self.font_size)
+            self._artists = line
+        else:
+            self._artists.set_data(dates, amounts)
+            self._artists.set_marker(marker)
+        ax.relim()
+        ax.autoscale_view()
 
-        fig, ax = plt.subplots()
+    def _create_pie_chart(self, ax, transactions: TransactionRepository):
+        """
+        根据交易记录绘制饼图，扇区数量可能变化，因此在同一绘图区上重绘
+        @param ax: 绘图区
+        @param transactions: 交易记录仓库
+        """
+        category_sums = transactions.group_by("category").sum()
+        ax.clear()
         ax.pie(category_sums.values(), labels=category_sums.keys(), autopct='%1.1f%%')
         ax.set_title("Transaction Distribution by Category", fontsize=self.font_size)
-        return fig
@@ -0,0 +1,64 @@
+"""
+图表后台渲染模块
+"""
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt5.QtGui import QImage
+from plot_service import PlotService
+
+
+class PlotSignals(QObject):
+    """
+    图表渲染任务的信号，渲染完成或失败时携带请求编号发出
+    """
+    finished = pyqtSignal(int, QImage)
+    failed = pyqtSignal(int, str)
+
+
+class PlotWorker(QRunnable):
+    """
+    图表渲染任务，在线程池中完成数据聚合和Agg渲染，不占用GUI线程
+    """
+    def __init__(
+            self,
+            request_id: int,
+            plot_service: PlotService,
+            transactions,
+            width: int,
+            height: int):
+        """
+        初始化渲染任务
+        @param request_id: 请求编号，用于丢弃已被新请求取代的结果
+        @param plot_service: 图表服务
+        @param transactions: 交易记录仓库
+        @param width: 宽度（像素）
+        @param height: 高度（像素）
+        """
+        super().__init__()
+        self.request_id = request_id
+        self.plot_service = plot_service
+        self.transactions = transactions
+        self.width = width
+        self.height = height
+        self.signals = PlotSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        """
+        取消任务，尚未开始的任务将直接跳过，已完成的结果不再发出
+        """
+        self._cancelled = True
+
+    def run(self):
+        if self._cancelled:
+            return
+        try:
+            data, width, height = self.plot_service.render(self.transactions, self.width, self.height)
+        except Exception as e:
+            if not self._cancelled:
+                self.signals.failed.emit(self.request_id, str(e))
+            return
+        if self._cancelled:
+            return
+        image = QImage(data, width, height, QImage.Format_RGBA8888).copy()
+        self.signals.finished.emit(self.request_id, image)
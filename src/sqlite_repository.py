@@ -0,0 +1,430 @@
+"""
+SQLite交易仓库模块
+"""
+
+import sqlite3
+import sys
+import weakref
+from src.transaction import Transaction, TransactionType, Category, CategoryDictionary, DateTime
+from src.transaction_query import TransactionQuery, merge_groups
+from src.transaction_repository import TransactionRepository
+from src.indexes import AmountStats, normalize_text
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    amount REAL NOT NULL,
+    transaction_type INTEGER NOT NULL,
+    category,
+    minutes INTEGER NOT NULL,
+    remarks TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_minutes ON transactions (minutes);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (transaction_type, minutes);
+CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category, minutes);
+CREATE INDEX IF NOT EXISTS idx_transactions_name ON transactions (name);
+"""
+
+_COLUMNS = "id, name, amount, transaction_type, category, minutes, remarks"
+
+_AGGREGATES = {
+    "count": "COUNT(*)",
+    "sum": "TOTAL(amount)",
+    "mean": "COALESCE(AVG(amount), 0.0)",
+    "max": "COALESCE(MAX(amount), 0.0)",
+    "min": "COALESCE(MIN(amount), 0.0)",
+}
+
+# 分组聚合的原始编码表达式，时间分组先按纪元天数（向下取整）分组再合并
+_GROUP_CODES = {
+    "category": "category",
+    "type": "transaction_type",
+    "day": "(minutes - (minutes % 1440 + 1440) % 1440) / 1440",
+}
+
+
+class SQLiteTransactionRepository(TransactionRepository):
+    """
+    SQLite交易仓库类，与TransactionRepository接口一致，
+    过滤、排序和聚合下推为带索引的SQL查询，交易对象按需构造
+    """
+    def __init__(
+            self,
+            transactions: list[Transaction] = None,
+            db_path: str = ":memory:"):
+        """
+        打开SQLite交易仓库
+        @param transactions: 初始交易记录
+        @param db_path: 数据库文件路径，默认使用内存数据库
+        """
+        self.db_path = db_path
+        # 图表等后台任务会在工作线程中读取仓库，调用方保证同一时刻只有一个线程访问连接
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        # 全文检索与内存仓库使用相同的规范化规则（全角转半角、忽略大小写）
+        self._conn.create_function("normalize_text", 1, normalize_text, deterministic=True)
+        self._row_ids = weakref.WeakKeyDictionary()
+        self._objects = weakref.WeakValueDictionary()
+        self._categories = CategoryDictionary()
+        if transactions:
+            self.extend(transactions)
+
+    @property
+    def transactions(self) -> list[Transaction]:
+        """
+        交易记录列表（按需构造）
+        """
+        return self.get_all()
+
+    def _category(self, name) -> Category:
+        """
+        获取类别名称对应的共享类别对象
+        """
+        return self._categories.get(name)
+
+    def _to_row(self, transaction: Transaction) -> tuple:
+        """
+        将交易对象转换为数据库行(名称, 金额, 交易类型, 类别, 纪元分钟数, 备注)
+        """
+        return (transaction.name, transaction.amount, transaction.transaction_type.value,
+                transaction.category.name, transaction.datetime.to_minutes(), transaction.remarks)
+
+    def _to_transaction(self, row: tuple) -> Transaction:
+        """
+        由查询结果行构造交易对象，同一行在对象存活期间返回同一对象
+        """
+        row_id, name, amount, transaction_type, category, minutes, remarks = row
+        transaction = self._objects.get(row_id)
+        if transaction is None:
+            if isinstance(name, str):
+                name = sys.intern(name)
+            transaction = Transaction(
+                name, amount, TransactionType.from_string(transaction_type),
+                self._category(category), DateTime.from_minutes(minutes), remarks)
+            self._remember(row_id, transaction)
+        return transaction
+
+    def _remember(self, row_id: int, transaction: Transaction):
+        """
+        记录交易对象与行号的对应关系，对象被回收后自动失效
+        """
+        self._objects[row_id] = transaction
+        self._row_ids[transaction] = row_id
+
+    def insert(self, transaction: Transaction):
+        """
+        插入交易记录
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO transactions (name, amount, transaction_type, category, minutes, remarks) "
+                "VALUES (?, ?, ?, ?, ?, ?)", self._to_row(transaction))
+        self._remember(cursor.lastrowid, transaction)
+        self.version += 1
+
+    def extend(self, transactions: list[Transaction], batch_size: int = 10000):
+        """
+        批量插入交易记录，每批在一个事务中提交
+        @param transactions: 交易记录
+        @param batch_size: 每批交易记录数量
+        """
+        batch = []
+        for t in transactions:
+            batch.append(self._to_row(t))
+            if len(batch) >= batch_size:
+                self._insert_rows(batch)
+                batch = []
+        self._insert_rows(batch)
+
+    def _insert_rows(self, rows: list[tuple]):
+        """
+        在一个事务中插入一批数据库行
+        """
+        if not rows:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO transactions (name, amount, transaction_type, category, minutes, remarks) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.version += 1
+
+    def erase(self, transaction: Transaction):
+        """
+        删除交易记录
+        """
+        row_id = self._row_ids.get(transaction)
+        if row_id is None:
+            found = self._conn.execute(
+                "SELECT id FROM transactions WHERE name IS ? AND amount = ? AND transaction_type = ? "
+                "AND category = ? AND minutes = ? AND remarks IS ? LIMIT 1",
+                self._to_row(transaction)).fetchone()
+            if found is None:
+                raise ValueError("transaction not in repository")
+            row_id = found[0]
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM transactions WHERE id = ?", (row_id,))
+        if cursor.rowcount == 0:
+            raise ValueError("transaction not in repository")
+        self._objects.pop(row_id, None)
+        self._row_ids.pop(transaction, None)
+        self.version += 1
+
+    def _where(self, query: TransactionQuery) -> tuple[str, list]:
+        """
+        将查询条件转换为SQL WHERE子句
+        """
+        clauses = []
+        params = []
+        if query.transaction_type is not None:
+            clauses.append("transaction_type = ?")
+            params.append(query.transaction_type.value)
+        if query.category_name is not None:
+            clauses.append("category = ?")
+            params.append(query.category_name)
+        if query.name_value is not None:
+            clauses.append("name = ?")
+            params.append(query.name_value)
+        if query.name_prefix_value is not None:
+            # 前缀条件转换为名称索引上的范围查询
+            clauses.append("name >= ? AND name < ?")
+            params.extend((query.name_prefix_value, query.name_prefix_value + "\U0010ffff"))
+        if query.text_terms is not None:
+            term_clause = "(instr(normalize_text(name), ?) > 0 OR instr(normalize_text(remarks), ?) > 0)"
+            joiner = " AND " if query.text_match_all else " OR "
+            clauses.append("(" + joiner.join([term_clause] * len(query.text_terms)) + ")")
+            for term in query.text_terms:
+                params.extend((term, term))
+        if query.has_time_range():
+            clauses.append("minutes >= ?" if query.include_start else "minutes > ?")
+            clauses.append("minutes <= ?" if query.include_end else "minutes < ?")
+            params.extend((query.start, query.end))
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _select(self, query: TransactionQuery) -> list[Transaction]:
+        """
+        执行SQL查询，返回满足条件的交易记录
+        """
+        where, params = self._where(query)
+        order = " ORDER BY minutes, id" if query.ordered else " ORDER BY id"
+        if query.has_limit():
+            order += " LIMIT ? OFFSET ?"
+            params = [*params, -1 if query.limit_value is None else query.limit_value, query.offset_value]
+        cursor = self._conn.execute(f"SELECT {_COLUMNS} FROM transactions{where}{order}", params)
+        return [self._to_transaction(row) for row in cursor]
+
+    def _query_repository(self, query: TransactionQuery) -> TransactionRepository:
+        """
+        执行SQL查询并物化为内存交易仓库
+        """
+        return TransactionRepository(self._select(query))
+
+    def _aggregate(self, query: TransactionQuery, op: str):
+        """
+        将聚合下推为SQL聚合函数
+        @param op: 聚合方式，可选"count"、"sum"、"mean"、"max"、"min"
+        """
+        if op not in _AGGREGATES:
+            raise ValueError(f"Unknown aggregation: {op}")
+        where, params = self._where(query)
+        return self._conn.execute(
+            f"SELECT {_AGGREGATES[op]} FROM transactions{where}", params).fetchone()[0]
+
+    def _group(self, query: TransactionQuery, key: str, extremes: bool = True) -> dict:
+        """
+        将分组聚合下推为SQL GROUP BY查询
+        @param key: 分组键
+        @param extremes: 是否需要最小值和最大值，此处总是一并计算
+        @return: 分组键值到AmountStats的字典
+        """
+        where, params = self._where(query)
+        code = _GROUP_CODES.get(key, _GROUP_CODES["day"])
+        cursor = self._conn.execute(
+            f"SELECT {code}, COUNT(*), TOTAL(amount), MIN(amount), MAX(amount) "
+            f"FROM transactions{where} GROUP BY 1 ORDER BY MIN(id)", params)
+        return merge_groups(key, cursor)
+
+    def get_all(self) -> list[Transaction]:
+        """
+        获取所有交易记录
+        """
+        return self._select(self.query())
+
+    def get_count(self) -> int:
+        """
+        获取交易记录数量
+        """
+        return self._aggregate(self.query(), "count")
+
+    def clear(self):
+        """
+        清空交易记录
+        """
+        with self._conn:
+            self._conn.execute("DELETE FROM transactions")
+        self._objects.clear()
+        self._row_ids.clear()
+        self.version += 1
+
+    def get_stats(
+            self,
+            transaction_type: TransactionType = None,
+            category: Category = None) -> AmountStats:
+        """
+        获取金额统计（数量、总额、均值、最小值、最大值），由SQL一次聚合得到
+        @param transaction_type: 交易类型，为None时统计全部类型
+        @param category: 交易类别，为None时统计全部类别；不能与交易类型同时指定
+        """
+        if transaction_type is not None and category is not None:
+            raise ValueError("stats are kept per type or per category, not both")
+        query = self.query()
+        if transaction_type is not None:
+            query = query.type(transaction_type)
+        if category is not None:
+            query = query.category(category)
+        where, params = self._where(query)
+        count, total, min_amount, max_amount = self._conn.execute(
+            "SELECT COUNT(*), TOTAL(amount), COALESCE(MIN(amount), 0.0), "
+            f"COALESCE(MAX(amount), 0.0) FROM transactions{where}", params).fetchone()
+        return AmountStats(count, total, min_amount, max_amount)
+
+    def _range_sum(
+            self,
+            start_time: DateTime,
+            end_time: DateTime,
+            include_start: bool,
+            include_end: bool,
+            transaction_type: TransactionType,
+            category: Category) -> tuple[int, float]:
+        """
+        获取时间范围内的(数量, 总金额)，由SQL聚合得到
+        """
+        if transaction_type is not None and category is not None:
+            raise ValueError("range sums are kept per type or per category, not both")
+        query = self.query().between(start_time, end_time, include_start, include_end)
+        if transaction_type is not None:
+            query = query.type(transaction_type)
+        if category is not None:
+            query = query.category(category)
+        return query.count(), query.sum()
+
+    def get_total_amount(self) -> float:
+        """
+        获取交易记录总金额
+        """
+        return self._aggregate(self.query(), "sum")
+
+    def get_average_amount(self) -> float:
+        """
+        获取交易记录平均金额
+        """
+        return self._aggregate(self.query(), "mean")
+
+    def get_max_amount(self) -> float:
+        """
+        获取交易记录最大金额
+        """
+        return self._aggregate(self.query(), "max")
+
+    def get_min_amount(self) -> float:
+        """
+        获取交易记录最小金额
+        """
+        return self._aggregate(self.query(), "min")
+
+    def find_by_name(self, name: str) -> Transaction | None:
+        """
+        根据名称查找交易记录
+        @param name: 交易名称
+        """
+        row = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM transactions WHERE name = ? ORDER BY id LIMIT 1",
+            (name,)).fetchone()
+        return self._to_transaction(row) if row is not None else None
+
+    def find_all_by_name(self, name: str) -> list[Transaction]:
+        """
+        根据名称查找所有匹配的交易记录
+        @param name: 交易名称
+        """
+        return self._select(self.query().name(name))
+
+    def create_index(self, name: str):
+        """
+        SQLite仓库在建表时已建立索引
+        """
+
+    def drop_index(self, name: str):
+        """
+        SQLite仓库在建表时已建立索引
+        """
+
+    def _iter_rows(self):
+        """
+        逐行产出(金额, 纪元分钟数, 交易类型编码, 类别名称, 名称, 备注)，不构造交易对象
+        """
+        cursor = self._conn.execute(
+            "SELECT amount, minutes, transaction_type, category, name, remarks "
+            "FROM transactions ORDER BY id")
+        yield from cursor
+
+    def _iter_records(self):
+        """
+        逐条生成用于序列化的交易记录字典，不构造交易对象
+        """
+        for amount, minutes, transaction_type, category, name, remarks in self._iter_rows():
+            yield {
+                "name": name,
+                "datetime": str(DateTime.from_minutes(minutes)),
+                "amount": amount,
+                "transaction_type": transaction_type,
+                "category": category,
+                "remarks": remarks
+            }
+
+    @classmethod
+    def load_from_json(
+            cls,
+            file_path: str,
+            db_path: str = ":memory:") -> 'SQLiteTransactionRepository':
+        """
+        从JSON文件流式加载交易记录，分批写入数据库
+        @param file_path: JSON文件路径
+        @param db_path: 数据库文件路径
+        """
+        repo = cls(db_path=db_path)
+        repo.extend(cls.iter_from_json(file_path))
+        return repo
+
+    def sync(self):
+        """
+        提交数据库中尚未提交的修改
+        """
+        self._conn.commit()
+
+    def reload(self) -> int:
+        """
+        数据库始终反映最新数据，无需重新加载
+        """
+        return 0
+
+    def needs_compaction(self) -> bool:
+        """
+        数据库无需定期压缩
+        """
+        return False
+
+    def compact(self):
+        """
+        整理数据库文件，回收已删除记录占用的空间
+        """
+        self._conn.execute("VACUUM")
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        self._conn.close()
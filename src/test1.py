@@ -1,6 +1,9 @@
 import unittest
 import os
 import json
+from unittest import mock
+from datetime import date
+from random import Random
 from src.transaction_repository import TransactionRepository
 from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
 
@@ -44,6 +47,24 @@ class TestTransactionRepository(unittest.TestCase):
             self.assertTrue(DateTime(2023, 1, 1, 0, 0).__lt__(transaction.datetime) and \
                             transaction.datetime.__lt__(DateTime(2023, 1, 2, 23, 59)))
 
+    def test_filter_by_time_range_bounds(self):
+        start, end = DateTime(2023, 1, 1, 12, 0), DateTime(2023, 1, 5, 9, 0)
+        self.assertEqual(self.repo.filter_by_time_range(start, end).get_count(), 1)
+        self.assertEqual(self.repo.filter_by_time_range(start, end, include_start=True).get_count(), 2)
+        self.assertEqual(self.repo.filter_by_time_range(start, end, True, True).get_count(), 3)
+
+    def test_time_index_follows_insert_and_erase(self):
+        start, end = DateTime(2022, 12, 31, 0, 0), DateTime(2023, 1, 3, 0, 0)
+        self.assertEqual(self.repo.filter_by_time_range(start, end).get_count(), 2)
+        early = Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                            category=self.category1, datetime=DateTime(2022, 12, 31, 8, 30))
+        self.repo.insert(early)
+        self.repo.erase(self.transactions[1])
+        filtered = self.repo.filter_by_time_range(start, end).get_all()
+        self.assertEqual([t.name for t in filtered], ["Breakfast", "Lunch"])
+        self.assertEqual([t.name for t in self.repo.sort_by_datetime().get_all()],
+                         ["Breakfast", "Lunch", "Salary"])
+
     def test_filter_by_type(self):
         filtered_repo = self.repo.filter_by_type(TransactionType.EXPENSE)
         self.assertEqual(filtered_repo.get_count(), 2)
@@ -82,6 +103,224 @@ class TestTransactionRepository(unittest.TestCase):
         self.assertIsNotNone(transaction)
         self.assertEqual(transaction.name, "Lunch")
 
+    def test_indexed_lookups(self):
+        repo = TransactionRepository(list(self.transactions), indexes=("name", "transaction_type", "category"))
+        again = Transaction(name="Lunch", amount=25.0, transaction_type=TransactionType.EXPENSE,
+                            category=self.category1, datetime=DateTime(2023, 1, 3, 12, 0))
+        repo.insert(again)
+        self.assertIs(repo.find_by_name("Lunch"), self.transactions[0])
+        self.assertEqual(repo.find_all_by_name("Lunch"), [self.transactions[0], again])
+        self.assertEqual(repo.filter_by_type(TransactionType.EXPENSE).get_count(), 3)
+        self.assertEqual(repo.filter_by_category(self.category2).get_count(), 1)
+        repo.erase(self.transactions[0])
+        self.assertEqual(repo.find_all_by_name("Lunch"), [again])
+        self.assertEqual(repo.filter_by_type(TransactionType.EXPENSE).get_count(), 2)
+        repo.clear()
+        self.assertIsNone(repo.find_by_name("Lunch"))
+        self.assertEqual(repo.filter_by_category(self.category1).get_count(), 0)
+
+    def test_find_all_by_name_without_index(self):
+        self.assertEqual(self.repo.find_all_by_name("Dinner"), [self.transactions[1]])
+        self.assertEqual(self.repo.find_all_by_name("Nothing"), [])
+
+    def test_unknown_index(self):
+        with self.assertRaises(ValueError):
+            self.repo.create_index("amount")
+
+    def test_query_chain(self):
+        query = self.repo.query().type(TransactionType.EXPENSE).category(self.category1)
+        ranged = query.between(DateTime(2023, 1, 1, 0, 0), DateTime(2023, 1, 2, 0, 0))
+        self.assertEqual(query.count(), 2)
+        self.assertEqual(query.sum(), 50.0)
+        self.assertEqual(ranged.to_list(), [self.transactions[0]])
+        self.assertEqual(ranged.max(), 20.0)
+        self.assertEqual(self.repo.query().type(TransactionType.INCOME).name("Lunch").mean(), 0.0)
+        self.assertEqual(self.repo.query().category(self.category1.name).sum(), 50.0)
+
+    def test_query_uses_indexes(self):
+        repo = TransactionRepository(list(self.transactions), indexes=("transaction_type",))
+        query = repo.query().type(TransactionType.EXPENSE).order_by_datetime()
+        self.assertEqual([t.name for t in query], ["Lunch", "Dinner"])
+        repo.insert(Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                                category=self.category1, datetime=DateTime(2022, 12, 31, 8, 30)))
+        self.assertEqual([t.name for t in query], ["Breakfast", "Lunch", "Dinner"])
+        self.assertEqual(query.min(), 5.0)
+
+    def test_query_limit(self):
+        repo = TransactionRepository(list(self.transactions), indexes=("transaction_type",))
+        repo.insert(Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                                category=self.category1, datetime=DateTime(2022, 12, 31, 8, 30)))
+        self.assertEqual([t.name for t in repo.query().limit(2, 1)], ["Dinner", "Salary"])
+        self.assertEqual([t.name for t in repo.query().order_by_datetime().limit(2, 1)], ["Lunch", "Dinner"])
+        expenses = repo.query().type(TransactionType.EXPENSE)
+        self.assertEqual([t.name for t in expenses.limit(1, 1)], ["Dinner"])
+        self.assertEqual([t.name for t in expenses.order_by_datetime().limit(5, 2)], ["Dinner"])
+        self.assertEqual([t.name for t in repo.query().search("meal").limit(1, 1)], ["Dinner"])
+        self.assertEqual(expenses.limit(1).count(), 3)
+        self.assertEqual(expenses.limit(1).to_repository().get_count(), 1)
+
+    def test_name_prefix(self):
+        for repo in (self.repo, TransactionRepository(list(self.transactions), indexes=("name_prefix",))):
+            self.assertEqual([t.name for t in repo.query().name_prefix("Din")], ["Dinner"])
+            self.assertEqual(repo.query().name_prefix("").count(), 3)
+            self.assertEqual(repo.query().name_prefix("D").type(TransactionType.INCOME).count(), 0)
+        repo.insert(Transaction(name="Dim sum", amount=15.0, transaction_type=TransactionType.EXPENSE,
+                                category=self.category1, datetime=DateTime(2023, 1, 3, 11, 0)))
+        repo.erase(self.transactions[1])
+        self.assertEqual([t.name for t in repo.query().name_prefix("Di")], ["Dim sum"])
+        self.assertEqual(repo._get_index("name_prefix").bounds("Sal"), (2, 3))
+        self.assertEqual(repo.query().name_prefix("Di").sum(), 15.0)
+
+    def test_ranking_limit(self):
+        repo = TransactionRepository([
+            Transaction(name="Cafe", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                        category=self.category1, datetime=DateTime(2023, 1, 1, 9, 0), remarks="tea"),
+            Transaction(name="Tea", amount=8.0, transaction_type=TransactionType.EXPENSE,
+                        category=self.category1, datetime=DateTime(2023, 1, 2, 9, 0), remarks="green tea"),
+        ], indexes=("text",))
+        self.assertEqual([t.name for t in repo.search("tea")], ["Tea", "Cafe"])
+        with mock.patch("src.transaction_query.RANK_LIMIT", 1):
+            self.assertEqual([t.name for t in repo.search("tea")], ["Cafe", "Tea"])
+
+    def test_text_search(self):
+        lunch = Transaction(name="公司午餐", amount=25.0, transaction_type=TransactionType.EXPENSE,
+                            category=self.category1, datetime=DateTime(2023, 1, 3, 12, 0), remarks="和同事 ＬＵＮＣＨ")
+        plain = TransactionRepository(list(self.transactions) + [lunch])
+        indexed = TransactionRepository(list(self.transactions), indexes=("text",))
+        indexed.insert(lunch)
+        for repo in (plain, indexed):
+            self.assertEqual([t.name for t in repo.search("lunch")], ["Lunch", "公司午餐"])
+            self.assertEqual([t.name for t in repo.search("午餐")], ["公司午餐"])
+            self.assertEqual([t.name for t in repo.search("司午")], ["公司午餐"])
+            self.assertEqual([t.name for t in repo.search("meal 午")], [])
+            self.assertEqual([t.name for t in repo.search("salary 午", match_all=False)],
+                             ["Salary", "公司午餐"])
+            self.assertEqual(repo.query().search("EAL").type(TransactionType.EXPENSE).count(), 2)
+            self.assertEqual(repo.query().search("l").between(
+                DateTime(2023, 1, 2, 0, 0), DateTime(2023, 1, 6, 0, 0)).order_by_datetime().to_list(),
+                [self.transactions[1], lunch, self.transactions[2]])
+            self.assertEqual(repo.query().search(" ").count(), 4)
+        indexed.erase(lunch)
+        indexed.erase(self.transactions[0])
+        self.assertEqual(indexed.search("lunch"), [])
+        self.assertEqual(indexed.search("meal"), [self.transactions[1]])
+        self.assertEqual(len(indexed._get_index("text")), 2)
+
+    def test_text_index_matches_scan(self):
+        rng = Random(7)
+        words = ["午餐", "晚餐", "咖啡", "地铁", "Coffee", "taxi", "工资", "公司", "超市"]
+        transactions = [
+            Transaction(name=rng.choice(words) + rng.choice(words), amount=float(i),
+                        transaction_type=TransactionType.EXPENSE, category=self.category1,
+                        datetime=DateTime.from_minutes(i), remarks=" ".join(rng.sample(words, 2)))
+            for i in range(300)]
+        plain = TransactionRepository(list(transactions))
+        indexed = TransactionRepository(list(transactions), indexes=("text",))
+        for t in transactions[::3]:
+            plain.erase(t)
+            indexed.erase(t)
+        for text in ("餐", "午餐 公司", "coffee", "ee", "啡地", "c", "地铁 taxi"):
+            for match_all in (True, False):
+                self.assertEqual(indexed.search(text, match_all), plain.search(text, match_all))
+
+    def test_running_stats(self):
+        repo = TransactionRepository(list(self.transactions), indexes=("stats",))
+        stats = repo.get_stats(transaction_type=TransactionType.EXPENSE)
+        self.assertEqual((stats.count, stats.total, stats.min, stats.max), (2, 50.0, 20.0, 30.0))
+        self.assertEqual(repo.get_stats(category=self.category2).total, 3000.0)
+        repo.erase(self.transactions[0])
+        stats = repo.get_stats(transaction_type=TransactionType.EXPENSE)
+        self.assertEqual((stats.count, stats.total, stats.min, stats.max), (1, 30.0, 30.0, 30.0))
+        self.assertEqual(repo.get_min_amount(), 30.0)
+        self.assertEqual(repo.get_max_amount(), 3000.0)
+        self.assertEqual(repo.query().type(TransactionType.EXPENSE).sum(), 30.0)
+        repo.erase(self.transactions[1])
+        stats = repo.get_stats(transaction_type=TransactionType.EXPENSE)
+        self.assertEqual((stats.count, stats.total, stats.mean, stats.max), (0, 0.0, 0.0, 0.0))
+        with self.assertRaises(ValueError):
+            repo.get_stats(TransactionType.INCOME, self.category2)
+
+    def test_group_by(self):
+        self.assertEqual(self.repo.group_by("type").sum(),
+                         {TransactionType.EXPENSE: 50.0, TransactionType.INCOME: 3000.0})
+        self.assertEqual(self.repo.group_by("category").agg("count", "max"),
+                         {self.category1.name: (2, 30.0), self.category2.name: (1, 3000.0)})
+        self.assertEqual(self.repo.group_by("day").count(),
+                         {date(2023, 1, 1): 1, date(2023, 1, 2): 1, date(2023, 1, 5): 1})
+        self.assertEqual(self.repo.group_by("week").sum(),
+                         {date(2022, 12, 26): 20.0, date(2023, 1, 2): 3030.0})
+        self.assertEqual(self.repo.group_by("month").mean(), {date(2023, 1, 1): 3050.0 / 3})
+        self.assertEqual(self.repo.group_by("year").min(), {date(2023, 1, 1): 20.0})
+        query = self.repo.query().type(TransactionType.EXPENSE)
+        self.assertEqual(query.group_by("day").sum(), {date(2023, 1, 1): 20.0, date(2023, 1, 2): 30.0})
+        self.assertEqual(TransactionRepository().group_by("month").sum(), {})
+        with self.assertRaises(ValueError):
+            self.repo.group_by("hour")
+        with self.assertRaises(ValueError):
+            self.repo.group_by("day").agg("median")
+
+    def test_rollups(self):
+        repo = TransactionRepository(list(self.transactions), indexes=("rollup",))
+        breakfast = Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                                category=self.category1, datetime=DateTime(2023, 2, 1, 8, 30))
+        repo.insert(breakfast)
+        expected = TransactionRepository(repo.get_all())
+        for key in ("day", "week", "month", "year"):
+            self.assertEqual(repo.group_by(key).agg("count", "sum", "mean"),
+                             expected.group_by(key).agg("count", "sum", "mean"))
+        self.assertEqual(repo.query().type(TransactionType.EXPENSE).group_by("month").sum(),
+                         {date(2023, 1, 1): 50.0, date(2023, 2, 1): 5.0})
+        january = repo.query().between(DateTime(2023, 1, 1, 0, 0), DateTime(2023, 2, 1, 0, 0),
+                                       include_start=True)
+        self.assertEqual(repo._rollup_rows(january, "month"), [(19358, 3, 3050.0)])
+        self.assertEqual(january.sum(), 3050.0)
+        self.assertEqual(january.category(self.category1).count(), 2)
+        partial = repo.query().between(DateTime(2023, 1, 1, 12, 0), DateTime(2023, 2, 1, 0, 0))
+        self.assertIsNone(repo._rollup_rows(partial, "day"))
+        self.assertEqual(partial.sum(), 3030.0)
+        repo.erase(breakfast)
+        self.assertEqual(repo.group_by("month").sum(), {date(2023, 1, 1): 3050.0})
+        self.assertEqual(repo.group_by("day").max(), expected.group_by("day").max())
+        repo.clear()
+        self.assertEqual(repo.group_by("year").sum(), {})
+
+    def test_range_sums(self):
+        start, end = DateTime(2023, 1, 1, 12, 0), DateTime(2023, 1, 5, 9, 0)
+        self.assertEqual(self.repo.sum_between(start, end), 30.0)
+        self.assertEqual(self.repo.count_between(start, end, include_start=True), 2)
+        self.assertEqual(self.repo.sum_between(start, end, True, True), 3050.0)
+        self.assertEqual(self.repo.sum_between(start, end, True, True, category=self.category1), 50.0)
+        self.assertEqual(self.repo.count_between(start, end, True, True, TransactionType.INCOME), 1)
+        self.assertEqual(self.repo.sum_between(end, start), 0.0)
+        with self.assertRaises(ValueError):
+            self.repo.sum_between(start, end, transaction_type=TransactionType.INCOME, category=self.category2)
+
+    def test_range_sums_follow_insert_and_erase(self):
+        random = Random(7)
+        repo = TransactionRepository(list(self.transactions), indexes=("range_sum",))
+        for i in range(300):
+            repo.insert(Transaction(
+                name=f"T{i}", amount=float(random.randint(1, 100)),
+                transaction_type=random.choice(list(TransactionType)),
+                category=random.choice([self.category1, self.category2]),
+                datetime=DateTime.from_minutes(random.randint(-500000, 500000) + 27876960)))
+        for t in random.sample(repo.get_all(), 100):
+            repo.erase(t)
+        expected = TransactionRepository(repo.get_all())
+        for _ in range(50):
+            a, b = sorted(random.randint(-600000, 600000) + 27876960 for _ in range(2))
+            start, end = DateTime.from_minutes(a), DateTime.from_minutes(b)
+            flags = (random.random() < 0.5, random.random() < 0.5)
+            query = expected.query().between(start, end, *flags)
+            self.assertEqual(repo.count_between(start, end, *flags), query.count())
+            self.assertAlmostEqual(repo.sum_between(start, end, *flags), query.sum())
+            self.assertAlmostEqual(repo.query().between(start, end, *flags).category(self.category2).sum(),
+                                   query.category(self.category2).sum())
+            self.assertEqual(repo.count_between(start, end, *flags, TransactionType.EXPENSE),
+                             query.type(TransactionType.EXPENSE).count())
+        repo.clear()
+        self.assertEqual(repo.sum_between(DateTime(2000, 1, 1), DateTime(2100, 1, 1)), 0.0)
+
     def test_clear(self):
         self.repo.clear()
         self.assertEqual(self.repo.get_count(), 0)
@@ -0,0 +1,117 @@
+import unittest
+import os
+from src.journal_repository import JournaledTransactionRepository
+from src.transaction_repository import TransactionRepository
+from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+
+
+class TestJournaledTransactionRepository(unittest.TestCase):
+
+    def setUp(self):
+        """
+        准备日志文件路径和示例交易
+        """
+        self.journal_path = "test_transactions.jsonl"
+        self.snapshot_path = "test_transactions.json"
+        self.lunch = Transaction(name="Lunch", amount=20.0, transaction_type=TransactionType.EXPENSE,
+                                 category=Category(CategoryType.FOOD), datetime=DateTime(2023, 1, 1, 12, 0))
+        self.salary = Transaction(name="Salary", amount=3000.0, transaction_type=TransactionType.INCOME,
+                                  category=Category(CategoryType.SALARY), datetime=DateTime(2023, 1, 5, 9, 0))
+
+    def tearDown(self):
+        """
+        清理生成的测试文件
+        """
+        for path in (self.journal_path, self.snapshot_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def open(self) -> JournaledTransactionRepository:
+        repo = JournaledTransactionRepository(self.journal_path, self.snapshot_path)
+        self.addCleanup(repo.close)
+        return repo
+
+    def test_insert_and_erase_are_journaled(self):
+        repo = self.open()
+        repo.insert(self.lunch)
+        repo.insert(self.salary)
+        repo.erase(self.lunch)
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        reopened = self.open()
+        self.assertEqual([t.name for t in reopened.get_all()], ["Salary"])
+
+    def test_reload_reads_only_appended_operations(self):
+        writer = self.open()
+        reader = self.open()
+        writer.insert(self.lunch)
+        self.assertEqual(reader.reload(), 1)
+        self.assertEqual(reader.reload(), 0)
+        writer.insert(self.salary)
+        writer.erase(self.lunch)
+        self.assertEqual(reader.reload(), 2)
+        self.assertEqual([t.name for t in reader.get_all()], ["Salary"])
+        self.assertEqual(writer.reload(), 0)
+
+    def test_partial_line_is_left_for_next_reload(self):
+        repo = self.open()
+        repo.insert(self.lunch)
+        with open(self.journal_path, "ab") as f:
+            f.write(b'{"op": "clear"')
+        reader = self.open()
+        self.assertEqual(reader.get_count(), 1)
+        with open(self.journal_path, "ab") as f:
+            f.write(b'}\n')
+        self.assertEqual(reader.reload(), 1)
+        self.assertEqual(reader.get_count(), 0)
+
+    def test_compact(self):
+        repo = self.open()
+        reader = self.open()
+        repo.insert(self.lunch)
+        repo.insert(self.salary)
+        repo.compact()
+        self.assertEqual(repo.journal_size(), 0)
+        self.assertEqual(TransactionRepository.load_from_json(self.snapshot_path).get_count(), 2)
+        repo.erase(self.salary)
+        reader.reload()
+        self.assertEqual([t.name for t in reader.get_all()], ["Lunch"])
+        self.assertEqual([t.name for t in self.open().get_all()], ["Lunch"])
+
+
+    def test_cancelled_compaction_keeps_files(self):
+        repo = self.open()
+        repo.insert(self.lunch)
+        repo.compact()
+        repo.insert(self.salary)
+        with open(self.snapshot_path, "rb") as f:
+            snapshot = f.read()
+
+        def cancel(done, total):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            repo.compact(cancel)
+        with open(self.snapshot_path, "rb") as f:
+            self.assertEqual(f.read(), snapshot)
+        self.assertFalse(os.path.exists(self.snapshot_path + ".tmp"))
+        self.assertEqual([t.name for t in self.open().get_all()], ["Lunch", "Salary"])
+
+    def test_load_progress(self):
+        repo = self.open()
+        for i in range(5000):
+            repo.insert(self.lunch if i % 2 else self.salary)
+        repo.compact()
+        repo.insert(self.lunch)
+        reports = []
+        reopened = JournaledTransactionRepository(self.journal_path, self.snapshot_path,
+                                                  progress=lambda done, total: reports.append((done, total)))
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.get_count(), 5001)
+        total = os.path.getsize(self.snapshot_path) + os.path.getsize(self.journal_path)
+        self.assertEqual(reports[-1], (total, total))
+        self.assertGreater(len(reports), 2)
+        self.assertEqual([done for done, _ in reports], sorted(done for done, _ in reports))
+
+if __name__ == "__main__":
+    unittest.main()
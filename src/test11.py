@@ -0,0 +1,131 @@
+import unittest
+import os
+from datetime import date
+from src.sqlite_repository import SQLiteTransactionRepository
+from src.transaction_repository import TransactionRepository
+from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+
+
+class TestSQLiteTransactionRepository(unittest.TestCase):
+
+    def setUp(self):
+        """
+        初始化测试用例所需的示例数据
+        """
+        self.category1 = Category(CategoryType.FOOD)
+        self.category2 = Category(CategoryType.SALARY)
+        self.transactions = [
+            Transaction(name="Lunch", amount=20.0, transaction_type=TransactionType.EXPENSE,
+                        category=self.category1, datetime=DateTime(2023, 1, 1, 12, 0), remarks="Lunch meal"),
+            Transaction(name="Dinner", amount=30.0, transaction_type=TransactionType.EXPENSE,
+                        category=self.category1, datetime=DateTime(2023, 1, 2, 19, 0), remarks="Dinner meal"),
+            Transaction(name="Salary", amount=3000.0, transaction_type=TransactionType.INCOME,
+                        category=self.category2, datetime=DateTime(2023, 1, 5, 9, 0), remarks="Monthly salary"),
+        ]
+        self.repo = SQLiteTransactionRepository(self.transactions)
+        self.db_path = "test_transactions.db"
+        self.json_path = "test_transactions.json"
+
+    def tearDown(self):
+        """
+        关闭连接并清理生成的测试文件
+        """
+        self.repo.close()
+        for path in (self.db_path, self.json_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_insert_and_erase(self):
+        transaction = Transaction(name="Test", amount=150.0, transaction_type=TransactionType.INCOME,
+                                  category=self.category2, datetime=DateTime(2023, 1, 10, 12, 0))
+        self.repo.insert(transaction)
+        self.assertEqual(self.repo.get_count(), 4)
+        self.assertIn(transaction, self.repo.get_all())
+        self.repo.erase(transaction)
+        self.repo.erase(self.transactions[0])
+        self.assertEqual([t.name for t in self.repo.get_all()], ["Dinner", "Salary"])
+        with self.assertRaises(ValueError):
+            self.repo.erase(self.transactions[0])
+
+    def test_filters_and_sort(self):
+        ranged = self.repo.filter_by_time_range(DateTime(2023, 1, 1, 12, 0), DateTime(2023, 1, 5, 9, 0),
+                                                include_start=True)
+        self.assertEqual([t.name for t in ranged.get_all()], ["Lunch", "Dinner"])
+        self.assertEqual(self.repo.filter_by_type(TransactionType.EXPENSE).get_count(), 2)
+        self.assertEqual(self.repo.filter_by_category(self.category2).get_all()[0].name, "Salary")
+        self.repo.insert(Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                                     category=self.category1, datetime=DateTime(2022, 12, 31, 8, 30)))
+        self.assertEqual([t.name for t in self.repo.sort_by_datetime().get_all()],
+                         ["Breakfast", "Lunch", "Dinner", "Salary"])
+
+    def test_query_limit(self):
+        self.assertEqual([t.name for t in self.repo.query().limit(2, 1)], ["Dinner", "Salary"])
+        self.assertEqual([t.name for t in self.repo.query().type(TransactionType.EXPENSE).limit(5, 1)], ["Dinner"])
+        self.assertEqual([t.name for t in self.repo.query().order_by_datetime().limit(1)], ["Lunch"])
+        self.assertEqual(self.repo.query().limit(1).count(), 3)
+
+    def test_aggregates_are_pushed_down(self):
+        self.assertEqual(self.repo.get_total_amount(), 3050.0)
+        self.assertEqual(self.repo.get_average_amount(), 3050.0 / 3)
+        self.assertEqual(self.repo.get_max_amount(), 3000.0)
+        self.assertEqual(self.repo.get_min_amount(), 20.0)
+        self.assertEqual(self.repo.query().type(TransactionType.EXPENSE).category(self.category1).sum(), 50.0)
+        stats = self.repo.get_stats(transaction_type=TransactionType.INCOME)
+        self.assertEqual((stats.count, stats.total, stats.min, stats.max), (1, 3000.0, 3000.0, 3000.0))
+        self.repo.clear()
+        self.assertEqual(self.repo.get_max_amount(), 0.0)
+        self.assertEqual(self.repo.get_total_amount(), 0.0)
+
+    def test_name_prefix(self):
+        self.assertEqual([t.name for t in self.repo.query().name_prefix("Lu")], ["Lunch"])
+        self.assertEqual(self.repo.query().name_prefix("").count(), 3)
+        self.assertEqual(self.repo.query().name_prefix("S").type(TransactionType.EXPENSE).count(), 0)
+
+    def test_text_search(self):
+        self.assertEqual([t.name for t in self.repo.search("MEAL")], ["Lunch", "Dinner"])
+        self.assertEqual([t.name for t in self.repo.search("salary dinner", match_all=False)],
+                         ["Dinner", "Salary"])
+        self.assertEqual(self.repo.query().search("meal").type(TransactionType.INCOME).count(), 0)
+        self.assertEqual(self.repo.query().search("ａｌ").sum(), 3050.0)
+
+    def test_range_sums(self):
+        start, end = DateTime(2023, 1, 1, 12, 0), DateTime(2023, 1, 5, 9, 0)
+        self.assertEqual(self.repo.sum_between(start, end), 30.0)
+        self.assertEqual(self.repo.count_between(start, end, True, True), 3)
+        self.assertEqual(self.repo.sum_between(start, end, True, True, category=self.category1), 50.0)
+        with self.assertRaises(ValueError):
+            self.repo.count_between(start, end, transaction_type=TransactionType.INCOME, category=self.category2)
+
+    def test_group_by_matches_list_repository(self):
+        self.repo.insert(Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                                     category=self.category1, datetime=DateTime(1969, 12, 31, 8, 30)))
+        expected = TransactionRepository(self.repo.get_all())
+        for key in ("category", "type", "day", "week", "month", "year"):
+            self.assertEqual(self.repo.group_by(key).agg("count", "sum", "min", "max"),
+                             expected.group_by(key).agg("count", "sum", "min", "max"))
+        query = self.repo.query().category(self.category1)
+        self.assertEqual(query.group_by("day").sum(),
+                         {date(1969, 12, 31): 5.0, date(2023, 1, 1): 20.0, date(2023, 1, 2): 30.0})
+        self.assertEqual(self.repo.query().name("Nothing").group_by("month").sum(), {})
+
+    def test_find_by_name(self):
+        found = self.repo.find_by_name("Lunch")
+        self.assertEqual(found.remarks, "Lunch meal")
+        self.assertIs(self.repo.find_by_name("Lunch"), found)
+        self.assertIsNone(self.repo.find_by_name("Nothing"))
+        self.assertEqual(len(self.repo.find_all_by_name("Dinner")), 1)
+
+    def test_json_roundtrip_and_persistence(self):
+        self.repo.save_to_json(self.json_path)
+        loaded = SQLiteTransactionRepository.load_from_json(self.json_path, db_path=self.db_path)
+        self.assertEqual(loaded.get_count(), 3)
+        loaded.close()
+        reopened = SQLiteTransactionRepository(db_path=self.db_path)
+        self.assertEqual(reopened.find_by_name("Salary").amount, 3000.0)
+        self.assertEqual(TransactionRepository.load_from_json(self.json_path).get_total_amount(),
+                         reopened.get_total_amount())
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
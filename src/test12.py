@@ -0,0 +1,73 @@
+import unittest
+from src.transaction import (
+    Transaction,
+    TransactionType,
+    Category,
+    CategoryDictionary,
+    DateTime,
+    CategoryType
+)
+
+
+class TestTransactionModel(unittest.TestCase):
+
+    def test_datetime_fields_and_string(self):
+        dt = DateTime(2023, 2, 28, 23, 59)
+        self.assertEqual((dt.year, dt.month, dt.day, dt.hour, dt.minute), (2023, 2, 28, 23, 59))
+        self.assertEqual(str(dt), "2023-02-28 23:59")
+        self.assertEqual(str(DateTime(1969, 12, 31, 1, 2)), "1969-12-31 01:02")
+
+    def test_datetime_from_string(self):
+        self.assertEqual(DateTime.from_string("2023-01-05 09:00"), DateTime(2023, 1, 5, 9, 0))
+        self.assertEqual(DateTime.from_string("2023-1-5 9:07"), DateTime(2023, 1, 5, 9, 7))
+        with self.assertRaises(ValueError):
+            DateTime.from_string("2023-02-30 00:00")
+
+    def test_datetime_minutes_roundtrip(self):
+        dt = DateTime(2024, 2, 29, 13, 45)
+        self.assertEqual(DateTime.from_minutes(dt.to_minutes()), dt)
+        self.assertEqual(DateTime(1970, 1, 1, 0, 1).to_minutes(), 1)
+
+    def test_datetime_equality_ordering_and_hash(self):
+        morning, evening = DateTime(2023, 1, 1, 8, 0), DateTime(2023, 1, 1, 20, 0)
+        self.assertNotEqual(morning, evening)
+        self.assertLess(morning, evening)
+        self.assertLessEqual(morning, DateTime(2023, 1, 1, 8, 0))
+        self.assertGreater(evening, morning)
+        self.assertEqual(len({morning, DateTime(2023, 1, 1, 8, 0), evening}), 2)
+        self.assertNotEqual(morning, "2023-01-01 08:00")
+        with self.assertRaises(ValueError):
+            DateTime(2023, 1, 1, 24, 0)
+
+    def test_enum_from_string(self):
+        self.assertIs(TransactionType.from_string(1), TransactionType.EXPENSE)
+        self.assertIs(CategoryType.from_string(3), CategoryType.SALARY)
+        self.assertIs(CategoryType.from_string("Books"), CategoryType.OTHER)
+        with self.assertRaises(ValueError):
+            TransactionType.from_string(7)
+
+    def test_category_dictionary(self):
+        categories = CategoryDictionary()
+        food = Category(CategoryType.FOOD)
+        self.assertEqual(categories.encode(food), 0)
+        self.assertEqual(categories.encode(Category(CategoryType.FOOD)), 0)
+        self.assertIs(categories.decode(0), food)
+        self.assertIs(categories.get(0), food)
+        books = categories.get("Books")
+        self.assertIs(categories.get("Books"), books)
+        self.assertEqual(books.category_type, CategoryType.OTHER)
+        self.assertEqual(categories.code_of("Books"), 1)
+        self.assertEqual(categories.code_of("Games"), -1)
+        self.assertEqual(categories.names(), [0, "Books"])
+        self.assertEqual(len(categories.copy()), 2)
+
+    def test_slotted_objects(self):
+        transaction = Transaction("Lunch", 20.0, TransactionType.EXPENSE,
+                                  Category(CategoryType.FOOD), DateTime(2023, 1, 1, 12, 0))
+        for obj in (transaction, transaction.category, transaction.datetime):
+            self.assertFalse(hasattr(obj, "__dict__"))
+        self.assertEqual(transaction.remarks, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
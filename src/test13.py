@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+from src.downsample import lttb, minmax
+from src.plot_service import PlotService
+from src.transaction_repository import TransactionRepository
+from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+
+
+class TestDownsample(unittest.TestCase):
+
+    def setUp(self):
+        """
+        初始化一条带尖峰的长时间序列
+        """
+        self.x = np.arange(10000, dtype=np.float64)
+        self.y = np.sin(self.x / 300.0)
+        self.y[4321] = 50.0
+        self.y[7777] = -50.0
+
+    def test_lttb(self):
+        keep = lttb(self.x, self.y, 500)
+        self.assertEqual(len(keep), 500)
+        self.assertEqual((keep[0], keep[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(4321, keep)
+        self.assertIn(7777, keep)
+        self.assertEqual(list(lttb(self.x[:10], self.y[:10], 500)), list(range(10)))
+
+    def test_minmax(self):
+        keep = minmax(self.x, self.y, 250)
+        self.assertLessEqual(len(keep), 500)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(4321, keep)
+        self.assertIn(7777, keep)
+        self.assertEqual(self.y[keep].max(), 50.0)
+        self.assertEqual(list(minmax(self.x[:10], self.y[:10], 250)), list(range(10)))
+
+    def test_line_plot_points_follow_width(self):
+        category = Category(CategoryType.FOOD)
+        repo = TransactionRepository([
+            Transaction(name=f"T{i}", amount=float(i % 97), transaction_type=TransactionType.EXPENSE,
+                        category=category, datetime=DateTime.from_minutes(i * 1440 + 720))
+            for i in range(3000)])
+        for method in ("lttb", "minmax"):
+            service = PlotService(style="line", downsample=method)
+            line = service.get_plot(repo, 400).axes[0].lines[0]
+            self.assertLessEqual(len(line.get_xdata()), 400)
+            self.assertIn(line.get_marker(), ("", "None"))
+            service.render(repo, 200, 100)
+            self.assertLessEqual(len(line.get_xdata()), 200)
+        full = PlotService(style="line", downsample=None).get_plot(repo, 400).axes[0].lines[0]
+        self.assertEqual(len(full.get_xdata()), 3000)
+        with self.assertRaises(ValueError):
+            PlotService(style="line", downsample="median")
+
+
+if __name__ == "__main__":
+    unittest.main()
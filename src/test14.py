@@ -0,0 +1,70 @@
+import unittest
+import os
+import shutil
+import tempfile
+from src.batch_export import ChartSpec, export_charts
+from src.transaction_repository import TransactionRepository
+from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+
+
+class TestBatchExport(unittest.TestCase):
+
+    def setUp(self):
+        """
+        生成临时账本文件
+        """
+        self.directory = tempfile.mkdtemp()
+        food, salary = Category(CategoryType.FOOD), Category(CategoryType.SALARY)
+        repo = TransactionRepository([
+            Transaction(name=f"Meal {i}", amount=10.0 + i, transaction_type=TransactionType.EXPENSE,
+                        category=food, datetime=DateTime(2023, 1 + i % 3, 1 + i % 28, 12, 0))
+            for i in range(60)] + [
+            Transaction(name="Salary", amount=3000.0, transaction_type=TransactionType.INCOME,
+                        category=salary, datetime=DateTime(2023, month, 5, 9, 0))
+            for month in (1, 2, 3)])
+        self.json_path = os.path.join(self.directory, "ledger.json")
+        self.binary_path = os.path.join(self.directory, "ledger.bin")
+        repo.save_to_json(self.json_path)
+        repo.save_to_binary(self.binary_path)
+
+    def tearDown(self):
+        """
+        删除临时文件
+        """
+        shutil.rmtree(self.directory)
+
+    def _specs(self, prefix: str) -> list[ChartSpec]:
+        specs = [ChartSpec(os.path.join(self.directory, prefix, f"2023-{month:02}.png"), style="line",
+                           start=f"2023-{month:02}-01 00:00", end=f"2023-{month + 1:02}-01 00:00",
+                           include_start=True, transaction_type=1)
+                 for month in (1, 2, 3)]
+        specs.append(ChartSpec(os.path.join(self.directory, prefix, "food.svg"), style="bar", category=0))
+        specs.append(ChartSpec(os.path.join(self.directory, prefix, "all.png"), style="pie",
+                               width=400, height=300))
+        return specs
+
+    def test_export_in_process_pool(self):
+        specs = self._specs("pool")
+        outputs = export_charts(self.binary_path, specs, processes=2)
+        self.assertEqual(outputs, [spec.output for spec in specs])
+        for output in outputs:
+            with open(output, "rb") as f:
+                header = f.read(64)
+            if output.endswith(".png"):
+                self.assertTrue(header.startswith(b"\x89PNG"))
+            else:
+                self.assertIn(b"<?xml", header)
+
+    def test_export_in_current_process(self):
+        outputs = export_charts(self.json_path, self._specs("inline"), processes=1)
+        self.assertTrue(all(os.path.getsize(output) > 0 for output in outputs))
+
+    def test_invalid_specs(self):
+        with self.assertRaises(ValueError):
+            ChartSpec("report.pdf")
+        with self.assertRaises(ValueError):
+            ChartSpec("report.png", start="2023-01-01 00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
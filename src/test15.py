@@ -0,0 +1,43 @@
+import unittest
+import os
+import sys
+import subprocess
+
+
+class TestStartup(unittest.TestCase):
+
+    def import_report(self, module: str) -> dict:
+        """
+        在新的解释器中用-X importtime导入模块，返回模块名到累计导入耗时（微秒）的字典
+        """
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join((os.path.dirname(src_dir), src_dir)))
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=src_dir, env=env, capture_output=True, text=True, check=True)
+        report = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line.split("|")
+                if cumulative.strip().isdigit():
+                    report[name.strip()] = int(cumulative)
+        return report
+
+    def test_main_window_does_not_import_matplotlib(self):
+        report = self.import_report("main_window")
+        self.assertIn("main_window", report)
+        self.assertFalse([name for name in report if name.split(".")[0] == "matplotlib"])
+
+    def test_gui_shares_repository_modules(self):
+        report = self.import_report("main_window")
+        self.assertIn("src.transaction", report)
+        for module in ("transaction", "transaction_repository", "transaction_query", "indexes"):
+            self.assertNotIn(module, report)
+
+    def test_plot_service_is_loaded_on_demand(self):
+        report = self.import_report("dialogs")
+        self.assertNotIn("plot_service", report)
+        self.assertNotIn("plot_worker", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
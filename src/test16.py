@@ -0,0 +1,213 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from datetime import date
+from random import Random
+from src.partitioned_repository import PartitionedTransactionRepository
+from src.transaction_repository import TransactionRepository, transaction_to_record
+from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+
+
+def records(transactions: list[Transaction]) -> list[dict]:
+    return [transaction_to_record(t) for t in transactions]
+
+
+class TestPartitionedTransactionRepository(unittest.TestCase):
+
+    def setUp(self):
+        """
+        准备分区目录和跨越多个月份的示例交易
+        """
+        self.directory = tempfile.mkdtemp()
+        self.food = Category(CategoryType.FOOD)
+        self.salary = Category(CategoryType.SALARY)
+        random = Random(5)
+        self.transactions = [
+            Transaction(name=f"T{i}", amount=float(random.randint(1, 100)),
+                        transaction_type=random.choice(list(TransactionType)),
+                        category=random.choice([self.food, self.salary]),
+                        datetime=DateTime.from_minutes(
+                            DateTime(2022, 6, 1).to_minutes() + random.randint(0, 400 * 1440)))
+            for i in range(500)]
+
+    def tearDown(self):
+        """
+        删除分区目录
+        """
+        shutil.rmtree(self.directory)
+
+    def open(self, granularity: str = "month") -> PartitionedTransactionRepository:
+        return PartitionedTransactionRepository(self.directory, granularity)
+
+    def saved(self) -> PartitionedTransactionRepository:
+        repo = self.open()
+        repo.extend(self.transactions)
+        repo.save()
+        return self.open()
+
+    def test_partition_files(self):
+        repo = self.saved()
+        names = sorted(os.listdir(self.directory))
+        self.assertIn("manifest.json", names)
+        self.assertIn("2022-06.json", names)
+        self.assertEqual(len(names), len({(t.datetime.year, t.datetime.month) for t in self.transactions}) + 1)
+        self.assertEqual(repo.loaded_partitions(), [])
+
+    def test_matches_list_repository(self):
+        repo = self.saved()
+        expected = TransactionRepository(list(self.transactions))
+        start, end = DateTime(2022, 9, 15, 8, 0), DateTime(2023, 2, 1, 0, 0)
+        for build in (lambda r: r.query(),
+                      lambda r: r.query().type(TransactionType.INCOME),
+                      lambda r: r.query().category(self.food).between(start, end, True, False),
+                      lambda r: r.query().between(start, end).name("T7")):
+            for op in ("count", "sum", "mean", "min", "max"):
+                self.assertAlmostEqual(getattr(build(repo), op)(), getattr(build(expected), op)())
+            for key in ("category", "type", "week", "month"):
+                self.assertEqual(build(repo).group_by(key).agg("count", "sum", "min", "max"),
+                                 build(expected).group_by(key).agg("count", "sum", "min", "max"))
+            self.assertEqual(records(build(repo).order_by_datetime().to_list()),
+                             records(build(expected).order_by_datetime().to_list()))
+        self.assertEqual(repo.get_count(), 500)
+        self.assertEqual(repo.sum_between(start, end, category=self.salary),
+                         expected.sum_between(start, end, category=self.salary))
+        self.assertEqual(records([repo.find_by_name("T3")]), records([expected.find_by_name("T3")]))
+
+    def test_query_limit(self):
+        repo = self.saved()
+        expected = TransactionRepository(list(self.transactions))
+        for build in (lambda r: r.query().order_by_datetime(),
+                      lambda r: r.query().category(self.food).order_by_datetime()):
+            self.assertEqual(records(build(repo).limit(30, 200).to_list()),
+                             records(build(expected).to_list()[200:230]))
+        self.assertEqual(len(repo.query().limit(10, 495).to_list()), 5)
+        repo = self.open()
+        page = repo.query().order_by_datetime().limit(10, 480).to_list()
+        self.assertEqual(records(page), records(expected.query().order_by_datetime().to_list()[480:490]))
+        self.assertEqual(repo.loaded_partitions(),
+                         sorted({date(t.datetime.year, t.datetime.month, 1) for t in page}))
+
+    def test_pruning_and_lazy_loading(self):
+        repo = self.saved()
+        stats = repo.get_stats(transaction_type=TransactionType.EXPENSE)
+        self.assertEqual(stats.count, sum(t.transaction_type == TransactionType.EXPENSE for t in self.transactions))
+        self.assertEqual(repo.query().between(DateTime(2022, 8, 1), DateTime(2022, 10, 1), True).sum(),
+                         sum(t.amount for t in self.transactions
+                             if DateTime(2022, 8, 1) <= t.datetime < DateTime(2022, 10, 1)))
+        self.assertEqual(repo.loaded_partitions(), [])
+        rows = repo.query().between(DateTime(2022, 8, 10), DateTime(2022, 9, 5)).to_list()
+        self.assertEqual(repo.loaded_partitions(), [date(2022, 8, 1), date(2022, 9, 1)])
+        self.assertTrue(all(DateTime(2022, 8, 10) < t.datetime < DateTime(2022, 9, 5) for t in rows))
+
+    def test_loaded_partitions_use_indexes(self):
+        self.saved()
+        repo = PartitionedTransactionRepository(self.directory, indexes=("stats", "rollup"))
+        repo.insert(Transaction(name="Lunch", amount=20.0, transaction_type=TransactionType.EXPENSE,
+                                category=self.food, datetime=DateTime(2023, 1, 1, 12, 0)))
+        repo.query().between(DateTime(2022, 8, 1), DateTime(2022, 9, 1)).to_list()
+        expected = TransactionRepository(self.transactions + repo.find_all_by_name("Lunch"))
+        expected_stats = expected.get_stats(transaction_type=TransactionType.EXPENSE)
+        expected_sum = expected.query().between(DateTime(2022, 12, 1), DateTime(2023, 2, 1), True).sum()
+        with mock.patch.object(TransactionRepository, "_iter_matches", side_effect=AssertionError):
+            stats = repo.get_stats(transaction_type=TransactionType.EXPENSE)
+            self.assertEqual((stats.count, stats.total, stats.min, stats.max),
+                             (expected_stats.count, expected_stats.total, expected_stats.min, expected_stats.max))
+            self.assertEqual(repo.get_count(), 501)
+            self.assertEqual(repo.query().between(DateTime(2022, 12, 1), DateTime(2023, 2, 1), True).sum(),
+                             expected_sum)
+
+    def test_create_index_while_loading(self):
+        repo = self.open("day")
+        repo.extend(self.transactions)
+        repo.save()
+        repo = self.open("day")
+        errors = []
+        loaded = threading.Event()
+
+        def build():
+            try:
+                while not loaded.is_set():
+                    repo.create_index("name")
+                    repo.drop_index("name")
+                for name in ("transaction_type", "category", "name"):
+                    repo.create_index(name)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=build)
+        thread.start()
+        counts = repo.group_by("category").count()
+        loaded.set()
+        thread.join()
+        self.assertEqual(counts, TransactionRepository(self.transactions).group_by("category").count())
+        self.assertEqual(errors, [])
+        for partition in repo._partitions.values():
+            self.assertEqual(sorted(partition._indexes), ["category", "name", "transaction_type"])
+
+    def test_save_rewrites_only_dirty_partitions(self):
+        repo = self.saved()
+        path = os.path.join(self.directory, "2022-07.json")
+        untouched = os.stat(path).st_mtime_ns
+        lunch = Transaction(name="Lunch", amount=20.0, transaction_type=TransactionType.EXPENSE,
+                            category=self.food, datetime=DateTime(2023, 1, 1, 12, 0))
+        repo.insert(lunch)
+        victim = repo.query().between(DateTime(2022, 12, 1), DateTime(2023, 1, 1), True).to_list()[0]
+        repo.erase(victim)
+        self.assertEqual(repo.dirty_partitions(), [date(2022, 12, 1), date(2023, 1, 1)])
+        repo.save()
+        self.assertEqual(repo.dirty_partitions(), [])
+        self.assertEqual(os.stat(path).st_mtime_ns, untouched)
+        reopened = self.open()
+        self.assertEqual(reopened.get_count(), 500)
+        self.assertEqual(reopened.find_all_by_name("Lunch")[0].amount, 20.0)
+        self.assertEqual(reopened.find_all_by_name(victim.name), [])
+
+    def test_clear_removes_partition_files(self):
+        repo = self.saved()
+        repo.clear()
+        self.assertEqual(repo.get_count(), 0)
+        repo.save()
+        self.assertEqual(os.listdir(self.directory), ["manifest.json"])
+        self.assertEqual(self.open().get_all(), [])
+
+    def test_stale_manifest_is_ignored(self):
+        self.saved()
+        path = os.path.join(self.directory, "2022-06.json")
+        TransactionRepository([self.transactions[0]]).save_to_json(path)
+        repo = self.open()
+        expected = [t for t in self.transactions
+                    if (t.datetime.year, t.datetime.month) != (2022, 6)] + [self.transactions[0]]
+        self.assertEqual(repo.get_count(), len(expected))
+        self.assertEqual(repo.get_total_amount(), sum(t.amount for t in expected))
+
+    def test_granularity(self):
+        repo = self.open("year")
+        repo.extend(self.transactions)
+        repo.save()
+        self.assertEqual(sorted(os.listdir(self.directory)), ["2022.json", "2023.json", "manifest.json"])
+        with self.assertRaises(ValueError):
+            self.open("month")
+        self.assertEqual(self.open("year").group_by("month").count(),
+                         TransactionRepository(self.transactions).group_by("month").count())
+
+    def test_cancelled_save_keeps_files(self):
+        repo = self.saved()
+        repo.insert(Transaction(name="Lunch", amount=20.0, transaction_type=TransactionType.EXPENSE,
+                                category=self.food, datetime=DateTime(2023, 1, 1, 12, 0)))
+
+        def cancel(done, total):
+            raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            repo.save(cancel)
+        self.assertEqual(repo.dirty_partitions(), [date(2023, 1, 1)])
+        self.assertEqual(self.open().get_count(), 500)
+        repo.save()
+        self.assertEqual(self.open().get_count(), 501)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -55,6 +55,22 @@ class TestTransactionRepositoryIntegration(unittest.TestCase):
             self.assertEqual(loaded_transaction.transaction_type, original_transaction.transaction_type)
             self.assertEqual(loaded_transaction.remarks, original_transaction.remarks)
 
+    def test_load_shares_categories_and_names(self):
+        """
+        集成测试流程：保存 -> 加载 -> 相同类别共享实例，类别编码可用于分组
+        """
+        repo = TransactionRepository(self.transactions + [Transaction(
+            name="Lunch", amount=12.0, transaction_type=TransactionType.EXPENSE,
+            category=self.category_food, datetime=DateTime(2023, 10, 2, 12, 0))])
+        repo.save_to_json(self.file_path)
+        loaded = TransactionRepository.load_from_json(self.file_path).get_all()
+        self.assertIs(loaded[0].category, loaded[2].category)
+        self.assertIs(loaded[0].name, loaded[2].name)
+        codes, categories = TransactionRepository(loaded).get_category_codes()
+        self.assertEqual(codes, [0, 1, 0])
+        self.assertIs(categories.decode(0), loaded[0].category)
+        self.assertEqual(TransactionRepository(loaded).get_type_codes(), [1, 0, 1])
+
     def test_filter_and_sort_integration(self):
         """
         集成测试流程：插入交易记录 -> 按类别过滤 -> 按时间排序
@@ -1,5 +1,12 @@
 import unittest
-from src.plot_service import PlotService
+import os
+import json
+import tempfile
+from unittest import mock
+import matplotlib
+from matplotlib import pyplot as plt
+from src import plot_service
+from src.plot_service import PlotService, configure_fonts
 from src.transaction_repository import TransactionRepository
 from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
 
@@ -63,6 +70,66 @@ class TestPlotService(unittest.TestCase):
         ax = fig.axes[0]
         self.assertEqual(len(ax.patches), 2, "Pie chart should have 2 slices (categories)")
 
+    def test_figure_cache(self):
+        """
+        测试图表按数据版本缓存，数据变化时原地更新，且不注册到pyplot
+        """
+        fig = self.bar_service.get_plot(self.repo)
+        bars = list(fig.axes[0].patches)
+        version = self.repo.version
+        self.assertIs(self.bar_service.get_plot(self.repo), fig)
+        self.repo.insert(Transaction(
+            name="Snack",
+            amount=5.0,
+            transaction_type=TransactionType.EXPENSE,
+            category=Category(CategoryType.FOOD),
+            datetime=DateTime(2023, 1, 2, 15, 0)))
+        self.assertGreater(self.repo.version, version)
+        self.assertIs(self.bar_service.get_plot(self.repo), fig)
+        self.assertEqual(list(fig.axes[0].patches), bars)
+        self.assertEqual(bars[0].get_height(), 65.0)
+        line_fig = self.line_service.get_plot(self.repo)
+        line = line_fig.axes[0].lines[0]
+        self.repo.erase(self.repo.get_all()[-1])
+        self.assertIs(self.line_service.get_plot(self.repo), line_fig)
+        self.assertIs(line_fig.axes[0].lines[0], line)
+        self.assertEqual(list(line.get_ydata()), [60.0, 3000.0])
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_render(self):
+        """
+        测试使用Agg后端渲染为RGBA像素数据
+        """
+        data, width, height = self.pie_service.render(self.repo, 320, 240)
+        self.assertEqual((width, height), (320, 240))
+        self.assertEqual(len(data), 320 * 240 * 4)
+        self.assertEqual(self.pie_service.render(self.repo, 160, 120)[1:], (160, 120))
+
+    def test_configure_fonts_caches_choice(self):
+        """
+        测试中文字体的选择结果被缓存，之后的运行不再扫描字体列表
+        """
+        cache_path = os.path.join(tempfile.mkdtemp(), "fonts.json")
+        self.addCleanup(os.rmdir, os.path.dirname(cache_path))
+        self.addCleanup(os.remove, cache_path)
+        saved = matplotlib.rcParams.copy()
+        self.addCleanup(matplotlib.rcParams.update, saved)
+        self.addCleanup(setattr, plot_service, "_configured_font", None)
+
+        plot_service._configured_font = None
+        font = configure_fonts(cache_path)
+        with open(cache_path, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["font"], font)
+        self.assertFalse(matplotlib.rcParams["axes.unicode_minus"])
+        if font:
+            self.assertEqual(matplotlib.rcParams["font.sans-serif"][0], font)
+
+        plot_service._configured_font = None
+        with mock.patch.object(plot_service.font_manager, "fontManager") as manager:
+            self.assertEqual(configure_fonts(cache_path), font)
+        manager.ttflist.__iter__.assert_not_called()
+        self.assertEqual(configure_fonts(cache_path), font)
+
     def test_unsupported_plot_style(self):
         """
         测试不支持的图表样式
@@ -0,0 +1,197 @@
+import unittest
+import os
+from datetime import date
+import json
+from random import Random
+from src.columnar_repository import ColumnarTransactionRepository
+from src.transaction_repository import TransactionRepository
+from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+
+
+class TestColumnarTransactionRepository(unittest.TestCase):
+
+    def setUp(self):
+        """
+        初始化测试用例所需的示例数据
+        """
+        self.category1 = Category(CategoryType.FOOD)
+        self.category2 = Category(CategoryType.SALARY)
+
+        self.transactions = [
+            Transaction(name="Lunch", amount=20.0, transaction_type=TransactionType.EXPENSE,
+                        category=self.category1, datetime=DateTime(2023, 1, 1, 12, 0), remarks="Lunch meal"),
+            Transaction(name="Dinner", amount=30.0, transaction_type=TransactionType.EXPENSE,
+                        category=self.category1, datetime=DateTime(2023, 1, 2, 19, 0), remarks="Dinner meal"),
+            Transaction(name="Salary", amount=3000.0, transaction_type=TransactionType.INCOME,
+                        category=self.category2, datetime=DateTime(2023, 1, 5, 9, 0), remarks="Monthly salary"),
+        ]
+        self.repo = ColumnarTransactionRepository(self.transactions)
+
+    def test_insert(self):
+        transaction = Transaction(name="Test", amount=150.0, transaction_type=TransactionType.INCOME,
+                                   category=self.category2, datetime=DateTime(2023, 1, 10, 12, 0))
+        initial_count = self.repo.get_count()
+        self.repo.insert(transaction)
+        self.assertEqual(self.repo.get_count(), initial_count + 1)
+        self.assertEqual(self.repo.get_all()[-1].name, "Test")
+
+    def test_insert_after_get_all_keeps_identity(self):
+        self.repo.get_all()
+        transaction = Transaction(name="Test", amount=150.0, transaction_type=TransactionType.INCOME,
+                                   category=self.category2, datetime=DateTime(2023, 1, 10, 12, 0))
+        self.repo.insert(transaction)
+        self.assertIn(transaction, self.repo.get_all())
+
+    def test_erase(self):
+        self.repo.erase(self.transactions[0])
+        self.assertEqual(self.repo.get_count(), 2)
+        self.assertIsNone(self.repo.find_by_name("Lunch"))
+        with self.assertRaises(ValueError):
+            self.repo.erase(self.transactions[0])
+
+    def test_filter_by_time_range(self):
+        filtered_repo = self.repo.filter_by_time_range(DateTime(2023, 1, 1, 0, 0), DateTime(2023, 1, 2, 23, 59))
+        self.assertIsInstance(filtered_repo, ColumnarTransactionRepository)
+        self.assertEqual([t.name for t in filtered_repo.get_all()], ["Lunch", "Dinner"])
+
+    def test_filter_by_type(self):
+        filtered_repo = self.repo.filter_by_type(TransactionType.EXPENSE)
+        self.assertEqual(filtered_repo.get_count(), 2)
+        self.assertEqual(filtered_repo.get_total_amount(), 50.0)
+
+    def test_filter_by_category(self):
+        filtered_repo = self.repo.filter_by_category(self.category2)
+        self.assertEqual(filtered_repo.get_count(), 1)
+        self.assertIs(filtered_repo.get_all()[0].category, self.category2)
+
+    def test_sort_by_datetime(self):
+        self.repo.insert(Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                                     category=self.category1, datetime=DateTime(2022, 12, 31, 8, 30)))
+        sorted_repo = self.repo.sort_by_datetime()
+        self.assertEqual([str(t.datetime) for t in sorted_repo.get_all()],
+                         ["2022-12-31 08:30", "2023-01-01 12:00", "2023-01-02 19:00", "2023-01-05 09:00"])
+
+    def test_query_chain(self):
+        query = self.repo.query().type(TransactionType.EXPENSE).category(self.category1)
+        self.assertEqual(query.sum(), 50.0)
+        self.assertEqual(query.count(), 2)
+        ranged = query.between(DateTime(2023, 1, 1, 12, 0), DateTime(2023, 1, 2, 0, 0), include_start=True)
+        self.assertEqual([t.name for t in ranged], ["Lunch"])
+        self.assertIsInstance(ranged.to_repository(), ColumnarTransactionRepository)
+        self.assertEqual(self.repo.query().name("Salary").mean(), 3000.0)
+
+    def test_query_limit(self):
+        self.assertEqual([t.name for t in self.repo.query().limit(2, 1)], ["Dinner", "Salary"])
+        self.assertEqual([t.name for t in self.repo.query().type(TransactionType.EXPENSE).limit(5, 1)], ["Dinner"])
+        self.assertEqual(self.repo.query().order_by_datetime().limit(1, 2).to_repository().get_all()[0].name,
+                         "Salary")
+        self.assertEqual(self.repo.query().limit(1).sum(), 3050.0)
+
+    def test_aggregates(self):
+        amounts = [t.amount for t in self.transactions]
+        self.assertEqual(self.repo.get_total_amount(), sum(amounts))
+        self.assertEqual(self.repo.get_average_amount(), sum(amounts) / len(amounts))
+        self.assertEqual(self.repo.get_max_amount(), max(amounts))
+        self.assertEqual(self.repo.get_min_amount(), min(amounts))
+
+    def test_get_stats(self):
+        stats = self.repo.get_stats(transaction_type=TransactionType.EXPENSE)
+        self.assertEqual((stats.count, stats.total, stats.min, stats.max), (2, 50.0, 20.0, 30.0))
+        self.assertEqual(self.repo.get_stats(category=self.category2).mean, 3000.0)
+
+    def test_name_prefix(self):
+        self.assertEqual([t.name for t in self.repo.query().name_prefix("Lu")], ["Lunch"])
+        self.assertEqual(self.repo.query().name_prefix("").count(), 3)
+        self.assertEqual(self.repo.query().name_prefix("S").type(TransactionType.EXPENSE).count(), 0)
+
+    def test_text_search(self):
+        self.assertEqual([t.name for t in self.repo.search("MEAL")], ["Lunch", "Dinner"])
+        self.assertEqual([t.name for t in self.repo.search("salary dinner", match_all=False)],
+                         ["Dinner", "Salary"])
+        self.assertEqual(self.repo.query().search("meal").type(TransactionType.INCOME).count(), 0)
+        self.assertEqual(self.repo.query().search("ａｌ").sum(), 3050.0)
+
+    def test_range_sums(self):
+        start, end = DateTime(2023, 1, 1, 12, 0), DateTime(2023, 1, 5, 9, 0)
+        self.assertEqual(self.repo.sum_between(start, end), 30.0)
+        self.assertEqual(self.repo.count_between(start, end, True, True), 3)
+        self.assertEqual(self.repo.sum_between(start, end, True, True, category=self.category1), 50.0)
+        with self.assertRaises(ValueError):
+            self.repo.count_between(start, end, transaction_type=TransactionType.INCOME, category=self.category2)
+
+    def test_group_by_matches_list_repository(self):
+        self.repo.insert(Transaction(name="Breakfast", amount=5.0, transaction_type=TransactionType.EXPENSE,
+                                     category=self.category1, datetime=DateTime(1969, 12, 31, 8, 30)))
+        expected = TransactionRepository(self.repo.get_all())
+        for key in ("category", "type", "day", "week", "month", "year"):
+            self.assertEqual(self.repo.group_by(key).agg("count", "sum", "min", "max"),
+                             expected.group_by(key).agg("count", "sum", "min", "max"))
+        query = self.repo.query().category(self.category1)
+        self.assertEqual(query.group_by("day").sum(),
+                         {date(1969, 12, 31): 5.0, date(2023, 1, 1): 20.0, date(2023, 1, 2): 30.0})
+        self.assertEqual(self.repo.query().name("Nothing").group_by("month").sum(), {})
+
+    def test_parallel_aggregation(self):
+        random = Random(11)
+        transactions = [
+            Transaction(name=f"T{i}", amount=float(random.randint(1, 100)),
+                        transaction_type=random.choice(list(TransactionType)),
+                        category=random.choice([self.category1, self.category2]),
+                        datetime=DateTime.from_minutes(random.randint(-500000, 500000) + 27876960))
+            for i in range(2000)]
+        expected = TransactionRepository(list(transactions))
+        repo = ColumnarTransactionRepository(transactions)
+        repo.set_parallel(processes=2, threshold=0)
+        self.addCleanup(repo.parallel.close)
+        start, end = DateTime(2022, 6, 1, 0, 0), DateTime(2023, 3, 1, 0, 0)
+        for build in (lambda r: r.query(),
+                      lambda r: r.query().type(TransactionType.INCOME),
+                      lambda r: r.query().category(self.category2).between(start, end, True, False),
+                      lambda r: r.query().category(Category(CategoryType.OTHER, "None"))):
+            for key in ("category", "type", "day", "week", "month", "year"):
+                self.assertEqual(build(repo).group_by(key).agg("count", "sum", "min", "max"),
+                                 build(expected).group_by(key).agg("count", "sum", "min", "max"))
+        bonus = Transaction(name="Bonus", amount=500.0, transaction_type=TransactionType.INCOME,
+                            category=self.category2, datetime=DateTime(2023, 2, 1, 9, 0))
+        repo.insert(bonus)
+        expected.insert(bonus)
+        repo.erase(transactions[0])
+        expected.erase(transactions[0])
+        self.assertEqual(repo.group_by("month").agg("count", "sum", "min", "max"),
+                         expected.group_by("month").agg("count", "sum", "min", "max"))
+        self.assertEqual(repo.query().type(TransactionType.INCOME).group_by("category").max(),
+                         expected.query().type(TransactionType.INCOME).group_by("category").max())
+        self.assertFalse(ColumnarTransactionRepository(transactions).parallel)
+        repo.set_parallel(processes=1, threshold=0)
+        self.assertFalse(repo.parallel.accepts(repo, repo.query()))
+
+    def test_empty_aggregates(self):
+        repo = ColumnarTransactionRepository()
+        self.assertEqual(repo.get_total_amount(), 0.0)
+        self.assertEqual(repo.get_average_amount(), 0.0)
+        self.assertEqual(repo.get_max_amount(), 0.0)
+        self.assertEqual(repo.get_min_amount(), 0.0)
+
+    def test_clear(self):
+        self.repo.clear()
+        self.assertEqual(self.repo.get_count(), 0)
+        self.assertEqual(self.repo.get_all(), [])
+
+    def test_save_and_load_json(self):
+        file_path = "test_transactions.json"
+        self.repo.save_to_json(file_path)
+        expected_path = "test_transactions_expected.json"
+        TransactionRepository(self.transactions).save_to_json(expected_path)
+        with open(file_path, "r", encoding="utf-8") as f, \
+                open(expected_path, "r", encoding="utf-8") as g:
+            self.assertEqual(json.load(f), json.load(g))
+
+        loaded_repo = ColumnarTransactionRepository.load_from_json(file_path)
+        self.assertEqual(loaded_repo.get_count(), len(self.transactions))
+        self.assertEqual(loaded_repo.get_total_amount(), self.repo.get_total_amount())
+        os.remove(file_path)
+        os.remove(expected_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import io
+import json
+from src.json_stream import JsonArrayReader, JsonArrayWriter
+
+
+class TestJsonStream(unittest.TestCase):
+
+    def setUp(self):
+        """
+        准备测试数据
+        """
+        self.records = [
+            {"name": "午饭", "datetime": "2023-01-01 12:00", "amount": 20.0,
+             "transaction_type": 1, "category": 0, "remarks": "a, [b] \"c\""},
+            {"name": "Salary", "datetime": "2023-01-05 09:00", "amount": 3000.0,
+             "transaction_type": 0, "category": 3, "remarks": ""},
+        ]
+
+    def write(self, items) -> str:
+        buffer = io.StringIO()
+        with JsonArrayWriter(buffer) as writer:
+            for item in items:
+                writer.write(item)
+        return buffer.getvalue()
+
+    def test_writer_matches_json_dump(self):
+        for items in (self.records, self.records[:1], []):
+            self.assertEqual(self.write(items), json.dumps(items, ensure_ascii=False, indent=2))
+
+    def test_reader_small_chunks(self):
+        text = json.dumps(self.records, ensure_ascii=False, indent=2)
+        for chunk_size in (1, 3, 7, 1024):
+            reader = JsonArrayReader(io.StringIO(text), chunk_size=chunk_size)
+            self.assertEqual(list(reader), self.records)
+
+    def test_reader_numbers_split_across_chunks(self):
+        items = [12345, 6.5, [1, 2], "x", None]
+        reader = JsonArrayReader(io.StringIO(json.dumps(items)), chunk_size=2)
+        self.assertEqual(list(reader), items)
+
+    def test_reader_empty_and_malformed(self):
+        self.assertEqual(list(JsonArrayReader(io.StringIO(" [ ] "))), [])
+        with self.assertRaises(ValueError):
+            list(JsonArrayReader(io.StringIO('{"a": 1}')))
+        with self.assertRaises(ValueError):
+            list(JsonArrayReader(io.StringIO('[1, 2')))
+
+
+if __name__ == "__main__":
+    unittest.main()
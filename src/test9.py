@@ -0,0 +1,124 @@
+import unittest
+import os
+import json
+from unittest import mock
+from src.binary_ledger import BinaryLedger, json_to_binary, binary_to_json
+from src.columnar_repository import ColumnarTransactionRepository
+from src.transaction_repository import TransactionRepository
+from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+
+
+class TestBinaryLedger(unittest.TestCase):
+
+    def setUp(self):
+        """
+        准备交易数据和文件路径
+        """
+        self.json_path = "test_transactions.json"
+        self.binary_path = "test_transactions.bin"
+        self.roundtrip_path = "test_transactions_roundtrip.json"
+        self.repo = TransactionRepository([
+            Transaction(name="午饭", amount=20.0, transaction_type=TransactionType.EXPENSE,
+                        category=Category(CategoryType.FOOD), datetime=DateTime(2023, 1, 1, 12, 0),
+                        remarks="食堂"),
+            Transaction(name="Book", amount=42.5, transaction_type=TransactionType.EXPENSE,
+                        category=Category(CategoryType.OTHER, "Books"), datetime=DateTime(2023, 1, 3, 8, 15)),
+            Transaction(name="Salary", amount=3000.0, transaction_type=TransactionType.INCOME,
+                        category=Category(CategoryType.SALARY), datetime=DateTime(2023, 1, 5, 9, 0),
+                        remarks="Monthly salary"),
+        ])
+
+    def tearDown(self):
+        """
+        清理生成的测试文件
+        """
+        for path in (self.json_path, self.binary_path, self.roundtrip_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_save_and_load_binary(self):
+        self.repo.save_to_binary(self.binary_path)
+        loaded = TransactionRepository.load_from_binary(self.binary_path)
+        self.assertEqual(loaded.get_count(), 3)
+        for loaded_t, original_t in zip(loaded.get_all(), self.repo.get_all()):
+            self.assertEqual(loaded_t.name, original_t.name)
+            self.assertEqual(loaded_t.amount, original_t.amount)
+            self.assertEqual(str(loaded_t.datetime), str(original_t.datetime))
+            self.assertEqual(loaded_t.category.name, original_t.category.name)
+            self.assertEqual(loaded_t.remarks, original_t.remarks)
+
+    def test_mapped_columnar_repository(self):
+        self.repo.save_to_binary(self.binary_path)
+        mapped = ColumnarTransactionRepository.load_from_binary(self.binary_path)
+        self.assertEqual(mapped.get_total_amount(), 3062.5)
+        self.assertEqual(mapped.filter_by_type(TransactionType.EXPENSE).get_count(), 2)
+        self.assertEqual(mapped.query().name("Book").sum(), 42.5)
+        self.assertEqual(mapped.query().name_prefix("Bo").count(), 1)
+        self.assertEqual(mapped.query().name_prefix("午").sum(), mapped.find_by_name("午饭").amount)
+        self.assertEqual(mapped.find_by_name("午饭").remarks, "食堂")
+        self.assertEqual([t.name for t in mapped.search("食堂")], ["午饭"])
+        self.assertEqual(mapped.query().search("饭 book", match_all=False).count(), 2)
+        self.assertEqual(mapped.filter_by_category(Category(CategoryType.OTHER, "Books")).get_count(), 1)
+
+        mapped.insert(Transaction(name="Bus", amount=2.0, transaction_type=TransactionType.EXPENSE,
+                                  category=Category(CategoryType.TRANSPORT), datetime=DateTime(2023, 1, 6, 7, 0)))
+        self.assertEqual(mapped.get_count(), 4)
+        self.assertEqual(BinaryLedger(self.binary_path).records["amount"].sum(), 3062.5)
+
+    def test_save_over_mapped_file(self):
+        self.repo.save_to_binary(self.binary_path)
+        mapped = ColumnarTransactionRepository.load_from_binary(self.binary_path)
+        mapped.save_to_binary(self.binary_path)
+        self.assertEqual(mapped.get_total_amount(), 3062.5)
+        self.assertFalse(os.path.exists(self.binary_path + ".tmp"))
+        reloaded = ColumnarTransactionRepository.load_from_binary(self.binary_path)
+        self.assertEqual(reloaded.get_total_amount(), 3062.5)
+        ledger = reloaded._ledger
+        reloaded.clear()
+        self.assertEqual(reloaded.get_count(), 0)
+        self.assertTrue(ledger._mmap.closed)
+
+    def test_json_conversion_roundtrip(self):
+        self.repo.save_to_json(self.json_path)
+        json_to_binary(self.json_path, self.binary_path)
+        binary_to_json(self.binary_path, self.roundtrip_path)
+        with open(self.json_path, "r", encoding="utf-8") as f, \
+                open(self.roundtrip_path, "r", encoding="utf-8") as g:
+            self.assertEqual(json.load(f), json.load(g))
+
+    def test_none_strings_roundtrip(self):
+        self.repo.insert(Transaction(name=None, amount=1.0, transaction_type=TransactionType.EXPENSE,
+                                     category=Category(CategoryType.FOOD), datetime=DateTime(2023, 1, 7, 8, 0),
+                                     remarks=None))
+        self.repo.save_to_json(self.json_path)
+        json_to_binary(self.json_path, self.binary_path)
+        binary_to_json(self.binary_path, self.roundtrip_path)
+        with open(self.json_path, "r", encoding="utf-8") as f, \
+                open(self.roundtrip_path, "r", encoding="utf-8") as g:
+            self.assertEqual(json.load(f), json.load(g))
+        mapped = ColumnarTransactionRepository.load_from_binary(self.binary_path)
+        self.assertEqual((mapped.get_all()[-1].name, mapped.get_all()[-1].remarks), (None, None))
+        self.assertEqual(mapped.query().name("Nothing").count(), 0)
+        self.assertEqual(mapped.query().name_prefix("B").count(), 1)
+        self.assertEqual(mapped.search("食堂"), [mapped.find_by_name("午饭")])
+        mapped.close()
+
+    def test_ledgers_are_closed_after_loading(self):
+        self.repo.save_to_binary(self.binary_path)
+        with mock.patch.object(BinaryLedger, "close", autospec=True, side_effect=BinaryLedger.close) as close:
+            self.assertEqual(TransactionRepository.load_from_binary(self.binary_path).get_count(), 3)
+            binary_to_json(self.binary_path, self.roundtrip_path)
+        self.assertEqual(close.call_count, 2)
+        self.assertTrue(all(call.args[0]._mmap.closed for call in close.call_args_list))
+
+    def test_empty_and_invalid_files(self):
+        TransactionRepository().save_to_binary(self.binary_path)
+        self.assertEqual(ColumnarTransactionRepository.load_from_binary(self.binary_path).get_count(), 0)
+        with open(self.binary_path, "wb") as f:
+            f.write(b"not a ledger" * 10)
+        with self.assertRaises(ValueError):
+            BinaryLedger(self.binary_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
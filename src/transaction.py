@@ -2,9 +2,14 @@
 交易模块
 """
 
+from datetime import date
 from enum import Enum
 
 
+# 1970-01-01 的序数，用于计算纪元分钟数
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
 class TransactionType(Enum):
     """
     交易类型枚举
@@ -15,12 +20,12 @@ class TransactionType(Enum):
     @classmethod
     def from_string(cls, s: int) -> 'TransactionType':
         """
-        从字符串解析TransactionType枚举
+        从字符串解析TransactionType枚举，通过枚举的值表O(1)查找
         """
-        for t in TransactionType:
-            if t.value == s:
-                return t
-        raise ValueError(f"Unknown TransactionType: {s}")
+        try:
+            return cls(s)
+        except ValueError:
+            raise ValueError(f"Unknown TransactionType: {s}") from None
 
 
 class CategoryType(Enum):
@@ -36,18 +41,20 @@ class CategoryType(Enum):
     @classmethod
     def from_string(cls, s: str) -> 'CategoryType':
         """
-        从字符串解析CategoryType枚举
+        从字符串解析CategoryType枚举，通过枚举的值表O(1)查找
         """
-        for ct in CategoryType:
-            if ct.value == s:
-                return ct
-        return CategoryType.OTHER
+        try:
+            return cls(s)
+        except ValueError:
+            return CategoryType.OTHER
 
 
 class Category:
     """
     交易类别类
     """
+    __slots__ = ("category_type", "name")
+
     def __init__(
             self,
             category_type: CategoryType,
@@ -59,10 +66,81 @@ class Category:
             self.name = category_type.value
 
 
+class CategoryDictionary:
+    """
+    类别字典编码，按类别名称为每个不同类别分配一个小整数编号，并只保留一个共享的Category实例
+    """
+    def __init__(self, categories: list[Category] = ()):
+        """
+        初始化类别字典
+        @param categories: 初始类别，按顺序编号
+        """
+        self._categories = []
+        self._codes = {}
+        for category in categories:
+            self.encode(category)
+
+    def encode(self, category: Category) -> int:
+        """
+        获取类别的编号，未出现过的类别以该实例登记
+        """
+        code = self._codes.get(category.name)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(category)
+            self._codes[category.name] = code
+        return code
+
+    def encode_name(self, name) -> int:
+        """
+        获取类别名称的编号，未出现过的名称会新建类别
+        """
+        code = self._codes.get(name)
+        if code is None:
+            code = self.encode(Category(CategoryType.from_string(name), name))
+        return code
+
+    def get(self, name) -> Category:
+        """
+        获取类别名称对应的共享类别实例
+        """
+        return self._categories[self.encode_name(name)]
+
+    def decode(self, code: int) -> Category:
+        """
+        获取编号对应的类别
+        """
+        return self._categories[code]
+
+    def code_of(self, name, default: int = -1) -> int:
+        """
+        查找类别名称的编号，不存在时返回default
+        """
+        return self._codes.get(name, default)
+
+    def names(self) -> list:
+        """
+        按编号顺序获取全部类别名称
+        """
+        return [category.name for category in self._categories]
+
+    def copy(self) -> 'CategoryDictionary':
+        """
+        复制类别字典，共享类别实例
+        """
+        return CategoryDictionary(self._categories)
+
+    def __len__(self):
+        return len(self._categories)
+
+
 class DateTime:
     """
-    自定义日期时间类
+    自定义日期时间类，内部只保存一个纪元分钟数（自1970-01-01 00:00起的分钟数），
+    比较、排序和哈希都基于该整数
     """
+    __slots__ = ("_minutes",)
+
     def __init__(
             self,
             year: int,
@@ -78,47 +156,120 @@ class DateTime:
         @param hour: 时
         @param minute: 分
         """
-        self.year = year
-        self.month = month
-        self.day = day
-        self.hour = hour
-        self.minute = minute
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid time: {hour}:{minute}")
+        days = date(year, month, day).toordinal() - _EPOCH_ORDINAL
+        self._minutes = (days * 24 + hour) * 60 + minute
 
     @classmethod
     def from_string(cls, date_str: str) -> 'DateTime':
         """
-        从字符串解析DateTime对象
+        从字符串解析DateTime对象，标准格式按固定偏移解析
         @param date_str: 日期时间字符串，格式为"YYYY-MM-DD HH:MM"
         """
+        if len(date_str) == 16 and date_str[4] == "-" and date_str[7] == "-" \
+                and date_str[10] == " " and date_str[13] == ":":
+            return DateTime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+                            int(date_str[11:13]), int(date_str[14:16]))
         date_part, time_part = date_str.split(" ")
         year, month, day = map(int, date_part.split("-"))
         hour, minute = map(int, time_part.split(":"))
         return DateTime(year, month, day, hour, minute)
 
+    @classmethod
+    def from_minutes(cls, minutes: int) -> 'DateTime':
+        """
+        从纪元分钟数（自1970-01-01 00:00起的分钟数）构造DateTime对象
+        @param minutes: 纪元分钟数
+        """
+        dt = cls.__new__(cls)
+        dt._minutes = int(minutes)
+        return dt
+
+    def to_minutes(self) -> int:
+        """
+        转换为纪元分钟数（自1970-01-01 00:00起的分钟数）
+        """
+        return self._minutes
+
+    def _fields(self) -> tuple[int, int, int, int, int]:
+        """
+        拆分为(年, 月, 日, 时, 分)
+        """
+        days, rest = divmod(self._minutes, 24 * 60)
+        d = date.fromordinal(days + _EPOCH_ORDINAL)
+        return d.year, d.month, d.day, rest // 60, rest % 60
+
+    @property
+    def year(self) -> int:
+        """
+        年
+        """
+        return self._fields()[0]
+
+    @property
+    def month(self) -> int:
+        """
+        月
+        """
+        return self._fields()[1]
+
+    @property
+    def day(self) -> int:
+        """
+        日
+        """
+        return self._fields()[2]
+
+    @property
+    def hour(self) -> int:
+        """
+        时
+        """
+        return self._minutes % (24 * 60) // 60
+
+    @property
+    def minute(self) -> int:
+        """
+        分
+        """
+        return self._minutes % 60
+
     def __eq__(self, other):
-        return (self.year == other.year and
-                self.month == other.month and
-                self.day == other.day)
+        if not isinstance(other, DateTime):
+            return NotImplemented
+        return self._minutes == other._minutes
+
+    def __hash__(self):
+        return hash(self._minutes)
 
     def __str__(self):
-        return f"{self.year:04}-{self.month:02}-{self.day:02} {self.hour:02}:{self.minute:02}"
+        year, month, day, hour, minute = self._fields()
+        return f"{year:04}-{month:02}-{day:02} {hour:02}:{minute:02}"
+
+    def __repr__(self):
+        return f"DateTime({self})"
 
     def __lt__(self, other):
-        if self.year != other.year:
-            return self.year < other.year
-        if self.month != other.month:
-            return self.month < other.month
-        if self.day != other.day:
-            return self.day < other.day
-        if self.hour != other.hour:
-            return self.hour < other.hour
-        return self.minute < other.minute
+        return self._minutes < other._minutes
+
+    def __le__(self, other):
+        return self._minutes <= other._minutes
+
+    def __gt__(self, other):
+        return self._minutes > other._minutes
+
+    def __ge__(self, other):
+        return self._minutes >= other._minutes
 
 
 class Transaction:
     """
     交易类
     """
+    __slots__ = ("name", "amount", "transaction_type", "category", "datetime", "remarks",
+                 "__weakref__")
+
     def __init__(
             self,
             name: str,
@@ -0,0 +1,419 @@
+"""
+交易查询模块
+"""
+
+import copy
+from datetime import date, timedelta
+import numpy as np
+from src.transaction import Transaction, TransactionType, Category, DateTime
+from src.indexes import AmountStats, normalize_text
+
+
+# 可用的分组键，时间分组键的值为所在日、周（周一）、月、年第一天的datetime.date
+GROUP_KEYS = ("category", "type", "day", "week", "month", "year")
+
+# 可用的聚合方式
+AGGREGATIONS = ("count", "sum", "mean", "max", "min")
+
+_EPOCH = date(1970, 1, 1)
+
+# 全文检索结果超过该数量时不按相关度排序，保持插入顺序；过宽的检索词排序耗时且排序没有意义
+RANK_LIMIT = 10_000
+
+
+def group_key(key: str, code):
+    """
+    将仓库分组得到的原始编码转换为分组键值
+    @param key: 分组键
+    @param code: 原始编码，类别分组为类别名称，类型分组为类型编码，时间分组为纪元天数
+    """
+    if key == "category":
+        return code
+    if key == "type":
+        return TransactionType(code)
+    day = _EPOCH + timedelta(days=int(code))
+    if key == "day":
+        return day
+    if key == "week":
+        return day - timedelta(days=day.weekday())
+    if key == "month":
+        return day.replace(day=1)
+    if key == "year":
+        return date(day.year, 1, 1)
+    raise ValueError(f"Unknown group key: {key}")
+
+
+def merge_groups(key: str, rows) -> dict:
+    """
+    合并按原始编码分组的统计结果，时间分组按时间排序，其余分组保持首次出现的顺序
+    @param key: 分组键
+    @param rows: (原始编码, 数量, 总额, 最小值, 最大值)序列
+    @return: 分组键值到AmountStats的字典
+    """
+    groups = {}
+    for code, count, total, min_amount, max_amount in rows:
+        group = group_key(key, code)
+        stats = groups.get(group)
+        if stats is None:
+            groups[group] = AmountStats(count, total, min_amount, max_amount)
+        else:
+            stats.count += count
+            stats.total += total
+            stats.min = min(stats.min, min_amount)
+            stats.max = max(stats.max, max_amount)
+    if key in ("category", "type"):
+        return groups
+    return dict(sorted(groups.items()))
+
+
+def search_terms(text: str) -> tuple[str, ...]:
+    """
+    将检索文本按空白字符拆分为规范化的检索词，去除重复
+    @param text: 检索文本
+    """
+    return tuple(dict.fromkeys(normalize_text(text).split()))
+
+
+def text_matches(terms: tuple[str, ...], match_all: bool, name: str, remarks: str) -> bool:
+    """
+    判断规范化后的名称和备注是否包含检索词
+    @param terms: 规范化后的检索词
+    @param match_all: 为True时要求包含全部检索词，否则包含任一检索词
+    @param name: 规范化后的名称
+    @param remarks: 规范化后的备注
+    """
+    hits = (term in name or term in remarks for term in terms)
+    return all(hits) if match_all else any(hits)
+
+
+def _term_counts(terms: tuple[str, ...], values: list[str]) -> np.ndarray:
+    """
+    统计每个字符串中各检索词出现的次数，每个不同的字符串只规范化和统计一次
+    @return: 形状为(字符串数量, 检索词数量)的整数矩阵
+    """
+    distinct = {}
+    codes = [distinct.setdefault(value, len(distinct)) for value in values]
+    table = np.array([[text.count(term) for term in terms]
+                      for text in map(normalize_text, distinct)], dtype=np.int64)
+    return table.reshape(len(distinct), len(terms))[np.array(codes, dtype=np.intp)]
+
+
+def rank_by_relevance(terms: tuple[str, ...], transactions: list[Transaction]) -> list[Transaction]:
+    """
+    按相关度从高到低排序检索结果，相关度相同时保持原有顺序；
+    每个检索词的得分为出现次数（名称中的出现计两次）乘以逆文档频率log(1 + n / df)
+    @param terms: 规范化后的检索词
+    @param transactions: 检索结果
+    """
+    if not transactions:
+        return []
+    counts = 2 * _term_counts(terms, [t.name for t in transactions]) + \
+        _term_counts(terms, [t.remarks for t in transactions])
+    frequencies = np.count_nonzero(counts, axis=0)
+    weights = np.log1p(len(transactions) / np.maximum(frequencies, 1))
+    order = np.argsort(-(counts @ weights), kind="stable")
+    return [transactions[i] for i in order]
+
+
+class GroupBy:
+    """
+    分组聚合类，一次扫描计算每个分组的数量、总额、最小值和最大值
+    """
+    def __init__(self, query: 'TransactionQuery', key: str):
+        """
+        初始化分组聚合对象
+        @param query: 被分组的查询
+        @param key: 分组键，可选"category"、"type"、"day"、"week"、"month"、"year"
+        """
+        if key not in GROUP_KEYS:
+            raise ValueError(f"Unknown group key: {key}")
+        self.query = query
+        self.key = key
+
+    def stats(self) -> dict:
+        """
+        获取每个分组的金额统计
+        @return: 分组键值到AmountStats的字典
+        """
+        return self.query.repository._group(self.query, self.key, True)
+
+    def agg(self, *ops: str) -> dict:
+        """
+        对每个分组进行聚合，例如repo.group_by("month").agg("sum", "count")
+        @param ops: 聚合方式，可选"count"、"sum"、"mean"、"max"、"min"
+        @return: 只有一种聚合方式时为分组键值到聚合值的字典，否则为分组键值到聚合值元组的字典
+        """
+        if not ops:
+            raise ValueError("at least one aggregation is required")
+        for op in ops:
+            if op not in AGGREGATIONS:
+                raise ValueError(f"Unknown aggregation: {op}")
+        fields = ["total" if op == "sum" else op for op in ops]
+        extremes = "min" in ops or "max" in ops
+        groups = self.query.repository._group(self.query, self.key, extremes)
+        if len(fields) == 1:
+            return {group: getattr(stats, fields[0]) for group, stats in groups.items()}
+        return {group: tuple(getattr(stats, field) for field in fields)
+                for group, stats in groups.items()}
+
+    def count(self) -> dict:
+        """
+        获取每个分组的交易记录数量
+        """
+        return self.agg("count")
+
+    def sum(self) -> dict:
+        """
+        获取每个分组的总金额
+        """
+        return self.agg("sum")
+
+    def mean(self) -> dict:
+        """
+        获取每个分组的平均金额
+        """
+        return self.agg("mean")
+
+    def max(self) -> dict:
+        """
+        获取每个分组的最大金额
+        """
+        return self.agg("max")
+
+    def min(self) -> dict:
+        """
+        获取每个分组的最小金额
+        """
+        return self.agg("min")
+
+
+class TransactionQuery:
+    """
+    惰性交易查询类，组合多个过滤条件，仅在迭代或聚合时由仓库一次性执行
+    """
+    def __init__(self, repository):
+        """
+        初始化查询对象
+        @param repository: 被查询的交易仓库
+        """
+        self.repository = repository
+        self.transaction_type = None
+        self.category_name = None
+        self.name_value = None
+        self.name_prefix_value = None
+        self.text_terms = None
+        self.text_match_all = True
+        self.start = None
+        self.end = None
+        self.include_start = False
+        self.include_end = False
+        self.ordered = False
+        self.limit_value = None
+        self.offset_value = 0
+
+    def _with(self, **changes) -> 'TransactionQuery':
+        """
+        复制查询对象并修改条件，原查询保持不变
+        """
+        query = copy.copy(self)
+        for key, value in changes.items():
+            setattr(query, key, value)
+        return query
+
+    def type(self, transaction_type: TransactionType) -> 'TransactionQuery':
+        """
+        按交易类型过滤
+        @param transaction_type: 交易类型
+        """
+        return self._with(transaction_type=transaction_type)
+
+    def category(self, category: Category | str) -> 'TransactionQuery':
+        """
+        按交易类别过滤，类别按名称匹配
+        @param category: 交易类别或类别名称
+        """
+        return self._with(category_name=category.name if isinstance(category, Category) else category)
+
+    def name(self, name: str) -> 'TransactionQuery':
+        """
+        按交易名称过滤
+        @param name: 交易名称
+        """
+        return self._with(name_value=name)
+
+    def name_prefix(self, prefix: str) -> 'TransactionQuery':
+        """
+        按名称前缀过滤，前缀为空时不过滤
+        @param prefix: 名称前缀
+        """
+        return self._with(name_prefix_value=prefix or None)
+
+    def search(self, text: str, match_all: bool = True) -> 'TransactionQuery':
+        """
+        按名称和备注全文检索，忽略大小写和全角半角，检索词按空白字符拆分、作为子串匹配；
+        未按时间排序且结果不超过RANK_LIMIT条时按相关度从高到低排列。检索文本为空时不过滤
+        @param text: 检索文本，例如"午餐 公司"
+        @param match_all: 为True时要求包含全部检索词，否则包含任一检索词
+        """
+        terms = search_terms(text or "")
+        return self._with(text_terms=terms or None, text_match_all=match_all)
+
+    def between(
+            self,
+            start_time: DateTime,
+            end_time: DateTime,
+            include_start: bool = False,
+            include_end: bool = False) -> 'TransactionQuery':
+        """
+        按时间范围过滤，覆盖之前设置的时间范围
+        @param start_time: 起始时间
+        @param end_time: 结束时间
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        """
+        return self._with(
+            start=start_time.to_minutes(),
+            end=end_time.to_minutes(),
+            include_start=include_start,
+            include_end=include_end)
+
+    def order_by_datetime(self) -> 'TransactionQuery':
+        """
+        按时间排序结果
+        """
+        return self._with(ordered=True)
+
+    def limit(self, count: int, offset: int = 0) -> 'TransactionQuery':
+        """
+        只取结果中从offset开始的至多count条记录，用于分页获取；聚合和分组不受影响
+        @param count: 最多返回的记录数
+        @param offset: 跳过的记录数
+        """
+        return self._with(limit_value=count, offset_value=offset)
+
+    def group_by(self, key: str) -> GroupBy:
+        """
+        按分组键对满足条件的交易记录分组聚合
+        @param key: 分组键，可选"category"、"type"、"day"、"week"、"month"、"year"
+        """
+        return GroupBy(self, key)
+
+    def has_filters(self) -> bool:
+        """
+        是否设置了任何过滤条件
+        """
+        return (self.transaction_type is not None or self.category_name is not None or
+                self.has_name_filter() or self.start is not None)
+
+    def has_name_filter(self) -> bool:
+        """
+        是否设置了名称、名称前缀或全文检索条件，这些条件不能由汇总类索引回答
+        """
+        return (self.name_value is not None or self.name_prefix_value is not None or
+                self.text_terms is not None)
+
+    def is_ranked(self) -> bool:
+        """
+        结果是否按相关度排序
+        """
+        return self.text_terms is not None and not self.ordered
+
+    def has_limit(self) -> bool:
+        """
+        是否只取结果中的一页
+        """
+        return self.limit_value is not None or self.offset_value > 0
+
+    def window(self, rows):
+        """
+        从完整的结果中取出分页范围内的部分
+        @param rows: 完整的查询结果，列表或数组
+        """
+        if not self.has_limit():
+            return rows
+        stop = None if self.limit_value is None else self.offset_value + self.limit_value
+        return rows[self.offset_value:stop]
+
+    def has_time_range(self) -> bool:
+        """
+        是否设置了时间范围
+        """
+        return self.start is not None
+
+    def matches(self, transaction: Transaction) -> bool:
+        """
+        判断交易记录是否满足全部过滤条件
+        @param transaction: 交易记录
+        """
+        if self.transaction_type is not None and \
+                transaction.transaction_type != self.transaction_type:
+            return False
+        if self.category_name is not None and transaction.category.name != self.category_name:
+            return False
+        if self.name_value is not None and transaction.name != self.name_value:
+            return False
+        if self.name_prefix_value is not None and \
+                not (transaction.name or "").startswith(self.name_prefix_value):
+            return False
+        if self.text_terms is not None and \
+                not text_matches(self.text_terms, self.text_match_all,
+                                 normalize_text(transaction.name), normalize_text(transaction.remarks)):
+            return False
+        if self.start is not None:
+            minutes = transaction.datetime.to_minutes()
+            if minutes < self.start or (minutes == self.start and not self.include_start):
+                return False
+            if minutes > self.end or (minutes == self.end and not self.include_end):
+                return False
+        return True
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def to_list(self) -> list[Transaction]:
+        """
+        获取满足条件的交易记录列表
+        """
+        if self.is_ranked():
+            # 相关度排序需要完整的检索结果，排序后再取分页范围
+            rows = list(self.repository._select(self._with(limit_value=None, offset_value=0)))
+            if len(rows) <= RANK_LIMIT:
+                rows = rank_by_relevance(self.text_terms, rows)
+            return self.window(rows)
+        return list(self.repository._select(self))
+
+    def to_repository(self):
+        """
+        将满足条件的交易记录物化为新的交易仓库
+        """
+        return self.repository._query_repository(self)
+
+    def count(self) -> int:
+        """
+        获取满足条件的交易记录数量
+        """
+        return self.repository._aggregate(self, "count")
+
+    def sum(self) -> float:
+        """
+        获取满足条件的交易记录总金额
+        """
+        return self.repository._aggregate(self, "sum")
+
+    def mean(self) -> float:
+        """
+        获取满足条件的交易记录平均金额，无记录时为0.0
+        """
+        return self.repository._aggregate(self, "mean")
+
+    def max(self) -> float:
+        """
+        获取满足条件的交易记录最大金额，无记录时为0.0
+        """
+        return self.repository._aggregate(self, "max")
+
+    def min(self) -> float:
+        """
+        获取满足条件的交易记录最小金额，无记录时为0.0
+        """
+        return self.repository._aggregate(self, "min")
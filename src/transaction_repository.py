@@ -2,42 +2,363 @@
 交易仓库模块
 """
 
-import json
-from src.transaction import Transaction, TransactionType, Category, DateTime, CategoryType
+import io
+import os
+import sys
+from itertools import islice
+from operator import attrgetter
+from src.transaction import (
+    Transaction,
+    TransactionType,
+    Category,
+    CategoryDictionary,
+    DateTime,
+    CategoryType
+)
+from src.indexes import (
+    TimeIndex,
+    HashIndex,
+    AggregateIndex,
+    RollupIndex,
+    RangeSumIndex,
+    PrefixIndex,
+    TextIndex,
+    AmountStats
+)
+from src.transaction_query import TransactionQuery, GroupBy, merge_groups
+from src.json_stream import JsonArrayReader, JsonArrayWriter
+from src.binary_ledger import BinaryLedger, BinaryLedgerWriter
+
+
+# 可用的索引类型，索引构建后随插入、删除和清空增量维护
+_INDEX_FACTORIES = {
+    "datetime": TimeIndex,
+    "name": lambda transactions: HashIndex(attrgetter("name"), transactions),
+    "transaction_type": lambda transactions: HashIndex(attrgetter("transaction_type"), transactions),
+    "category": lambda transactions: HashIndex(attrgetter("category.name"), transactions),
+    "stats": AggregateIndex,
+    "rollup": RollupIndex,
+    "range_sum": RangeSumIndex,
+    "name_prefix": PrefixIndex,
+    "text": TextIndex,
+}
+
+# 保存和加载时每处理这么多条记录调用一次进度回调
+PROGRESS_INTERVAL = 4096
+
+# 分组聚合时从交易记录提取原始编码的函数，时间分组先按纪元天数分组再合并
+_GROUP_CODES = {
+    "category": attrgetter("category.name"),
+    "type": lambda t: t.transaction_type.value,
+    "day": lambda t: t.datetime.to_minutes() // 1440,
+}
+
+
+def transaction_to_record(t: Transaction) -> dict:
+    """
+    将交易对象转换为可序列化的记录字典
+    """
+    name = t.name
+    datetime = t.datetime.__str__()
+    amount = t.amount
+    transaction_type = t.transaction_type.value
+    category = t.category.name if hasattr(t.category, "name") else t.category
+    remarks = t.remarks
+    return {
+        "name": name,
+        "datetime": datetime,
+        "amount": amount,
+        "transaction_type": transaction_type,
+        "category": category,
+        "remarks": remarks
+    }
+
+
+def transaction_from_record(d: dict, categories: CategoryDictionary = None) -> Transaction:
+    """
+    从记录字典构造交易对象
+    @param d: 记录字典
+    @param categories: 类别字典，批量加载时传入同一个字典以共享类别实例
+    """
+    name = d.get("name")
+    if isinstance(name, str):
+        name = sys.intern(name)
+    datetime = DateTime.from_string(d.get("datetime"))
+    amount = float(d.get("amount"))
+    transaction_type = TransactionType.from_string(d.get("transaction_type"))
+    if categories is not None:
+        category = categories.get(d.get("category"))
+    else:
+        category = Category(CategoryType.from_string(d.get("category")), d.get("category"))
+    remarks = d.get("remarks")
+    return Transaction(name, amount, transaction_type, category, datetime, remarks)
 
 
 class TransactionRepository:
     """
     交易仓库类，管理交易记录
     """
-    def __init__(self, transactions: list[Transaction] = None):
+    # 数据版本号，每次插入、删除或清空后递增，供图表等缓存判断数据是否变化
+    version = 0
+
+    def __init__(
+            self,
+            transactions: list[Transaction] = None,
+            indexes: tuple[str, ...] = ()):
+        """
+        初始化交易仓库
+        @param transactions: 初始交易记录
+        @param indexes: 需要建立的二级索引，可选"name"、"transaction_type"、"category"、"stats"、"rollup"、"range_sum"、"name_prefix"、"text"
+        """
         self.transactions = transactions if transactions is not None else []
+        self._indexes = {}
+        for name in indexes:
+            self.create_index(name)
+
+    def create_index(self, name: str):
+        """
+        建立二级索引，之后的查找和过滤将使用该索引
+        @param name: 索引名称，可选"name"、"transaction_type"、"category"、"stats"、"rollup"、"range_sum"、"name_prefix"、"text"
+        """
+        self._get_index(name)
+
+    def drop_index(self, name: str):
+        """
+        删除二级索引
+        @param name: 索引名称
+        """
+        self._indexes.pop(name, None)
+
+    def _get_index(self, name: str):
+        """
+        获取指定索引，尚未构建时从当前交易记录构建
+        @param name: 索引名称
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            if name not in _INDEX_FACTORIES:
+                raise ValueError(f"Unknown index: {name}")
+            index = _INDEX_FACTORIES[name](self.transactions)
+            self._indexes[name] = index
+        return index
 
     def insert(self, transaction: Transaction):
         """
         插入交易记录
         """
         self.transactions.append(transaction)
+        for index in self._indexes.values():
+            index.add(transaction)
+        self.version += 1
 
     def erase(self, transaction: Transaction):
         """
         删除交易记录
         """
         self.transactions.remove(transaction)
+        for index in self._indexes.values():
+            index.remove(transaction)
+        self.version += 1
+
+    def query(self) -> TransactionQuery:
+        """
+        创建惰性查询，例如repo.query().type(...).category(...).between(a, b).sum()
+        """
+        return TransactionQuery(self)
+
+    def _candidates(self, query: TransactionQuery) -> tuple[list[Transaction], bool, TransactionQuery]:
+        """
+        为查询选择候选集最小的索引
+        @return: (候选交易记录, 候选集是否已按时间排序, 仍需在候选集上核对的查询条件)
+        """
+        best = self.transactions
+        time_bounds = None
+        if query.has_time_range() or (query.ordered and not query.has_filters()):
+            time_index = self._get_index("datetime")
+            if query.has_time_range():
+                time_bounds = time_index.bounds(
+                    query.start, query.end, query.include_start, query.include_end)
+            else:
+                time_bounds = (0, len(time_index))
+        best_size = len(best) if time_bounds is None else time_bounds[1] - time_bounds[0]
+        for name, key in (("transaction_type", query.transaction_type),
+                          ("category", query.category_name),
+                          ("name", query.name_value)):
+            index = self._indexes.get(name)
+            if key is not None and index is not None:
+                bucket = index.get(key)
+                if len(bucket) < best_size:
+                    best, best_size, time_bounds = bucket, len(bucket), None
+        prefix_index = self._indexes.get("name_prefix")
+        if query.name_prefix_value is not None and prefix_index is not None:
+            bucket = prefix_index.range(query.name_prefix_value)
+            if len(bucket) < best_size:
+                best, best_size, time_bounds = bucket, len(bucket), None
+        text_index = self._indexes.get("text")
+        if query.text_terms is not None and text_index is not None:
+            bucket = text_index.get(query.text_terms, query.text_match_all)
+            if bucket is not None and len(bucket) < best_size:
+                # 全文索引的结果是精确的，候选集上不必再逐条规范化文本核对
+                return bucket, False, query._with(text_terms=None)
+        if time_bounds is not None:
+            return time_index.slice(*time_bounds), True, query
+        return best, False, query
+
+    def _iter_matches(self, query: TransactionQuery):
+        """
+        在候选集上一次性应用全部过滤条件
+        """
+        candidates, _, query = self._candidates(query)
+        if not query.has_filters():
+            return iter(candidates)
+        return (t for t in candidates if query.matches(t))
+
+    def _select(self, query: TransactionQuery) -> list[Transaction]:
+        """
+        执行查询，返回满足条件的交易记录
+        """
+        candidates, is_sorted, rest = self._candidates(query)
+        if query.has_limit() and (is_sorted or not query.ordered):
+            # 候选集已是结果顺序时只核对到分页范围的末尾
+            if not rest.has_filters():
+                return list(query.window(candidates))
+            stop = None if query.limit_value is None else query.offset_value + query.limit_value
+            return list(islice((t for t in candidates if rest.matches(t)), query.offset_value, stop))
+        if rest.has_filters():
+            rows = [t for t in candidates if rest.matches(t)]
+        else:
+            rows = list(candidates)
+        if query.ordered and not is_sorted:
+            rows.sort(key=lambda t: t.datetime.to_minutes())
+        return query.window(rows)
+
+    def _query_repository(self, query: TransactionQuery) -> 'TransactionRepository':
+        """
+        执行查询并物化为新的交易仓库
+        """
+        return TransactionRepository(self._select(query))
+
+    def _aggregate(self, query: TransactionQuery, op: str):
+        """
+        对查询结果进行聚合
+        @param op: 聚合方式，可选"count"、"sum"、"mean"、"max"、"min"
+        """
+        stats_index = self._indexes.get("stats")
+        if stats_index is not None and not query.has_name_filter() and not query.has_time_range() \
+                and (query.transaction_type is None or query.category_name is None):
+            stats = stats_index.get(query.transaction_type, query.category_name)
+            if op == "sum":
+                return stats.total
+            if op in ("count", "mean", "max", "min"):
+                return getattr(stats, op)
+        range_sum = self._indexes.get("range_sum")
+        if range_sum is not None and query.has_time_range() and not query.has_name_filter() \
+                and (query.transaction_type is None or query.category_name is None) \
+                and op in ("count", "sum", "mean"):
+            count, total = range_sum.get(query.start, query.end, query.include_start, query.include_end,
+                                         query.transaction_type, query.category_name)
+            if op == "count":
+                return count
+            if op == "sum":
+                return total
+            return total / count if count else 0.0
+        if query.has_time_range() and op in ("count", "sum", "mean"):
+            for granularity in ("year", "month", "day"):
+                rows = self._rollup_rows(query, granularity)
+                if rows is not None:
+                    count = sum(row[1] for row in rows)
+                    total = sum(row[2] for row in rows)
+                    if op == "count":
+                        return count
+                    if op == "sum":
+                        return total
+                    return total / count if count else 0.0
+        if op == "count" and not query.has_filters():
+            return self.get_count()
+        amounts = [t.amount for t in self._iter_matches(query)]
+        if op == "count":
+            return len(amounts)
+        if op == "sum":
+            return sum(amounts)
+        if not amounts:
+            return 0.0
+        if op == "mean":
+            return sum(amounts) / len(amounts)
+        if op == "max":
+            return max(amounts)
+        if op == "min":
+            return min(amounts)
+        raise ValueError(f"Unknown aggregation: {op}")
+
+    def _rollup_rows(self, query: TransactionQuery, granularity: str) -> list[tuple] | None:
+        """
+        使用汇总索引获取查询在各时间桶上的汇总值
+        @param granularity: 分桶粒度，可选"day"、"month"、"year"
+        @return: (桶起始纪元天数, 数量, 总额)列表；未建立汇总索引、按名称过滤或时间范围不由整桶组成时返回None
+        """
+        rollup = self._indexes.get("rollup")
+        if rollup is None or query.has_name_filter():
+            return None
+        lo = hi = None
+        if query.has_time_range():
+            bounds = rollup.aligned(
+                granularity, query.start, query.end, query.include_start, query.include_end)
+            if bounds is None:
+                return None
+            lo, hi = bounds
+        return rollup.get(granularity, query.transaction_type, query.category_name, lo, hi)
+
+    def _group(self, query: TransactionQuery, key: str, extremes: bool = True) -> dict:
+        """
+        一次扫描查询结果，按分组键计算每个分组的金额统计；
+        不需要最小值和最大值时，时间分组优先使用汇总索引，复杂度与桶数量成正比
+        @param key: 分组键
+        @param extremes: 是否需要最小值和最大值，为False时结果中的最小值和最大值可能为0.0
+        @return: 分组键值到AmountStats的字典
+        """
+        if not extremes and key not in ("category", "type"):
+            rows = self._rollup_rows(query, "day" if key == "week" else key)
+            if rows is not None:
+                return merge_groups(key, ((start, count, total, 0.0, 0.0)
+                                          for start, count, total in rows))
+        code_of = _GROUP_CODES.get(key, _GROUP_CODES["day"])
+        groups = {}
+        for t in self._iter_matches(query):
+            code = code_of(t)
+            amount = t.amount
+            group = groups.get(code)
+            if group is None:
+                groups[code] = [1, amount, amount, amount]
+            else:
+                group[0] += 1
+                group[1] += amount
+                if amount < group[2]:
+                    group[2] = amount
+                elif amount > group[3]:
+                    group[3] = amount
+        return merge_groups(key, ((code, *group) for code, group in groups.items()))
+
+    def group_by(self, key: str) -> GroupBy:
+        """
+        按分组键分组聚合，例如repo.group_by("category").sum()
+        @param key: 分组键，可选"category"、"type"、"day"、"week"、"month"、"year"
+        """
+        return self.query().group_by(key)
 
     def filter_by_time_range(
             self,
             start_time: DateTime,
-            end_time: DateTime) -> 'TransactionRepository':
+            end_time: DateTime,
+            include_start: bool = False,
+            include_end: bool = False) -> 'TransactionRepository':
         """
         根据时间范围过滤交易记录
         @param start_time: 起始时间
         @param end_time: 结束时间
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
         """
-        return TransactionRepository([
-            t for t in self.transactions
-            if start_time.__lt__(t.datetime) and t.datetime.__lt__(end_time)
-        ])
+        return self.query().between(start_time, end_time, include_start, include_end).to_repository()
 
     def filter_by_type(
             self,
@@ -46,10 +367,7 @@ class TransactionRepository:
         根据交易类型过滤交易记录
         @param transaction_type: 交易类型
         """
-        return TransactionRepository([
-            t for t in self.transactions
-            if t.transaction_type == transaction_type
-        ])
+        return self.query().type(transaction_type).to_repository()
 
     def filter_by_category(
             self,
@@ -58,18 +376,13 @@ class TransactionRepository:
         根据交易类别过滤交易记录
         @param category: 交易类别
         """
-        return TransactionRepository([
-            t for t in self.transactions
-            if t.category == category
-        ])
+        return self.query().category(category).to_repository()
 
     def sort_by_datetime(self) -> 'TransactionRepository':
         """
         按时间排序交易记录
         """
-        return TransactionRepository(
-            sorted(self.transactions, key=lambda t: t.datetime)
-        )
+        return self.query().order_by_datetime().to_repository()
 
     def get_all(self) -> list[Transaction]:
         """
@@ -88,11 +401,84 @@ class TransactionRepository:
         清空交易记录
         """
         self.transactions.clear()
+        for index in self._indexes.values():
+            index.clear()
+        self.version += 1
+
+    def get_stats(
+            self,
+            transaction_type: TransactionType = None,
+            category: Category = None) -> AmountStats:
+        """
+        获取增量维护的金额统计（数量、总额、均值、最小值、最大值），均摊复杂度O(1)
+        @param transaction_type: 交易类型，为None时统计全部类型
+        @param category: 交易类别，为None时统计全部类别；不能与交易类型同时指定
+        """
+        category_name = category.name if category is not None else None
+        return self._get_index("stats").get(transaction_type, category_name)
+
+    def _range_sum(
+            self,
+            start_time: DateTime,
+            end_time: DateTime,
+            include_start: bool,
+            include_end: bool,
+            transaction_type: TransactionType,
+            category: Category) -> tuple[int, float]:
+        """
+        使用范围求和索引获取时间范围内的(数量, 总金额)
+        """
+        category_name = category.name if category is not None else None
+        return self._get_index("range_sum").get(
+            start_time.to_minutes(), end_time.to_minutes(), include_start, include_end,
+            transaction_type, category_name)
+
+    def sum_between(
+            self,
+            start_time: DateTime,
+            end_time: DateTime,
+            include_start: bool = False,
+            include_end: bool = False,
+            transaction_type: TransactionType = None,
+            category: Category = None) -> float:
+        """
+        获取时间范围内交易记录的总金额，使用增量维护的树状数组，复杂度O(log n)
+        @param start_time: 起始时间
+        @param end_time: 结束时间
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        @param transaction_type: 交易类型，为None时统计全部类型
+        @param category: 交易类别，为None时统计全部类别；不能与交易类型同时指定
+        """
+        return self._range_sum(start_time, end_time, include_start, include_end,
+                               transaction_type, category)[1]
+
+    def count_between(
+            self,
+            start_time: DateTime,
+            end_time: DateTime,
+            include_start: bool = False,
+            include_end: bool = False,
+            transaction_type: TransactionType = None,
+            category: Category = None) -> int:
+        """
+        获取时间范围内交易记录的数量，使用增量维护的树状数组，复杂度O(log n)
+        @param start_time: 起始时间
+        @param end_time: 结束时间
+        @param include_start: 是否包含起始时间
+        @param include_end: 是否包含结束时间
+        @param transaction_type: 交易类型，为None时统计全部类型
+        @param category: 交易类别，为None时统计全部类别；不能与交易类型同时指定
+        """
+        return self._range_sum(start_time, end_time, include_start, include_end,
+                               transaction_type, category)[0]
 
     def get_total_amount(self) -> float:
         """
         获取交易记录总金额
         """
+        if "stats" in self._indexes:
+            return self.get_stats().total
         return sum(t.amount for t in self.transactions)
 
     def get_average_amount(self) -> float:
@@ -109,6 +495,8 @@ class TransactionRepository:
         """
         if not self.transactions:
             return 0.0
+        if "stats" in self._indexes:
+            return self.get_stats().max
         return max(t.amount for t in self.transactions)
 
     def get_min_amount(self) -> float:
@@ -117,56 +505,140 @@ class TransactionRepository:
         """
         if not self.transactions:
             return 0.0
+        if "stats" in self._indexes:
+            return self.get_stats().min
         return min(t.amount for t in self.transactions)
 
+    def get_category_codes(self) -> tuple[list[int], CategoryDictionary]:
+        """
+        获取字典编码后的交易类别
+        @return: (每笔交易的类别编号, 编号对应的类别字典)
+        """
+        categories = CategoryDictionary()
+        return [categories.encode(t.category) for t in self.transactions], categories
+
+    def get_type_codes(self) -> list[int]:
+        """
+        获取每笔交易的交易类型编码（TransactionType的值）
+        """
+        return [t.transaction_type.value for t in self.transactions]
+
+    def search(self, text: str, match_all: bool = True) -> list[Transaction]:
+        """
+        按名称和备注全文检索，结果按相关度从高到低排列；
+        建立"text"索引后由倒排表回答，可与query()的其他条件组合，例如repo.query().type(...).search("午餐")
+        @param text: 检索文本，检索词按空白字符拆分、作为子串匹配
+        @param match_all: 为True时要求包含全部检索词，否则包含任一检索词
+        """
+        return self.query().search(text, match_all).to_list()
+
     def find_by_name(self, name: str) -> Transaction | None:
         """
         根据名称查找交易记录
         @param name: 交易名称
         """
+        index = self._indexes.get("name")
+        if index is not None:
+            matches = index.get(name)
+            return matches[0] if matches else None
         for t in self.transactions:
             if t.name == name:
                 return t
         return None
 
-    def save_to_json(self, file_path: str) -> None:
+    def find_all_by_name(self, name: str) -> list[Transaction]:
         """
-        保存交易记录到JSON文件
+        根据名称查找所有匹配的交易记录
+        @param name: 交易名称
+        """
+        index = self._indexes.get("name")
+        if index is not None:
+            return list(index.get(name))
+        return [t for t in self.transactions if t.name == name]
+
+    def save_to_json(self, file_path: str, progress=None) -> None:
+        """
+        保存交易记录到JSON文件，逐条序列化写出到临时文件，写入磁盘后再替换目标文件；
+        保存中途失败或被取消时目标文件保持不变
+        @param file_path: 文件路径
+        @param progress: 进度回调，参数为(已写出的记录数, 总记录数)；回调抛出的异常会中止保存
+        """
+        total = self.get_count()
+        temp_path = file_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                with JsonArrayWriter(f) as writer:
+                    for i, record in enumerate(self._iter_records(), 1):
+                        writer.write(record)
+                        if progress is not None and i % PROGRESS_INTERVAL == 0:
+                            progress(i, total)
+                f.flush()
+                os.fsync(f.fileno())
+            if progress is not None:
+                progress(total, total)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _iter_records(self):
+        """
+        逐条生成用于序列化的交易记录字典
         """
-        data = []
         for t in self.transactions:
-            name = t.name
-            datetime = t.datetime.__str__()
-            amount = t.amount
-            transaction_type = t.transaction_type.value
-            category = t.category.name if hasattr(t.category, "name") else t.category
-            remarks = t.remarks
-            data.append({
-                "name": name,
-                "datetime": datetime,
-                "amount": amount,
-                "transaction_type": transaction_type,
-                "category": category,
-                "remarks": remarks
-            })
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            yield transaction_to_record(t)
+
+    @classmethod
+    def iter_from_json(cls, file_path: str, progress=None):
+        """
+        从JSON文件流式读取交易记录，逐条产出交易对象；
+        同一类别共享一个Category实例，名称字符串会被驻留
+        @param file_path: 文件路径
+        @param progress: 进度回调，参数为(已读取的字节数, 文件字节数)；回调抛出的异常会中止读取
+        """
+        categories = CategoryDictionary()
+        total = os.path.getsize(file_path)
+        with open(file_path, "rb") as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+            for i, d in enumerate(JsonArrayReader(f), 1):
+                yield transaction_from_record(d, categories)
+                if progress is not None and i % PROGRESS_INTERVAL == 0:
+                    progress(raw.tell(), total)
+        if progress is not None:
+            progress(total, total)
 
     @classmethod
     def load_from_json(cls, file_path: str) -> 'TransactionRepository':
         """
         从JSON文件加载交易记录
         """
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        transactions = []
-        for d in data:
-            name = d.get("name")
-            datetime = DateTime.from_string(d.get("datetime"))
-            amount = float(d.get("amount"))
-            transaction_type = TransactionType.from_string(d.get("transaction_type"))
-            category = Category(CategoryType.from_string(d.get("category")), d.get("category"))
-            remarks = d.get("remarks")
-            transactions.append(Transaction(name, amount, transaction_type, \
-                                            category, datetime, remarks))
-        return cls(transactions)
+        return cls(list(cls.iter_from_json(file_path)))
+
+    def _iter_rows(self):
+        """
+        逐行产出(金额, 纪元分钟数, 交易类型编码, 类别名称, 名称, 备注)
+        """
+        for t in self.transactions:
+            yield (t.amount, t.datetime.to_minutes(), t.transaction_type.value,
+                   t.category.name, t.name, t.remarks)
+
+    def save_to_binary(self, file_path: str) -> None:
+        """
+        保存交易记录到二进制账本文件
+        """
+        with BinaryLedgerWriter(file_path) as writer:
+            for row in self._iter_rows():
+                writer.append(*row)
+
+    @classmethod
+    def load_from_binary(cls, file_path: str) -> 'TransactionRepository':
+        """
+        从二进制账本文件加载交易记录
+        """
+        categories = CategoryDictionary()
+        with BinaryLedger(file_path) as ledger:
+            return cls([
+                Transaction(name, amount, TransactionType.from_string(type_code),
+                            categories.get(category), DateTime.from_minutes(minutes), remarks)
+                for amount, minutes, type_code, category, name, remarks in ledger.iter_rows()
+            ])
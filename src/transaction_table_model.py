@@ -0,0 +1,159 @@
+"""
+交易表格模型模块
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from src.transaction_repository import TransactionRepository
+
+
+class TransactionTableModel(QAbstractTableModel):
+    """
+    交易表格模型，只在单元格显示时格式化；按原始顺序或时间排序时，
+    每批行在canFetchMore/fetchMore中通过查询的分页从仓库获取，不预先取出全部交易记录；
+    按其他列排序或按相关度排序时才一次取出全部结果
+    """
+    HEADERS = ("名称", "类型", "金额", "时间", "类别")
+    SORT_KEYS = (
+        lambda t: t.name or "",
+        lambda t: t.transaction_type.value,
+        lambda t: t.amount,
+        lambda t: t.datetime.to_minutes(),
+        lambda t: str(t.category.name),
+    )
+
+    def __init__(
+            self,
+            repository: TransactionRepository,
+            batch_size: int = 1000,
+            parent=None):
+        """
+        初始化表格模型
+        @param repository: 交易记录仓库
+        @param batch_size: 每次加载的行数
+        @param parent: 父对象
+        """
+        super().__init__(parent)
+        self.repository = repository
+        self.batch_size = batch_size
+        self.query = repository.query()
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        # 分页获取时使用的查询，为None时_rows中已是全部结果
+        self._paged = None
+        self._reversed = False
+        self._rows = []
+        self._total = 0
+        self._loaded = 0
+        self._reset()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self._loaded
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        t = self._rows[index.row()]
+        column = index.column()
+        if column == 0:
+            return t.name
+        if column == 1:
+            return str(t.transaction_type.value)
+        if column == 2:
+            return str(t.amount)
+        if column == 3:
+            return str(t.datetime)
+        return str(t.category.name)
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+        return self._loaded < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.batch_size, self._total - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        if self._paged is not None:
+            self._rows.extend(self._page(self._loaded, count))
+        self._loaded += count
+        self.endInsertRows()
+
+    def _page(self, offset: int, count: int) -> list:
+        """
+        通过查询的分页获取第offset行起的count行；按时间倒序时从结果末尾向前取
+        """
+        if not self._reversed:
+            return self._paged.limit(count, offset).to_list()
+        rows = self._paged.limit(count, self._total - offset - count).to_list()
+        rows.reverse()
+        return rows
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        """
+        按列排序，排序后重新从第一批开始加载，列号为负时恢复原始顺序
+        """
+        self._sort_column = column
+        self._sort_order = order
+        self._refresh()
+
+    def set_query(self, query):
+        """
+        设置过滤条件，过滤由仓库使用索引完成，结果保持当前的排序方式
+        @param query: 由仓库创建的查询
+        """
+        self.query = query
+        self._refresh()
+
+    def _refresh(self):
+        """
+        按当前的过滤条件和排序方式重新加载表格
+        """
+        self.beginResetModel()
+        self._reset()
+        self.endResetModel()
+
+    def _reset(self):
+        """
+        按当前的过滤条件和排序方式重新获取第一批交易记录；原始顺序和时间排序的结果分页获取，
+        时间排序使用仓库的时间索引
+        """
+        column = self._sort_column
+        descending = self._sort_order == Qt.DescendingOrder
+        if column == 3 or (column < 0 and not self.query.is_ranked()):
+            self._paged = self.query.order_by_datetime() if column == 3 else self.query
+            self._reversed = column == 3 and descending
+            self._total = self._paged.count()
+            self._loaded = min(self.batch_size, self._total)
+            self._rows = self._page(0, self._loaded) if self._loaded else []
+        else:
+            rows = self.query.to_list()
+            if column >= 0:
+                rows = sorted(rows, key=self.SORT_KEYS[column], reverse=descending)
+            self._paged = None
+            self._reversed = False
+            self._rows = rows
+            self._total = len(rows)
+            self._loaded = min(self.batch_size, self._total)
+
+    def transaction(self, row: int):
+        """
+        获取指定行的交易记录
+        """
+        return self._rows[row]